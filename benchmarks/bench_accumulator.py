@@ -0,0 +1,135 @@
+"""
+Benchmark: the Python rebuild engine's dict-of-tuples accumulator vs
+SummaryAccumulator (per-transaction adds and NumPy block mode).
+
+Reports wall time and peak traced memory (accumulation plus emitting every
+summary row) on synthetic transactions; no database is needed.
+
+    python benchmarks/bench_accumulator.py [--transactions N] [--merchants M] [--days D]
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "transaction_service.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from transactions import accumulator  # noqa: E402
+from transactions.accumulator import SummaryAccumulator  # noqa: E402
+from transactions.utils import (  # noqa: E402
+    jalali_month_start,
+    jalali_week_number,
+    jalali_week_start,
+    jalali_ymd,
+)
+
+
+def dict_accumulate(transactions):
+    """The pre-accumulator loop of SummaryService._rebuild_python."""
+    summary = defaultdict(lambda: {"amount": 0, "count": 0})
+    for merchant, dt, amount in transactions:
+        keys = []
+        keys.append(("daily", merchant, dt.year, dt.month, None, dt))
+        iso_year, iso_week, _ = dt.isocalendar()
+        keys.append(("weekly", merchant, iso_year, None, iso_week,
+                     date.fromisocalendar(iso_year, iso_week, 1)))
+        keys.append(("monthly", merchant, dt.year, dt.month, None, date(dt.year, dt.month, 1)))
+        week_start = jalali_week_start(dt)
+        j_week_year, j_week = jalali_week_number(week_start)
+        keys.append(("jalali_weekly", merchant, j_week_year, None, j_week, week_start))
+        jy, jm, _ = jalali_ymd(dt)
+        keys.append(("jalali_monthly", merchant, jy, jm, None, jalali_month_start(dt)))
+        for key in keys:
+            summary[key]["amount"] += amount
+            summary[key]["count"] += 1
+    for (granularity, merchant_id, year, month, week, ref_date), vals in summary.items():
+        yield {
+            "granularity": granularity,
+            "merchant_id": merchant_id,
+            "date": ref_date,
+            "year": year,
+            "month": month,
+            "week": week,
+            "total_amount": vals["amount"],
+            "total_count": vals["count"],
+        }
+
+
+def compact_accumulate(transactions):
+    acc = SummaryAccumulator()
+    for merchant, dt, amount in transactions:
+        acc.add(merchant, dt, amount)
+    yield from acc.rows()
+
+
+def block_accumulate(transactions, block_size=10_000):
+    acc = SummaryAccumulator()
+    for start in range(0, len(transactions), block_size):
+        block = transactions[start:start + block_size]
+        acc.add_batch(
+            [t[0] for t in block],
+            [t[1].toordinal() for t in block],
+            [t[2] for t in block],
+        )
+    yield from acc.rows()
+
+
+def measure(fn, transactions):
+    """(seconds, peak traced bytes, rows); timed and traced in separate runs."""
+    gc.collect()
+    started = time.perf_counter()
+    rows = sum(1 for _ in fn(transactions))
+    elapsed = time.perf_counter() - started
+
+    gc.collect()
+    tracemalloc.start()
+    sum(1 for _ in fn(transactions))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transactions", type=int, default=500_000)
+    parser.add_argument("--merchants", type=int, default=2_000)
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    start = date(2024, 1, 1)
+    days = [start + timedelta(i) for i in range(args.days)]
+    merchants = [str(m) for m in range(args.merchants)]
+    transactions = [
+        (rng.choice(merchants), rng.choice(days), rng.randrange(1, 10_000_000))
+        for _ in range(args.transactions)
+    ]
+
+    print(f"{args.transactions} transactions, {args.merchants} merchants, {args.days} days")
+    print(f"  numpy block mode: {'on' if accumulator.np is not None else 'off (numpy missing)'}")
+    results = [
+        ("dict of tuples", measure(dict_accumulate, transactions)),
+        ("compact, per row", measure(compact_accumulate, transactions)),
+        ("compact, blocks", measure(block_accumulate, transactions)),
+    ]
+    base_time = results[0][1][0]
+    for name, (elapsed, peak, rows) in results:
+        print(
+            f"  {name:<17}: {elapsed:7.2f}s  {args.transactions / elapsed:>10,.0f} tx/s  "
+            f"peak {peak / 2**20:7.1f} MiB  {rows} rows  ({base_time / elapsed:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
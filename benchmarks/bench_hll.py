@@ -0,0 +1,86 @@
+"""
+Microbenchmark: HyperLogLog register operations as Python loops vs NumPy.
+
+Times the three operations a rebuild runs per summary row (merge, decode and
+estimate of a stored sketch) on sparse and dense sketches; no database is
+needed.
+
+    python benchmarks/bench_hll.py [--calls N]
+"""
+import argparse
+import math
+import os
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "transaction_service.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from transactions import hll  # noqa: E402
+from transactions.hll import REGISTERS, HyperLogLog  # noqa: E402
+
+
+def loop_merge(left: bytearray, right: bytearray) -> bytearray:
+    """The pre-NumPy HyperLogLog.merge."""
+    return bytearray(map(max, left, right))
+
+
+def loop_decode(data: bytes) -> bytearray:
+    """The pre-NumPy HyperLogLog.from_bytes."""
+    if data[0] == hll._DENSE:
+        return bytearray(data[2:])
+    registers = bytearray(REGISTERS)
+    for offset in range(2, len(data), 3):
+        registers[int.from_bytes(data[offset:offset + 2], "big")] = data[offset + 2]
+    return registers
+
+
+def loop_estimate(registers: bytearray) -> int:
+    """The pre-NumPy HyperLogLog.estimate."""
+    zeros = registers.count(0)
+    if zeros == REGISTERS:
+        return 0
+    raw = hll._ALPHA * REGISTERS * REGISTERS / sum(2.0 ** -r for r in registers)
+    if raw <= 2.5 * REGISTERS:
+        return round(REGISTERS * math.log(REGISTERS / zeros))
+    return round(raw)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=2_000)
+    args = parser.parse_args()
+
+    def run(fn):
+        return min(timeit.repeat(fn, number=args.calls, repeat=3)) / args.calls
+
+    print(f"{args.calls} calls per operation, {REGISTERS} registers")
+    print(f"{'operation':>26} {'loop us':>9} {'numpy us':>9}")
+    for label, size in (("sparse", 300), ("dense", 50_000)):
+        left = HyperLogLog.of(range(size))
+        right = HyperLogLog.of(range(size // 2, size + size // 2))
+        data = left.to_bytes()
+        assert loop_decode(data) == HyperLogLog.from_bytes(data).registers
+        assert loop_estimate(left.registers) == left.estimate()
+
+        cases = [
+            ("merge", lambda: loop_merge(left.registers, right.registers),
+             lambda: left.copy().merge(right)),
+            ("decode + estimate", lambda: loop_estimate(loop_decode(data)),
+             lambda: HyperLogLog.from_bytes(data).estimate()),
+        ]
+        for name, baseline, vectorized in cases:
+            before, after = run(baseline), run(vectorized)
+            print(
+                f"{f'{name} ({label})':>26} {before * 1e6:>9.1f} {after * 1e6:>9.1f}"
+                f"  ({before / after:.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Microbenchmark: Jalali key formatting through jdatetime vs the lookup table.
+
+    python benchmarks/bench_jalali.py [--calls N]
+"""
+import argparse
+import os
+import sys
+import timeit
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "transaction_service.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from transactions import utils  # noqa: E402
+
+
+def jdatetime_daily_key(d: date) -> str:
+    """The pre-table implementation of format_daily_key."""
+    j = utils.to_jalali(d)
+    return f"{j.year:04d}/{j.month:02d}/{j.day:02d}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--distinct-days", type=int, default=3 * 365)
+    args = parser.parse_args()
+
+    start = date(2023, 1, 1)
+    days = [start + timedelta(i % args.distinct_days) for i in range(args.calls)]
+
+    utils.get_jalali_table()  # build outside the timed region
+
+    def run(fn):
+        return min(timeit.repeat(lambda: [fn(d) for d in days], number=1, repeat=3))
+
+    baseline = run(jdatetime_daily_key)
+    table = run(utils.format_daily_key)
+
+    print(f"{args.calls} calls over {args.distinct_days} distinct days")
+    print(f"  jdatetime.fromgregorian : {baseline:.3f}s")
+    print(f"  lookup table            : {table:.3f}s")
+    print(f"  speedup                 : {baseline / table:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
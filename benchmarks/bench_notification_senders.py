@@ -0,0 +1,118 @@
+"""
+Notification delivery against a local stub gateway: the sync path (one
+blocking POST per message, as a prefork worker sends them) vs the async
+engine's send_many over pooled keep-alive connections.
+
+    python benchmarks/bench_notification_senders.py [--messages 2000] [--latency-ms 20]
+        [--concurrency 10 50 200]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "transaction_service.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+import httpx  # noqa: E402
+
+from notifications.async_senders import HttpGatewaySender, run_async  # noqa: E402
+from notifications.models import Notification, NotificationLog  # noqa: E402
+from notifications.senders import BaseMediumSender  # noqa: E402
+
+
+def start_stub_gateway(latency: float) -> ThreadingHTTPServer:
+    """HTTP/1.1 keep-alive gateway on a free local port answering 202 after `latency` s."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(latency)
+            self.send_response(202)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 1024
+
+    server = Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class SyncHttpSender(BaseMediumSender):
+    """The sync strategy with a keep-alive client: one message per blocking POST."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.client = httpx.Client()
+
+    def send(self, notification, log):
+        payload = HttpGatewaySender.payload(notification, log)
+        self.client.post(self.url, json=payload).raise_for_status()
+
+
+def make_items(n: int):
+    notification = Notification(id=1, title="Maintenance", body="Tonight")
+    return [
+        (notification, NotificationLog(id=i, notification_id=1, medium="sms", recipient_id=str(i)))
+        for i in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=2_000)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    args = parser.parse_args()
+
+    server = start_stub_gateway(args.latency_ms / 1000)
+    url = f"http://127.0.0.1:{server.server_port}/send"
+    items = make_items(args.messages)
+    print(f"{args.messages} messages, gateway latency {args.latency_ms:g}ms")
+    print(f"{'path':>16} {'seconds':>9} {'msg/s':>9}")
+
+    # the sync path is bounded by latency, so time a slice of it
+    sync_items = items[: max(1, min(len(items), int(2 / max(args.latency_ms / 1000, 1e-3))))]
+    sender = SyncHttpSender(url)
+    started = time.perf_counter()
+    for notification, log in sync_items:
+        sender.send(notification, log)
+    elapsed = time.perf_counter() - started
+    sender.client.close()
+    sync_rate = len(sync_items) / elapsed
+    print(f"{'sync':>16} {elapsed:>9.2f} {sync_rate:>9.0f}")
+
+    for concurrency in args.concurrency:
+        gateway = HttpGatewaySender(url, concurrency=concurrency)
+        started = time.perf_counter()
+        outcomes = run_async(gateway.send_many(items))
+        elapsed = time.perf_counter() - started
+        run_async(gateway.aclose())
+        errors = [outcome for outcome in outcomes if outcome is not None]
+        assert not errors, f"{len(errors)} sends failed, first: {errors[0]!r}"
+        rate = args.messages / elapsed
+        print(
+            f"{f'async x{concurrency}':>16} {elapsed:>9.2f} {rate:>9.0f}"
+            f"  ({rate / sync_rate:.1f}x)"
+        )
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
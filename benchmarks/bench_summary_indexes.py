@@ -0,0 +1,108 @@
+"""
+Summary API query latency with and without the summary_transaction indexes.
+
+Seeds a scratch collection (never the live one) with synthetic summary
+rows, times the queries the API issues, builds the declared indexes and
+times them again. Needs the MongoDB configured in Django settings.
+
+    python benchmarks/bench_summary_indexes.py [--rows 10000000] [--merchants 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "transaction_service.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from transaction_service.mongo import get_database  # noqa: E402
+from transactions.indexes import declared_indexes  # noqa: E402
+from transactions.models import SummaryTransaction  # noqa: E402
+
+COLLECTION = "bench_summary_transaction"
+GRANULARITIES = [g for g, _ in SummaryTransaction.Granularity.choices]
+
+
+def seed(collection, rows: int, merchants: int, batch_size: int = 10_000):
+    start = datetime(2015, 1, 1)
+    merchant_ids = [None] + [str(m) for m in range(1, merchants + 1)]
+    batch = []
+    for i in range(rows):
+        batch.append({
+            "granularity": GRANULARITIES[i % len(GRANULARITIES)],
+            "merchantId": merchant_ids[(i // len(GRANULARITIES)) % len(merchant_ids)],
+            "date": start + timedelta(days=i // (len(GRANULARITIES) * len(merchant_ids))),
+            "total_amount": random.randint(1, 10_000_000),
+            "total_count": random.randint(1, 1000),
+            "jalali_key": "1403/01/01",
+        })
+        if len(batch) == batch_size:
+            collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+
+
+def queries(merchants: int):
+    picked = [str(random.randint(1, merchants)) for _ in range(5)]
+    for granularity in ("daily", "monthly"):
+        yield f"{granularity}, rollup", {"granularity": granularity, "merchantId": None}
+        for merchant_id in picked:
+            yield f"{granularity}, merchant", {"granularity": granularity, "merchantId": merchant_id}
+
+
+def time_queries(collection, merchants: int, repeat: int = 3) -> dict[str, float]:
+    random.seed(7)
+    timings = {}
+    for label, query in queries(merchants):
+        best = None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            list(collection.find(query, {"jalali_key": 1, "total_amount": 1}).sort("date", 1))
+            elapsed = time.perf_counter() - t0
+            best = elapsed if best is None else min(best, elapsed)
+        timings.setdefault(label, []).append(best)
+    return {label: sum(v) / len(v) for label, v in timings.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--merchants", type=int, default=2000)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch collection.")
+    args = parser.parse_args()
+
+    collection = get_database()[COLLECTION]
+    collection.drop()
+
+    t0 = time.perf_counter()
+    seed(collection, args.rows, args.merchants)
+    print(f"seeded {args.rows} rows in {time.perf_counter() - t0:.1f}s")
+
+    without = time_queries(collection, args.merchants)
+
+    t0 = time.perf_counter()
+    for spec in declared_indexes(SummaryTransaction):
+        collection.create_index(list(spec.keys), name=spec.name)
+    print(f"built indexes in {time.perf_counter() - t0:.1f}s")
+
+    with_indexes = time_queries(collection, args.merchants)
+
+    print(f"{'query':<20} {'no index':>12} {'indexed':>12} {'speedup':>9}")
+    for label in without:
+        a, b = without[label], with_indexes[label]
+        print(f"{label:<20} {a * 1000:>10.1f}ms {b * 1000:>10.1f}ms {a / b:>8.0f}x")
+
+    if not args.keep:
+        collection.drop()
+
+
+if __name__ == "__main__":
+    main()
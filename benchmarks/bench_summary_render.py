@@ -0,0 +1,63 @@
+"""
+Summary response rendering: SummaryPointSerializer + JSONRenderer vs the
+direct encoder in transactions.renderers.
+
+    python benchmarks/bench_summary_render.py [--sizes 1000 10000 100000]
+"""
+import argparse
+import os
+import sys
+import timeit
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "transaction_service.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from transactions import renderers  # noqa: E402
+from transactions.serializers import SummaryPointSerializer  # noqa: E402
+from transactions.utils import format_daily_key  # noqa: E402
+
+
+def make_points(n: int) -> list[dict]:
+    start = date(2010, 1, 1)
+    return [
+        {"key": format_daily_key(start + timedelta(days=i)), "value": i * 1013}
+        for i in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    args = parser.parse_args()
+
+    encoder = "orjson" if renderers.orjson is not None else "json"
+    print(f"fast path encoder: {encoder}")
+    print(f"{'points':>8} {'serializer':>12} {'fast':>10} {'speedup':>8}")
+
+    for n in args.sizes:
+        points = make_points(n)
+
+        def drf():
+            return JSONRenderer().render(SummaryPointSerializer(points, many=True).data)
+
+        def fast():
+            return renderers.render_summary_points(points)
+
+        assert drf() == fast(), "fast renderer output differs from the serializer"
+
+        number = max(1, 100_000 // n)
+        slow_t = min(timeit.repeat(drf, number=number, repeat=3)) / number
+        fast_t = min(timeit.repeat(fast, number=number, repeat=3)) / number
+        print(f"{n:>8} {slow_t * 1000:>10.2f}ms {fast_t * 1000:>8.2f}ms {slow_t / fast_t:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
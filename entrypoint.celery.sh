@@ -3,4 +3,8 @@ set -e
 
 python manage.py migrate --noinput || true
 
-celery -A transaction_service worker -l info
+# CELERY_QUEUES / CELERY_CONCURRENCY let one image serve every worker pool
+# (default queue, notifications.<medium>); see docker-compose.yaml.
+celery -A transaction_service worker -l info \
+  -Q "${CELERY_QUEUES:-celery}" \
+  ${CELERY_CONCURRENCY:+--concurrency "$CELERY_CONCURRENCY"}
@@ -0,0 +1,144 @@
+# notifications/async_senders.py
+"""
+Asyncio sender engine for HTTP notification gateways.
+
+AsyncMediumSender.send_many delivers many logs of one medium concurrently,
+at most `concurrency` requests in flight, and returns one outcome per item
+(None on success, the exception otherwise) instead of stopping at the first
+failure. HttpGatewaySender posts every message through a single pooled,
+keep-alive httpx.AsyncClient.
+
+Celery's prefork workers are synchronous: run_async drives the coroutines
+on one event loop per worker process, so gateway connection pools survive
+from one task to the next.
+"""
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Sequence
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from notifications.models import Notification, NotificationLog
+from notifications.senders import recipient_of
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - optional dependency
+    httpx = None
+
+
+class AsyncMediumSender(ABC):
+    """Async counterpart of BaseMediumSender, sending many logs at once."""
+
+    def __init__(self, concurrency: int = 50):
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.concurrency = concurrency
+
+    @abstractmethod
+    async def send(self, notification: Notification, log: NotificationLog) -> None:
+        """Send one message; raise if sending fails."""
+        raise NotImplementedError
+
+    async def send_many(
+        self, items: Sequence[tuple[Notification, NotificationLog]],
+    ) -> list[Exception | None]:
+        """Send every (notification, log) pair; one outcome per item, in order."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def attempt(notification, log):
+            async with semaphore:
+                try:
+                    await self.send(notification, log)
+                except Exception as e:
+                    return e
+                return None
+
+        return await asyncio.gather(*(attempt(n, log) for n, log in items))
+
+    async def aclose(self) -> None:
+        """Release pooled resources."""
+
+
+class HttpGatewaySender(AsyncMediumSender):
+    """
+    POSTs each message as JSON to `url`; any non-2xx response is a failure.
+    The client keeps up to `concurrency` connections alive for reuse.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        concurrency: int = 50,
+        timeout: float = 10.0,
+        transport=None,
+    ):
+        super().__init__(concurrency)
+        if httpx is None:
+            raise ImproperlyConfigured("httpx is required for HTTP notification gateways")
+        self.url = url
+        self.timeout = timeout
+        self.transport = transport
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.concurrency,
+                    max_keepalive_connections=self.concurrency,
+                ),
+                transport=self.transport,
+            )
+        return self._client
+
+    @staticmethod
+    def payload(notification: Notification, log: NotificationLog) -> dict:
+        return {
+            "reference": log.id,
+            "medium": log.medium,
+            "recipient": recipient_of(notification, log),
+            "title": notification.title,
+            "body": notification.body,
+        }
+
+    async def send(self, notification: Notification, log: NotificationLog) -> None:
+        response = await self.client.post(self.url, json=self.payload(notification, log))
+        response.raise_for_status()
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_GATEWAYS = {}
+_loop = None
+
+
+def get_gateway_sender(medium: str) -> AsyncMediumSender | None:
+    """
+    The async sender of `medium` when settings.NOTIFICATION_GATEWAYS gives it
+    a URL, else None (the medium keeps its sync sender). Cached per process.
+    """
+    if medium not in _GATEWAYS:
+        config = getattr(settings, "NOTIFICATION_GATEWAYS", {}).get(medium) or {}
+        _GATEWAYS[medium] = None
+        if config.get("url"):
+            _GATEWAYS[medium] = HttpGatewaySender(
+                config["url"],
+                concurrency=config.get("concurrency", 50),
+                timeout=config.get("timeout", 10.0),
+            )
+    return _GATEWAYS[medium]
+
+
+def run_async(coro):
+    """Run `coro` to completion on this process's persistent event loop."""
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+    return _loop.run_until_complete(coro)
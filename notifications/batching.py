@@ -0,0 +1,32 @@
+# notifications/batching.py
+"""
+Grouping logs into sender batches.
+
+Providers take bulk submissions (BaseMediumSender.send_batch), so delivery
+gathers a medium's pending logs into batches of up to `size` items. A batch
+is also cut once `linger` seconds have passed since its first item was
+gathered, so a slow source (a long cursor, a large page) never holds
+messages that are ready back for long.
+"""
+import time
+from typing import Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+
+def gather_batches(items: Iterable[T], size: int, linger: float = 0) -> Iterator[list[T]]:
+    """Yield lists of up to `size` items; `linger` <= 0 disables the time limit."""
+    if size < 1:
+        raise ValueError("size must be at least 1")
+
+    batch = []
+    first_at = None
+    for item in items:
+        batch.append(item)
+        if first_at is None:
+            first_at = time.monotonic()
+        if len(batch) >= size or (linger > 0 and time.monotonic() - first_at >= linger):
+            yield batch
+            batch, first_at = [], None
+    if batch:
+        yield batch
@@ -0,0 +1,49 @@
+# Generated by Django 3.1.12 on 2026-10-18 20:40
+
+from django.db import migrations, models
+import djongo.models.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='fanout_complete',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='fanout_cursor',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='kind',
+            field=models.CharField(choices=[('direct', 'Direct'), ('broadcast', 'Broadcast')], default='direct', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='recipient_ids',
+            field=djongo.models.fields.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='recipients_expanded',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='segment',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='notificationlog',
+            name='recipient_id',
+            field=models.CharField(blank=True, max_length=128, null=True),
+        ),
+    ]
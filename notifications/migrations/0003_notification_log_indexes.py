@@ -0,0 +1,21 @@
+# Generated by Django 3.1.12 on 2026-10-18 21:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_broadcast'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notificationlog',
+            index=models.Index(fields=['notification', 'recipient_id', 'medium'], name='notification_log_recipient'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationlog',
+            index=models.Index(fields=['notification', 'status'], name='notification_log_status'),
+        ),
+    ]
@@ -6,14 +6,28 @@ class Notification(models.Model):
     """
     A high-level notification created by the API.
     Celery will create NotificationLog rows for each medium.
+
+    A BROADCAST stores its content once for a whole audience (recipient_ids
+    or a named segment); NotificationLog rows are expanded from it page by
+    page, one per recipient and medium.
     """
 
+    class Kind(models.TextChoices):
+        DIRECT = "direct", "Direct"
+        BROADCAST = "broadcast", "Broadcast"
+
     class Status(models.TextChoices):
         PENDING = "pending", "Pending"
         PROCESSING = "processing", "Processing"
         SENT = "sent", "Sent"
         FAILED = "failed", "Failed"
 
+    kind = models.CharField(
+        max_length=20,
+        choices=Kind.choices,
+        default=Kind.DIRECT,
+    )
+
     user_id = models.CharField(max_length=128, null=True, blank=True)
 
     title = models.CharField(max_length=255)
@@ -22,6 +36,15 @@ class Notification(models.Model):
     # Example: ["sms", "email", "telegram"]
     channels = models.JSONField(default=list)
 
+    # Broadcast audience: an explicit list or a segment (notifications.segments).
+    recipient_ids = models.JSONField(default=list, blank=True)
+    segment = models.CharField(max_length=64, null=True, blank=True)
+
+    # Fan-out progress: position of the next page to expand.
+    fanout_cursor = models.CharField(max_length=255, null=True, blank=True)
+    fanout_complete = models.BooleanField(default=False)
+    recipients_expanded = models.IntegerField(default=0)
+
     status = models.CharField(
         max_length=20,
         choices=Status.choices,
@@ -60,6 +83,9 @@ class NotificationLog(models.Model):
         on_delete=models.CASCADE,
     )
 
+    # Set on broadcast logs; direct notifications go to notification.user_id.
+    recipient_id = models.CharField(max_length=128, null=True, blank=True)
+
     medium = models.CharField(
         max_length=20,
         choices=Medium.choices,
@@ -80,6 +106,15 @@ class NotificationLog(models.Model):
 
     class Meta:
         db_table = "notification_log"
+        indexes = [
+            # broadcast pages look their logs up by recipient and medium,
+            # settling counts them by status; both within one notification
+            models.Index(
+                fields=["notification", "recipient_id", "medium"],
+                name="notification_log_recipient",
+            ),
+            models.Index(fields=["notification", "status"], name="notification_log_status"),
+        ]
 
     def __str__(self):
         return f"{self.notification_id} – {self.medium} – {self.status}"
@@ -0,0 +1,27 @@
+# notifications/routing.py
+"""
+Celery routing for per-medium delivery.
+
+Every task that sends over a single medium takes the medium as its last
+argument and is routed to `notifications.<medium>`, so each medium gets
+its own workers, concurrency and backlog (see docker-compose.yaml).
+Everything else stays on the default queue.
+"""
+
+MEDIUM_TASKS = {
+    "notifications.tasks.send_notification_medium_task",
+    "notifications.tasks.send_notification_batch_task",
+    "notifications.tasks.send_broadcast_page_task",
+}
+
+
+def medium_queue(medium: str) -> str:
+    return f"notifications.{medium}"
+
+
+def route_notification_task(name, args, kwargs, options, task=None, **kw):
+    """Celery task router (settings.CELERY_TASK_ROUTES)."""
+    if name not in MEDIUM_TASKS:
+        return None
+    medium = kwargs["medium"] if "medium" in (kwargs or {}) else args[-1]
+    return {"queue": medium_queue(medium)}
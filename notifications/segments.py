@@ -0,0 +1,65 @@
+# notifications/segments.py
+"""
+Broadcast audiences.
+
+A segment is a named resolver returning one page of recipient ids in a
+stable order: `resolver(after, limit)` gives up to `limit` ids greater than
+`after` (None for the first page). Broadcasts with an explicit recipient
+list are paged by offset instead. Either way the fan-out only ever holds
+one page of recipients.
+
+Resolvers are registered with @segment(name) or named in
+settings.NOTIFICATION_SEGMENTS (name -> dotted path), so an audience can
+come from the app that owns it without this app depending on it. Whatever a
+resolver returns must be ids the senders deliver to.
+"""
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from notifications.models import Notification
+
+
+class UnknownSegmentError(Exception):
+    pass
+
+
+SEGMENTS = {}
+
+
+def segment(name: str):
+    """Register a segment resolver under `name`."""
+    def register(resolver):
+        SEGMENTS[name] = resolver
+        return resolver
+    return register
+
+
+def get_segment(name: str):
+    if name in SEGMENTS:
+        return SEGMENTS[name]
+    path = settings.NOTIFICATION_SEGMENTS.get(name)
+    if path is None:
+        raise UnknownSegmentError(f"Unsupported segment: {name}")
+    try:
+        return import_string(path)
+    except ImportError as e:
+        raise UnknownSegmentError(f"Segment {name} cannot be loaded: {e}")
+
+
+def recipient_page(
+    notification: Notification, cursor: str | None, limit: int,
+) -> tuple[list[str], str | None]:
+    """
+    One page of a broadcast's recipients starting at `cursor`.
+    Returns (recipient ids, cursor of the next page or None on the last one).
+    """
+    if notification.segment:
+        recipients = get_segment(notification.segment)(cursor, limit)
+        next_cursor = recipients[-1] if len(recipients) == limit else None
+        return recipients, next_cursor
+
+    offset = int(cursor or 0)
+    recipients = [str(r) for r in notification.recipient_ids[offset:offset + limit]]
+    end = offset + len(recipients)
+    next_cursor = str(end) if end < len(notification.recipient_ids) else None
+    return recipients, next_cursor
@@ -1,5 +1,7 @@
 # notifications/senders.py
 from abc import ABC, abstractmethod
+from typing import Sequence
+
 from django.utils import timezone
 
 from notifications.models import Notification, NotificationLog
@@ -20,11 +22,34 @@ class BaseMediumSender(ABC):
         """
         raise NotImplementedError
 
+    def send_batch(
+        self, items: Sequence[tuple[Notification, NotificationLog]],
+    ) -> list[Exception | None]:
+        """
+        Send several messages at once, returning one outcome per item, in
+        order: None when it was accepted, the exception otherwise. Providers
+        with a bulk API override this with a single submission; the default
+        sends the items one by one.
+        """
+        outcomes = []
+        for notification, log in items:
+            try:
+                self.send(notification, log)
+                outcomes.append(None)
+            except Exception as e:
+                outcomes.append(e)
+        return outcomes
+
+
+def recipient_of(notification: Notification, log: NotificationLog) -> str | None:
+    """Broadcast logs carry their own recipient; direct ones go to the notification's user."""
+    return log.recipient_id or notification.user_id
+
 
 class SMSSender(BaseMediumSender):
     def send(self, notification: Notification, log: NotificationLog) -> None:
         print(
-            f"[{timezone.now()}] [SMS] user={notification.user_id} "
+            f"[{timezone.now()}] [SMS] user={recipient_of(notification, log)} "
             f"title='{notification.title}' body='{notification.body}'"
         )
 
@@ -32,7 +57,7 @@ class SMSSender(BaseMediumSender):
 class EmailSender(BaseMediumSender):
     def send(self, notification: Notification, log: NotificationLog) -> None:
         print(
-            f"[{timezone.now()}] [EMAIL] user={notification.user_id} "
+            f"[{timezone.now()}] [EMAIL] user={recipient_of(notification, log)} "
             f"title='{notification.title}' body='{notification.body}'"
         )
 
@@ -40,7 +65,7 @@ class EmailSender(BaseMediumSender):
 class TelegramSender(BaseMediumSender):
     def send(self, notification: Notification, log: NotificationLog) -> None:
         print(
-            f"[{timezone.now()}] [TELEGRAM] user={notification.user_id} "
+            f"[{timezone.now()}] [TELEGRAM] user={recipient_of(notification, log)} "
             f"title='{notification.title}' body='{notification.body}'"
         )
 
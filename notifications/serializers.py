@@ -1,6 +1,7 @@
 from rest_framework import serializers
 
 from notifications.models import Notification, NotificationLog
+from notifications.segments import UnknownSegmentError, get_segment
 
 
 class NotificationCreateSerializer(serializers.ModelSerializer):
@@ -22,3 +23,55 @@ class NotificationCreateSerializer(serializers.ModelSerializer):
             "channels",
         ]
 
+
+class NotificationBatchCreateSerializer(serializers.Serializer):
+    MAX_ITEMS = 10_000
+
+    # Items are validated one by one with NotificationCreateSerializer so
+    # errors can be reported per item instead of rejecting the whole batch.
+    notifications = serializers.ListField(
+        allow_empty=False,
+        max_length=MAX_ITEMS,
+        help_text="List of /send/ payloads.",
+    )
+
+
+class BroadcastCreateSerializer(serializers.Serializer):
+    # explicit lists are stored inline on the notification document: at
+    # 128 characters per id this keeps it around 1.5 MB, well below the 16 MB
+    # document limit. Larger audiences are addressed through a segment.
+    MAX_RECIPIENTS = 10_000
+
+    title = serializers.CharField(max_length=255)
+    body = serializers.CharField()
+    channels = serializers.ListField(
+        child=serializers.ChoiceField(choices=NotificationLog.Medium.choices),
+        allow_empty=False,
+    )
+    recipient_ids = serializers.ListField(
+        child=serializers.CharField(max_length=128),
+        required=False,
+        default=list,
+        max_length=MAX_RECIPIENTS,
+    )
+    segment = serializers.CharField(
+        max_length=64,
+        required=False,
+        allow_null=True,
+        default=None,
+    )
+
+    def validate_segment(self, value):
+        if value is not None:
+            try:
+                get_segment(value)
+            except UnknownSegmentError as e:
+                raise serializers.ValidationError(str(e))
+        return value
+
+    def validate(self, attrs):
+        if bool(attrs["recipient_ids"]) == bool(attrs["segment"]):
+            raise serializers.ValidationError(
+                {"recipient_ids": "Pass either recipient_ids or segment"}
+            )
+        return attrs
@@ -1,10 +1,20 @@
 from dataclasses import dataclass
-from typing import Sequence
+from typing import Mapping, Sequence
 
 from django.db import transaction
 
 from notifications.models import Notification, NotificationLog
-from notifications.tasks import send_notification_task
+from notifications.tasks import (
+    expand_broadcast_task,
+    send_notification_batch_task,
+    send_notification_task,
+)
+from transaction_service.mongo import reserve_ids
+
+# notifications inserted per bulk_create round
+BULK_CREATE_CHUNK_SIZE = 1000
+# notification ids delivered per medium by one send_notification_batch_task
+TASK_CHUNK_SIZE = 500
 
 
 @dataclass
@@ -15,6 +25,15 @@ class NotificationCreateInput:
     channels: Sequence[str]
 
 
+@dataclass
+class BroadcastCreateInput:
+    title: str
+    body: str
+    channels: Sequence[str]
+    recipient_ids: Sequence[str] = ()
+    segment: str | None = None
+
+
 def create_notification_with_logs(payload: NotificationCreateInput) -> Notification:
     """
     Pure(ish) service: creates Notification + NotificationLog rows in a transaction.
@@ -43,8 +62,102 @@ def create_notification_with_logs(payload: NotificationCreateInput) -> Notificat
     return notification
 
 
+def create_notifications_bulk(
+    payloads: Sequence[NotificationCreateInput],
+    chunk_size: int = BULK_CREATE_CHUNK_SIZE,
+) -> list[int]:
+    """
+    Bulk counterpart of create_notification_with_logs: Notification and
+    NotificationLog rows are bulk_created `chunk_size` notifications at a time.
+    Notification ids are reserved up front, since djongo's bulk_create does
+    not return them, so the logs can reference their notification directly.
+    Returns the notification ids in payload order. Does NOT talk to Celery.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+
+    ids = []
+    for start in range(0, len(payloads), chunk_size):
+        chunk = payloads[start:start + chunk_size]
+        chunk_ids = reserve_ids(Notification, len(chunk))
+        if None in chunk_ids:
+            # no id sequence yet (empty, freshly migrated collection)
+            ids.extend(create_notification_with_logs(payload).id for payload in chunk)
+            continue
+
+        notifications = [
+            Notification(
+                id=notification_id,
+                user_id=payload.user_id,
+                title=payload.title,
+                body=payload.body,
+                channels=list(payload.channels),
+                status=Notification.Status.PENDING,
+            )
+            for notification_id, payload in zip(chunk_ids, chunk)
+        ]
+        logs = [
+            NotificationLog(
+                notification_id=notification_id,
+                medium=channel,
+                status=NotificationLog.Status.PENDING,
+                attempts=0,
+            )
+            for notification_id, payload in zip(chunk_ids, chunk)
+            for channel in payload.channels
+        ]
+        with transaction.atomic():
+            Notification.objects.bulk_create(notifications)
+            NotificationLog.objects.bulk_create(logs)
+        ids.extend(chunk_ids)
+    return ids
+
+
 def enqueue_notification(notification: Notification) -> None:
     """
     Thin wrapper around Celery makes it mockable in tests.
     """
     send_notification_task.delay(notification.id)
+
+
+def enqueue_notifications(
+    ids_by_medium: Mapping[str, Sequence[int]],
+    chunk_size: int = TASK_CHUNK_SIZE,
+) -> int:
+    """
+    Queue bulk-created notifications as send_notification_batch_task messages
+    of up to `chunk_size` ids each, per medium, so every chunk lands on its
+    medium's queue. Returns the number of tasks queued.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    tasks = 0
+    for medium, notification_ids in ids_by_medium.items():
+        for start in range(0, len(notification_ids), chunk_size):
+            send_notification_batch_task.delay(
+                list(notification_ids[start:start + chunk_size]), medium,
+            )
+            tasks += 1
+    return tasks
+
+
+def create_broadcast(payload: BroadcastCreateInput) -> Notification:
+    """
+    Store a broadcast's content and audience once. Its NotificationLog rows
+    are created later, page by page, by expand_broadcast_task.
+    Does NOT talk to Celery.
+    """
+    return Notification.objects.create(
+        kind=Notification.Kind.BROADCAST,
+        title=payload.title,
+        body=payload.body,
+        channels=list(payload.channels),
+        recipient_ids=[str(r) for r in payload.recipient_ids],
+        segment=payload.segment,
+        status=Notification.Status.PENDING,
+    )
+
+
+def enqueue_broadcast(notification: Notification) -> None:
+    """Start the fan-out at the first page of the audience."""
+    expand_broadcast_task.delay(notification.id)
@@ -1,20 +1,108 @@
+import logging
+from typing import Iterable
+
 from celery import shared_task
+from django.conf import settings
 from django.utils import timezone
+from pymongo import UpdateOne
 
+from notifications.async_senders import get_gateway_sender, run_async
+from notifications.batching import gather_batches
 from notifications.models import Notification, NotificationLog
+from notifications.segments import UnknownSegmentError, recipient_page
 from notifications.senders import get_sender_for_medium, UnknownMediumError
+from transaction_service.mongo import get_collection
+
+logger = logging.getLogger(__name__)
+
+
+# Logs still to deliver; FAILED ones are retried.
+UNSENT = [NotificationLog.Status.PENDING, NotificationLog.Status.FAILED]
+
+
+@shared_task
+def send_notification_task(notification_id: int):
+    """
+    Fan a notification out into one send_notification_medium_task per medium
+    that still has logs to deliver. Each medium task runs on its own queue
+    (notifications.<medium>, see notifications.routing), so a slow or failing
+    gateway neither delays nor re-runs the other mediums.
+    """
+    try:
+        notification = Notification.objects.get(id=notification_id)
+    except Notification.DoesNotExist:
+        return
+
+    mediums = sorted(set(
+        notification.logs.filter(status__in=UNSENT).values_list("medium", flat=True)
+    ))
+    if not mediums:
+        _settle_notification(notification)
+        return
+
+    notification.status = Notification.Status.PROCESSING
+    notification.save(update_fields=["status"])
+    for medium in mediums:
+        send_notification_medium_task.delay(notification_id, medium)
 
 
 @shared_task(bind=True, max_retries=3, default_retry_delay=10)
-def send_notification_task(self, notification_id: int):
+def send_notification_medium_task(self, notification_id: int, medium: str):
     """
-    Load the notification and its logs, send via medium-specific strategies.
+    Send one notification over one medium via its sender strategy.
 
-    - Uses Strategy Pattern (per-medium sender)
     - Skips logs already marked as SUCCESS (idempotent on retry)
-    - On first failure, marks log as FAILED and retries the task
+    - Unknown mediums are marked FAILED without retrying
+    - On failure, marks the log as FAILED and retries this medium only
     """
+    try:
+        deliver_medium(notification_id, medium)
+    except Exception as e:
+        raise self.retry(exc=e)
+
 
+@shared_task
+def send_notification_batch_task(notification_ids: list[int], medium: str):
+    """
+    Deliver one medium of a chunk of bulk-created notifications in one task.
+    The chunk's logs are sent in sender batches (concurrently when the medium
+    has an HTTP gateway); a notification whose send fails is handed to
+    send_notification_medium_task, so it is retried on its own without
+    re-sending the rest of the chunk.
+    """
+    notifications = Notification.objects.in_bulk(notification_ids)
+    if not notifications:
+        return
+    Notification.objects.filter(id__in=list(notifications)).update(
+        status=Notification.Status.PROCESSING,
+    )
+
+    logs = NotificationLog.objects.filter(
+        notification_id__in=list(notifications), medium=medium, status__in=UNSENT,
+    )
+    failures = _deliver_logs(
+        medium, ((notifications[log.notification_id], log) for log in logs.iterator()),
+    )
+    _settle_notifications(list(notifications))
+
+    for notification_id in sorted({notification.id for notification, _ in failures}):
+        logger.warning(
+            "Notification %s failed in %s batch, retrying individually",
+            notification_id,
+            medium,
+        )
+        send_notification_medium_task.apply_async(
+            (notification_id, medium),
+            countdown=send_notification_medium_task.default_retry_delay,
+        )
+
+
+def deliver_medium(notification_id: int, medium: str) -> None:
+    """
+    Send the unsent `medium` logs of one notification, then settle the
+    notification's status. Re-raises the first sender error after marking
+    its log FAILED.
+    """
     try:
         notification = Notification.objects.get(id=notification_id)
     except Notification.DoesNotExist:
@@ -23,56 +111,246 @@ def send_notification_task(self, notification_id: int):
     notification.status = Notification.Status.PROCESSING
     notification.save(update_fields=["status"])
 
-    logs = notification.logs.all()
+    logs = notification.logs.filter(medium=medium, status__in=UNSENT)
+    failures = _deliver_logs(medium, ((notification, log) for log in logs.iterator()))
+    _settle_notification(notification)
+    if failures:
+        raise failures[0][1]
 
-    for log in logs:
-        if log.status == NotificationLog.Status.SUCCESS:
-            continue
 
+def _deliver_logs(
+    medium: str, items: Iterable[tuple[Notification, NotificationLog]],
+) -> list[tuple[Notification, Exception]]:
+    """
+    Send (notification, log) pairs of one medium and record every attempt.
+
+    Pairs are gathered into batches of settings.NOTIFICATION_SEND_BATCH_SIZE,
+    cut early after NOTIFICATION_SEND_BATCH_LINGER seconds. Mediums with an
+    HTTP gateway (settings.NOTIFICATION_GATEWAYS) send each batch concurrently
+    through the async engine, the others through their sender's send_batch.
+    A batch's outcomes are written back with one bulk write. Unknown mediums
+    are marked FAILED and not reported (retrying cannot fix them); returns
+    the failed sends.
+    """
+    gateway = get_gateway_sender(medium)
+    sender = sender_error = None
+    if gateway is None:
         try:
-            sender = get_sender_for_medium(log.medium)
+            sender = get_sender_for_medium(medium)
         except UnknownMediumError as e:
-            log.status = NotificationLog.Status.FAILED
-            log.attempts += 1
-            log.last_attempt_at = timezone.now()
-            log.error_message = str(e)
-            log.save(
-                update_fields=["status", "attempts", "last_attempt_at", "error_message"]
-            )
+            sender_error = e
+
+    failures = []
+    batches = gather_batches(
+        items, settings.NOTIFICATION_SEND_BATCH_SIZE, settings.NOTIFICATION_SEND_BATCH_LINGER,
+    )
+    for batch in batches:
+        if gateway is not None:
+            outcomes = run_async(gateway.send_many(batch))
+        elif sender is not None:
+            outcomes = sender.send_batch(batch)
+        else:
+            _record_attempts([log for _, log in batch], [sender_error] * len(batch))
             continue
 
-        try:
-            sender.send(notification, log)
+        _record_attempts([log for _, log in batch], outcomes)
+        failures.extend(
+            (notification, error)
+            for (notification, _), error in zip(batch, outcomes)
+            if error is not None
+        )
+    return failures
+
+
+def _settled_status(counts: dict[str, int]) -> str | None:
+    """
+    The status a notification settles to given its log counts per status:
+    SENT when every log succeeded, FAILED when a log failed (or there are
+    none), None while mediums are pending.
+    """
+    if counts.get(NotificationLog.Status.PENDING):
+        return None
+    total_logs = sum(counts.values())
+    if total_logs and counts.get(NotificationLog.Status.SUCCESS, 0) == total_logs:
+        return Notification.Status.SENT
+    return Notification.Status.FAILED
+
+
+def _settle_notifications(notification_ids: list[int]) -> dict[int, str]:
+    """
+    Settle a chunk of notifications with one aggregation of their logs per
+    (notification, status) and one bulk write of the statuses that changed.
+    Returns the settled statuses by notification id.
+    """
+    counts = {notification_id: {} for notification_id in notification_ids}
+    for row in get_collection(NotificationLog).aggregate([
+        {"$match": {"notification_id": {"$in": notification_ids}}},
+        {"$group": {
+            "_id": {"notification": "$notification_id", "status": "$status"},
+            "logs": {"$sum": 1},
+        }},
+    ]):
+        counts[row["_id"]["notification"]][row["_id"]["status"]] = row["logs"]
+
+    now = timezone.now()
+    settled = {}
+    operations = []
+    for notification_id, by_status in counts.items():
+        status = _settled_status(by_status)
+        if status is None:
+            continue
+        settled[notification_id] = status
+        operations.append(UpdateOne(
+            {"id": notification_id}, {"$set": {"status": status, "updated_at": now}},
+        ))
+    if operations:
+        get_collection(Notification).bulk_write(operations, ordered=False)
+    return settled
+
+
+def _settle_notification(notification: Notification) -> None:
+    """_settle_notifications for a single notification, kept in sync in memory."""
+    status = _settle_notifications([notification.id]).get(notification.id)
+    if status is not None:
+        notification.status = status
 
+
+def _record_attempts(logs: list[NotificationLog], outcomes: list[Exception | None]) -> None:
+    """
+    Mark each log SUCCESS (outcome None) or FAILED with the outcome's message,
+    count the attempt, and write them all back in one unordered bulk_write.
+    """
+    now = timezone.now()
+    operations = []
+    for log, error in zip(logs, outcomes):
+        if error is None:
             log.status = NotificationLog.Status.SUCCESS
-            log.attempts += 1
-            log.last_attempt_at = timezone.now()
-            log.error_message = ""
-            log.save(
-                update_fields=["status", "attempts", "last_attempt_at", "error_message"]
-            )
-
-        except Exception as e:
+        else:
             log.status = NotificationLog.Status.FAILED
-            log.attempts += 1
-            log.last_attempt_at = timezone.now()
-            log.error_message = str(e)
-            log.save(
-                update_fields=["status", "attempts", "last_attempt_at", "error_message"]
-            )
-            raise self.retry(exc=e)
-
-    total_logs = notification.logs.count()
-    success_logs = notification.logs.filter(
-        status=NotificationLog.Status.SUCCESS
-    ).count()
-
-    if total_logs == 0:
+        log.attempts += 1
+        log.last_attempt_at = now
+        log.error_message = "" if error is None else str(error)
+        operations.append(UpdateOne(
+            {"id": log.id},
+            {
+                "$set": {
+                    "status": log.status,
+                    "last_attempt_at": now,
+                    "error_message": log.error_message,
+                },
+                "$inc": {"attempts": 1},
+            },
+        ))
+    if operations:
+        get_collection(NotificationLog).bulk_write(operations, ordered=False)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=10)
+def expand_broadcast_task(self, notification_id: int, cursor: str | None = None):
+    """
+    Expand one page of a broadcast's audience into per-recipient, per-medium
+    NotificationLog rows, queue their delivery and queue the next page.
+
+    The page's cursor must match the one stored on the notification, so a
+    redelivered message for an already expanded page does nothing; logs that
+    already exist for the page's recipients are not created twice.
+    """
+    try:
+        notification = Notification.objects.get(
+            id=notification_id, kind=Notification.Kind.BROADCAST,
+        )
+    except Notification.DoesNotExist:
+        return
+    if notification.fanout_complete or notification.fanout_cursor != cursor:
+        return
+
+    try:
+        recipients, next_cursor = recipient_page(
+            notification, cursor, settings.NOTIFICATION_BROADCAST_PAGE_SIZE,
+        )
+    except UnknownSegmentError as e:
+        logger.error("Broadcast %s cannot be expanded: %s", notification_id, e)
         notification.status = Notification.Status.FAILED
-    elif success_logs == total_logs:
+        notification.fanout_complete = True
+        notification.save(update_fields=["status", "fanout_complete", "updated_at"])
+        return
+
+    existing = set(
+        NotificationLog.objects.filter(
+            notification_id=notification_id, recipient_id__in=recipients,
+        ).values_list("recipient_id", "medium")
+    )
+    NotificationLog.objects.bulk_create([
+        NotificationLog(
+            notification_id=notification_id,
+            recipient_id=recipient,
+            medium=channel,
+            status=NotificationLog.Status.PENDING,
+            attempts=0,
+        )
+        for recipient in recipients
+        for channel in notification.channels
+        if (recipient, channel) not in existing
+    ])
+
+    notification.status = Notification.Status.PROCESSING
+    notification.fanout_cursor = next_cursor
+    notification.fanout_complete = next_cursor is None
+    notification.recipients_expanded += len(recipients)
+    notification.save(update_fields=[
+        "status", "fanout_cursor", "fanout_complete", "recipients_expanded", "updated_at",
+    ])
+
+    if recipients:
+        for channel in notification.channels:
+            send_broadcast_page_task.delay(notification_id, recipients, channel)
+    if next_cursor is not None:
+        expand_broadcast_task.delay(notification_id, next_cursor)
+    elif not recipients:
+        _settle_broadcast(notification)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=10)
+def send_broadcast_page_task(self, notification_id: int, recipient_ids: list[str], medium: str):
+    """
+    Deliver the unsent `medium` logs of one expanded page of a broadcast, on
+    that medium's queue. Every log of the page is attempted before the first
+    failure is retried; retries skip the logs already marked SUCCESS. The
+    last attempt settles the broadcast even when it fails.
+    """
+    try:
+        notification = Notification.objects.get(id=notification_id)
+    except Notification.DoesNotExist:
+        return
+
+    logs = NotificationLog.objects.filter(
+        notification_id=notification_id,
+        recipient_id__in=recipient_ids,
+        medium=medium,
+        status__in=UNSENT,
+    )
+    failures = _deliver_logs(medium, ((notification, log) for log in logs.iterator()))
+    if failures:
+        if self.request.retries >= self.max_retries:
+            # no retry left to settle the broadcast later
+            _settle_broadcast(notification)
+        raise self.retry(exc=failures[0][1])
+    _settle_broadcast(notification)
+
+
+def _settle_broadcast(notification: Notification) -> None:
+    """Mark a fully expanded broadcast SENT or FAILED once no log is pending."""
+    notification.refresh_from_db(fields=["fanout_complete", "recipients_expanded"])
+    logs = NotificationLog.objects.filter(notification_id=notification.id)
+    if not notification.fanout_complete or logs.filter(
+        status=NotificationLog.Status.PENDING
+    ).exists():
+        return
+
+    if notification.recipients_expanded and not logs.filter(
+        status=NotificationLog.Status.FAILED
+    ).exists():
         notification.status = Notification.Status.SENT
     else:
         notification.status = Notification.Status.FAILED
-
-    notification.updated_at = timezone.now()
     notification.save(update_fields=["status", "updated_at"])
@@ -0,0 +1,89 @@
+import asyncio
+import json
+
+import httpx
+from django.test import SimpleTestCase, override_settings
+
+from notifications import async_senders
+from notifications.async_senders import (
+    HttpGatewaySender,
+    get_gateway_sender,
+    run_async,
+)
+from notifications.models import Notification, NotificationLog
+
+
+def _items(count):
+    notification = Notification(id=1, user_id=42, title="Hi", body="Body")
+    return [
+        (notification, NotificationLog(id=i, notification_id=1, medium="sms"))
+        for i in range(count)
+    ]
+
+
+class HttpGatewaySenderTest(SimpleTestCase):
+    def test_send_many_returns_one_outcome_per_item(self):
+        received = []
+
+        def handler(request):
+            payload = json.loads(request.content)
+            received.append(payload)
+            return httpx.Response(500 if payload["reference"] == 1 else 202)
+
+        sender = HttpGatewaySender("http://gateway/send", transport=httpx.MockTransport(handler))
+        outcomes = run_async(sender.send_many(_items(3)))
+        run_async(sender.aclose())
+
+        self.assertIsNone(outcomes[0])
+        self.assertIsInstance(outcomes[1], httpx.HTTPStatusError)
+        self.assertIsNone(outcomes[2])
+        self.assertEqual(
+            received[0],
+            {"reference": 0, "medium": "sms", "recipient": 42, "title": "Hi", "body": "Body"},
+        )
+
+    def test_concurrency_limits_requests_in_flight(self):
+        in_flight = peak = 0
+
+        async def handler(request):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return httpx.Response(200)
+
+        sender = HttpGatewaySender(
+            "http://gateway/send", concurrency=3, transport=httpx.MockTransport(handler),
+        )
+        outcomes = run_async(sender.send_many(_items(10)))
+        run_async(sender.aclose())
+
+        self.assertEqual(outcomes, [None] * 10)
+        self.assertEqual(peak, 3)
+
+
+class GatewayRegistryTest(SimpleTestCase):
+    def setUp(self):
+        async_senders._GATEWAYS.clear()
+        self.addCleanup(async_senders._GATEWAYS.clear)
+
+    @override_settings(NOTIFICATION_GATEWAYS={
+        "sms": {"url": "http://gateway/sms", "concurrency": 7},
+        "email": {"url": None},
+    })
+    def test_only_mediums_with_a_url_get_a_gateway(self):
+        sms = get_gateway_sender("sms")
+        self.assertIsInstance(sms, HttpGatewaySender)
+        self.assertEqual((sms.url, sms.concurrency), ("http://gateway/sms", 7))
+        self.assertIs(get_gateway_sender("sms"), sms)
+        self.assertIsNone(get_gateway_sender("email"))
+        self.assertIsNone(get_gateway_sender("telegram"))
+
+    def test_run_async_reuses_the_process_loop(self):
+        loop = run_async(self._running_loop())
+        self.assertIs(run_async(self._running_loop()), loop)
+
+    @staticmethod
+    async def _running_loop():
+        return asyncio.get_running_loop()
@@ -0,0 +1,25 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from notifications.batching import gather_batches
+
+
+class GatherBatchesTest(SimpleTestCase):
+    def test_batches_are_cut_at_size(self):
+        self.assertEqual(
+            list(gather_batches(range(5), size=2)),
+            [[0, 1], [2, 3], [4]],
+        )
+        self.assertEqual(list(gather_batches([], size=2)), [])
+
+    def test_batches_are_cut_after_linger(self):
+        # the clock is read when a batch starts and after every item
+        ticks = iter([0.0, 0.1, 0.6, 1.0, 1.0, 1.2])
+        with patch("notifications.batching.time.monotonic", side_effect=lambda: next(ticks)):
+            batches = list(gather_batches(range(4), size=10, linger=0.5))
+        self.assertEqual(batches, [[0, 1], [2, 3]])
+
+    def test_size_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            list(gather_batches([1], size=0))
@@ -1,9 +1,10 @@
 from unittest.mock import patch
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from rest_framework.test import APIClient
 
 from notifications.models import Notification, NotificationLog
+from notifications.serializers import BroadcastCreateSerializer
 
 
 class NotificationSendAPITest(TestCase):
@@ -57,3 +58,106 @@ class NotificationSendAPITest(TestCase):
         response = self.client.post(self.url, payload, format="json")
         self.assertEqual(response.status_code, 400)
         self.assertIn("channels", response.json())
+
+
+class NotificationBatchSendAPITest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = "/api/notifications/send-batch/"
+
+    @patch("notifications.views.enqueue_notifications")
+    def test_creates_valid_items_and_reports_invalid_ones(self, mock_enqueue):
+        payload = {
+            "notifications": [
+                {"user_id": 1, "title": "A", "body": "a", "channels": ["sms", "email"]},
+                {"user_id": 2, "title": "B", "body": "b", "channels": ["invalid-medium"]},
+                {"user_id": 3, "title": "C", "body": "c", "channels": ["telegram"]},
+            ]
+        }
+
+        response = self.client.post(self.url, payload, format="json")
+
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertEqual(data["queued"], 2)
+        self.assertEqual([r["index"] for r in data["results"]], [0, 2])
+        self.assertEqual([e["index"] for e in data["errors"]], [1])
+        self.assertIn("channels", data["errors"][0]["errors"])
+
+        ids = [r["id"] for r in data["results"]]
+        self.assertEqual(
+            sorted(Notification.objects.values_list("user_id", flat=True)), ["1", "3"],
+        )
+        self.assertEqual(NotificationLog.objects.filter(notification_id=ids[0]).count(), 2)
+        self.assertEqual(
+            NotificationLog.objects.get(notification_id=ids[1]).medium, "telegram",
+        )
+        mock_enqueue.assert_called_once_with(
+            {"sms": [ids[0]], "email": [ids[0]], "telegram": [ids[1]]}
+        )
+
+    @patch("notifications.views.enqueue_notifications")
+    def test_all_invalid_items_return_400(self, mock_enqueue):
+        payload = {"notifications": [{"user_id": 1, "title": "A", "channels": ["sms"]}]}
+
+        response = self.client.post(self.url, payload, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("body", response.json()["errors"][0]["errors"])
+        self.assertEqual(Notification.objects.count(), 0)
+        mock_enqueue.assert_not_called()
+
+    def test_empty_batch_returns_400(self):
+        response = self.client.post(self.url, {"notifications": []}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("notifications", response.json())
+
+
+class NotificationBroadcastAPITest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = "/api/notifications/broadcast/"
+
+    @patch("notifications.views.enqueue_broadcast")
+    def test_stores_content_once_and_queues_fanout(self, mock_enqueue):
+        payload = {
+            "title": "Maintenance",
+            "body": "Tonight",
+            "channels": ["sms"],
+            "recipient_ids": ["1", "2", "3"],
+        }
+
+        response = self.client.post(self.url, payload, format="json")
+
+        self.assertEqual(response.status_code, 201)
+        notification = Notification.objects.get()
+        self.assertEqual(notification.kind, Notification.Kind.BROADCAST)
+        self.assertEqual(notification.recipient_ids, ["1", "2", "3"])
+        self.assertEqual(NotificationLog.objects.count(), 0)
+        mock_enqueue.assert_called_once_with(notification)
+
+    def test_recipient_list_is_capped(self):
+        payload = {
+            "title": "T",
+            "body": "B",
+            "channels": ["sms"],
+            "recipient_ids": [str(i) for i in range(BroadcastCreateSerializer.MAX_RECIPIENTS + 1)],
+        }
+        response = self.client.post(self.url, payload, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("recipient_ids", response.json())
+        self.assertEqual(Notification.objects.count(), 0)
+
+    @override_settings(NOTIFICATION_SEGMENTS={"merchants": "transactions.segments.merchants"})
+    def test_requires_exactly_one_audience(self):
+        base = {"title": "T", "body": "B", "channels": ["sms"]}
+        for extra in ({}, {"recipient_ids": ["1"], "segment": "merchants"}):
+            response = self.client.post(self.url, {**base, **extra}, format="json")
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("recipient_ids", response.json())
+
+        for name in ("nobody", "broken"):
+            with override_settings(NOTIFICATION_SEGMENTS={"broken": "notifications.nowhere"}):
+                response = self.client.post(self.url, {**base, "segment": name}, format="json")
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("segment", response.json())
@@ -1,9 +1,13 @@
+from unittest.mock import patch
+
 from django.test import TestCase
 
 from notifications.models import Notification, NotificationLog
 from notifications.services import (
     NotificationCreateInput,
     create_notification_with_logs,
+    create_notifications_bulk,
+    enqueue_notifications,
 )
 
 
@@ -32,3 +36,32 @@ class NotificationServiceTest(TestCase):
         for log in logs:
             self.assertEqual(log.status, NotificationLog.Status.PENDING)
             self.assertEqual(log.attempts, 0)
+
+    def test_create_notifications_bulk_in_chunks(self):
+        payloads = [
+            NotificationCreateInput(
+                user_id=i, title=f"T{i}", body="Body", channels=["sms", "email"],
+            )
+            for i in range(5)
+        ]
+
+        ids = create_notifications_bulk(payloads, chunk_size=2)
+
+        self.assertEqual(len(set(ids)), 5)
+        for i, notification_id in enumerate(ids):
+            notification = Notification.objects.get(id=notification_id)
+            self.assertEqual(notification.title, f"T{i}")
+            self.assertEqual(notification.status, Notification.Status.PENDING)
+            self.assertEqual(
+                sorted(notification.logs.values_list("medium", flat=True)), ["email", "sms"],
+            )
+        self.assertEqual(NotificationLog.objects.count(), 10)
+
+    @patch("notifications.services.send_notification_batch_task")
+    def test_enqueue_notifications_chunks_ids(self, mock_task):
+        queued = enqueue_notifications({"sms": [1, 2, 3], "email": [1]}, chunk_size=2)
+        self.assertEqual(queued, 3)
+        self.assertEqual(
+            [call.args for call in mock_task.delay.call_args_list],
+            [([1, 2], "sms"), ([3], "sms"), ([1], "email")],
+        )
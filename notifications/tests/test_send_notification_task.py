@@ -1,10 +1,25 @@
 from unittest.mock import Mock, patch
 
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase, override_settings
 
+from notifications.async_senders import AsyncMediumSender
 from notifications.models import Notification, NotificationLog
-from notifications.tasks import send_notification_task
-from notifications.senders import UnknownMediumError
+from notifications.tasks import (
+    expand_broadcast_task,
+    send_broadcast_page_task,
+    send_notification_batch_task,
+    send_notification_medium_task,
+    send_notification_task,
+)
+from notifications.routing import route_notification_task
+from notifications.senders import BaseMediumSender, UnknownMediumError
+
+
+def make_sender(side_effect=None):
+    """A real sender whose send is a Mock, so the default send_batch goes through it."""
+    class FakeSender(BaseMediumSender):
+        send = Mock(side_effect=side_effect)
+    return FakeSender()
 
 
 class SendNotificationTaskTest(TestCase):
@@ -27,15 +42,31 @@ class SendNotificationTaskTest(TestCase):
         ]
         return notification, logs
 
+    @patch("notifications.tasks.send_notification_medium_task.delay")
+    def test_dispatch_queues_one_task_per_medium(self, mock_delay):
+        notification, logs = self._create_notification_with_logs(["sms", "email"])
+
+        send_notification_task(notification.id)
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, Notification.Status.PROCESSING)
+        self.assertEqual(
+            [c.args for c in mock_delay.call_args_list],
+            [(notification.id, "email"), (notification.id, "sms")],
+        )
+
     @patch("notifications.tasks.get_sender_for_medium")
     def test_all_mediums_success_marks_notification_sent(self, mock_get_sender):
         notification, logs = self._create_notification_with_logs(["sms", "email"])
 
-        fake_sender = Mock()
-        fake_sender.send = Mock()
+        fake_sender = make_sender()
         mock_get_sender.return_value = fake_sender
 
-        send_notification_task(notification.id)
+        send_notification_medium_task(notification.id, "sms")
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, Notification.Status.PROCESSING)
+
+        send_notification_medium_task(notification.id, "email")
 
         notification.refresh_from_db()
         logs = list(notification.logs.order_by("medium"))
@@ -55,7 +86,7 @@ class SendNotificationTaskTest(TestCase):
             "notifications.tasks.get_sender_for_medium",
             side_effect=UnknownMediumError("Unsupported medium: unknown"),
         ):
-            send_notification_task(notification.id)
+            send_notification_medium_task(notification.id, "unknown")
 
         notification.refresh_from_db()
         log = notification.logs.get()
@@ -68,22 +99,24 @@ class SendNotificationTaskTest(TestCase):
         self.assertEqual(notification.status, Notification.Status.FAILED)
 
     @patch("notifications.tasks.get_sender_for_medium")
-    def test_sender_exception_marks_failed_and_raises_retry(self, mock_get_sender):
-        notification, logs = self._create_notification_with_logs(["sms"])
+    def test_sender_exception_retries_only_its_medium(self, mock_get_sender):
+        notification, logs = self._create_notification_with_logs(["sms", "email"])
 
-        fake_sender = Mock()
-        fake_sender.send.side_effect = RuntimeError("SMS gateway down")
+        fake_sender = make_sender(RuntimeError("SMS gateway down"))
         mock_get_sender.return_value = fake_sender
         with self.assertRaises(RuntimeError):
-            send_notification_task(notification.id)
+            send_notification_medium_task(notification.id, "sms")
 
-        notification.refresh_from_db()
-        log = notification.logs.get()
+        sms = notification.logs.get(medium="sms")
+        self.assertEqual(sms.status, NotificationLog.Status.FAILED)
+        self.assertEqual(sms.attempts, 1)
+        self.assertIsNotNone(sms.last_attempt_at)
+        self.assertIn("SMS gateway down", sms.error_message)
 
-        self.assertEqual(log.status, NotificationLog.Status.FAILED)
-        self.assertEqual(log.attempts, 1)
-        self.assertIsNotNone(log.last_attempt_at)
-        self.assertIn("SMS gateway down", log.error_message)
+        email = notification.logs.get(medium="email")
+        self.assertEqual(email.status, NotificationLog.Status.PENDING)
+        self.assertEqual(email.attempts, 0)
+        mock_get_sender.assert_called_once_with("sms")
 
     def test_no_logs_marks_notification_failed(self):
         notification = Notification.objects.create(
@@ -98,3 +131,196 @@ class SendNotificationTaskTest(TestCase):
 
         notification.refresh_from_db()
         self.assertEqual(notification.status, Notification.Status.FAILED)
+
+    @patch("notifications.tasks.get_sender_for_medium")
+    def test_batch_task_settles_the_chunk_in_one_pass(self, mock_get_sender):
+        done, _ = self._create_notification_with_logs(["sms"])
+        waiting, _ = self._create_notification_with_logs(["sms", "email"])
+        mock_get_sender.return_value = make_sender()
+
+        with patch("notifications.tasks._settle_notification") as mock_settle_one:
+            send_notification_batch_task([done.id, waiting.id], "sms")
+        mock_settle_one.assert_not_called()
+
+        done.refresh_from_db()
+        waiting.refresh_from_db()
+        self.assertEqual(done.status, Notification.Status.SENT)
+        # its email log is still pending
+        self.assertEqual(waiting.status, Notification.Status.PROCESSING)
+
+    @patch("notifications.tasks.send_notification_medium_task.apply_async")
+    @patch("notifications.tasks.get_sender_for_medium")
+    def test_batch_task_retries_failed_notifications_individually(
+        self, mock_get_sender, mock_apply_async,
+    ):
+        ok, _ = self._create_notification_with_logs(["sms"])
+        failing, _ = self._create_notification_with_logs(["sms"])
+
+        def send(notification, log):
+            if notification.id == failing.id:
+                raise RuntimeError("SMS gateway down")
+
+        fake_sender = make_sender(send)
+        mock_get_sender.return_value = fake_sender
+
+        send_notification_batch_task([ok.id, failing.id], "sms")
+
+        ok.refresh_from_db()
+        self.assertEqual(ok.status, Notification.Status.SENT)
+        self.assertEqual(failing.logs.get().status, NotificationLog.Status.FAILED)
+        mock_apply_async.assert_called_once()
+        self.assertEqual(mock_apply_async.call_args.args[0], (failing.id, "sms"))
+
+    @override_settings(NOTIFICATION_SEND_BATCH_SIZE=2)
+    @patch("notifications.tasks.get_sender_for_medium")
+    def test_batch_task_submits_provider_batches(self, mock_get_sender):
+        notifications = [self._create_notification_with_logs(["email"])[0] for _ in range(3)]
+
+        class BulkSender(BaseMediumSender):
+            batches = []
+
+            def send(self, notification, log):
+                raise AssertionError("send_batch should be used")
+
+            def send_batch(self, items):
+                self.batches.append([log.id for _, log in items])
+                return [None, RuntimeError("rejected")][:len(items)]
+
+        mock_get_sender.return_value = BulkSender()
+        with patch("notifications.tasks.send_notification_medium_task.apply_async") as mock_retry:
+            send_notification_batch_task([n.id for n in notifications], "email")
+
+        self.assertEqual([len(batch) for batch in BulkSender.batches], [2, 1])
+        logs = NotificationLog.objects.order_by("id")
+        self.assertEqual(
+            [(log.status, log.attempts) for log in logs],
+            [
+                (NotificationLog.Status.SUCCESS, 1),
+                (NotificationLog.Status.FAILED, 1),
+                (NotificationLog.Status.SUCCESS, 1),
+            ],
+        )
+        self.assertEqual(logs[1].error_message, "rejected")
+        mock_retry.assert_called_once()
+
+    @patch("notifications.tasks.send_notification_medium_task.apply_async")
+    @patch("notifications.tasks.get_gateway_sender")
+    def test_batch_task_sends_through_the_medium_gateway(
+        self, mock_get_gateway, mock_apply_async,
+    ):
+        ok, _ = self._create_notification_with_logs(["sms"])
+        failing, _ = self._create_notification_with_logs(["sms"])
+
+        class FakeGateway(AsyncMediumSender):
+            sent = []
+
+            async def send(self, notification, log):
+                if notification.id == failing.id:
+                    raise RuntimeError("SMS gateway down")
+                self.sent.append(log.id)
+
+        mock_get_gateway.return_value = FakeGateway()
+
+        with patch("notifications.tasks.get_sender_for_medium") as mock_get_sender:
+            send_notification_batch_task([ok.id, failing.id], "sms")
+        mock_get_sender.assert_not_called()
+
+        ok.refresh_from_db()
+        self.assertEqual(ok.status, Notification.Status.SENT)
+        self.assertEqual(FakeGateway.sent, [ok.logs.get().id])
+        self.assertEqual(failing.logs.get().error_message, "SMS gateway down")
+        self.assertEqual(mock_apply_async.call_args.args[0], (failing.id, "sms"))
+
+
+class NotificationRoutingTest(SimpleTestCase):
+    def test_medium_tasks_go_to_their_medium_queue(self):
+        self.assertEqual(
+            route_notification_task(
+                "notifications.tasks.send_notification_medium_task", (1, "sms"), {}, {},
+            ),
+            {"queue": "notifications.sms"},
+        )
+        self.assertEqual(
+            route_notification_task(
+                "notifications.tasks.send_broadcast_page_task",
+                (1, ["7"]), {"medium": "email"}, {},
+            ),
+            {"queue": "notifications.email"},
+        )
+        self.assertIsNone(
+            route_notification_task("notifications.tasks.send_notification_task", (1,), {}, {})
+        )
+
+
+@override_settings(NOTIFICATION_BROADCAST_PAGE_SIZE=2)
+class BroadcastFanoutTaskTest(TestCase):
+    def setUp(self):
+        self.notification = Notification.objects.create(
+            kind=Notification.Kind.BROADCAST,
+            title="Maintenance",
+            body="Tonight",
+            channels=["sms", "email"],
+            recipient_ids=["1", "2", "3"],
+        )
+
+    @patch("notifications.tasks.expand_broadcast_task.delay")
+    @patch("notifications.tasks.send_broadcast_page_task.delay")
+    def test_audience_is_expanded_page_by_page(self, mock_send, mock_expand):
+        expand_broadcast_task(self.notification.id)
+
+        self.assertEqual(NotificationLog.objects.count(), 4)
+        self.assertEqual(
+            [c.args for c in mock_send.call_args_list],
+            [(self.notification.id, ["1", "2"], "sms"), (self.notification.id, ["1", "2"], "email")],
+        )
+        mock_expand.assert_called_once_with(self.notification.id, "2")
+
+        # a redelivered first page is a no-op
+        expand_broadcast_task(self.notification.id)
+        self.assertEqual(NotificationLog.objects.count(), 4)
+
+        expand_broadcast_task(self.notification.id, "2")
+        self.notification.refresh_from_db()
+        self.assertTrue(self.notification.fanout_complete)
+        self.assertEqual(self.notification.recipients_expanded, 3)
+        self.assertEqual(
+            sorted(NotificationLog.objects.filter(recipient_id="3").values_list("medium", flat=True)),
+            ["email", "sms"],
+        )
+        self.assertEqual(mock_expand.call_count, 1)
+
+    @patch("notifications.tasks.get_sender_for_medium")
+    def test_last_delivered_page_settles_the_broadcast(self, mock_get_sender):
+        with patch("notifications.tasks.expand_broadcast_task.delay"), \
+                patch("notifications.tasks.send_broadcast_page_task.delay"):
+            expand_broadcast_task(self.notification.id)
+            expand_broadcast_task(self.notification.id, "2")
+        mock_get_sender.return_value = make_sender()
+
+        for medium in ("sms", "email"):
+            send_broadcast_page_task(self.notification.id, ["1", "2"], medium)
+        self.notification.refresh_from_db()
+        self.assertEqual(self.notification.status, Notification.Status.PROCESSING)
+
+        send_broadcast_page_task(self.notification.id, ["3"], "sms")
+        send_broadcast_page_task(self.notification.id, ["3"], "email")
+        self.notification.refresh_from_db()
+        self.assertEqual(self.notification.status, Notification.Status.SENT)
+        self.assertEqual(mock_get_sender.return_value.send.call_count, 6)
+
+    @patch("notifications.tasks.get_sender_for_medium")
+    def test_page_that_exhausts_its_retries_still_settles_the_broadcast(self, mock_get_sender):
+        with patch("notifications.tasks.expand_broadcast_task.delay"), \
+                patch("notifications.tasks.send_broadcast_page_task.delay"):
+            expand_broadcast_task(self.notification.id)
+            expand_broadcast_task(self.notification.id, "2")
+        senders = {"sms": make_sender(), "email": make_sender(RuntimeError("SMTP down"))}
+        mock_get_sender.side_effect = senders.get
+
+        send_broadcast_page_task(self.notification.id, ["1", "2", "3"], "sms")
+        result = send_broadcast_page_task.apply((self.notification.id, ["1", "2", "3"], "email"))
+
+        self.assertTrue(result.failed())
+        self.assertEqual(senders["email"].send.call_count, 3 * 4)
+        self.notification.refresh_from_db()
+        self.assertEqual(self.notification.status, Notification.Status.FAILED)
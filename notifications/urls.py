@@ -1,6 +1,10 @@
 from django.urls import path
 
-from notifications.views import NotificationSendAPIView
+from notifications.views import (
+    NotificationBatchSendAPIView,
+    NotificationBroadcastAPIView,
+    NotificationSendAPIView,
+)
 
 urlpatterns = [
     path(
@@ -8,4 +12,14 @@ urlpatterns = [
         NotificationSendAPIView.as_view(),
         name="notification-send",
     ),
+    path(
+        "send-batch/",
+        NotificationBatchSendAPIView.as_view(),
+        name="notification-send-batch",
+    ),
+    path(
+        "broadcast/",
+        NotificationBroadcastAPIView.as_view(),
+        name="notification-broadcast",
+    ),
 ]
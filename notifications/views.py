@@ -1,12 +1,23 @@
+from collections import defaultdict
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 
-from notifications.serializers import NotificationCreateSerializer
+from notifications.serializers import (
+    BroadcastCreateSerializer,
+    NotificationBatchCreateSerializer,
+    NotificationCreateSerializer,
+)
 from notifications.services import (
+    BroadcastCreateInput,
     NotificationCreateInput,
+    create_broadcast,
     create_notification_with_logs,
+    create_notifications_bulk,
+    enqueue_broadcast,
     enqueue_notification,
+    enqueue_notifications,
 )
 
 
@@ -44,3 +55,99 @@ class NotificationSendAPIView(APIView):
             "status": "queued",
         }
         return Response(response_data, status=status.HTTP_201_CREATED)
+
+
+class NotificationBatchSendAPIView(APIView):
+    """
+    POST /api/notifications/send-batch/
+
+    Body:
+    {
+      "notifications": [
+        {"user_id": "42", "title": "...", "body": "...", "channels": ["sms"]},
+        ...
+      ]
+    }
+
+    Valid items are bulk-inserted and queued in chunked Celery tasks; invalid
+    ones are reported by their position and skipped:
+    {
+      "status": "queued",
+      "queued": 2,
+      "results": [{"index": 0, "id": 17}, {"index": 2, "id": 18}],
+      "errors": [{"index": 1, "errors": {"channels": [...]}}]
+    }
+    Returns 400 when no item is valid.
+    """
+
+    def post(self, request, *args, **kwargs):
+        serializer = NotificationBatchCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        payloads, indexes, errors = [], [], []
+        for index, item in enumerate(serializer.validated_data["notifications"]):
+            item_serializer = NotificationCreateSerializer(data=item)
+            if not item_serializer.is_valid():
+                errors.append({"index": index, "errors": item_serializer.errors})
+                continue
+            data = item_serializer.validated_data
+            payloads.append(NotificationCreateInput(
+                user_id=data["user_id"],
+                title=data["title"],
+                body=data["body"],
+                channels=data["channels"],
+            ))
+            indexes.append(index)
+
+        if not payloads:
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        ids = create_notifications_bulk(payloads)
+        ids_by_medium = defaultdict(list)
+        for notification_id, payload in zip(ids, payloads):
+            for channel in dict.fromkeys(payload.channels):
+                ids_by_medium[channel].append(notification_id)
+        enqueue_notifications(ids_by_medium)
+
+        response_data = {
+            "status": "queued",
+            "queued": len(ids),
+            "results": [
+                {"index": index, "id": notification_id}
+                for index, notification_id in zip(indexes, ids)
+            ],
+            "errors": errors,
+        }
+        return Response(response_data, status=status.HTTP_201_CREATED)
+
+
+class NotificationBroadcastAPIView(APIView):
+    """
+    POST /api/notifications/broadcast/
+
+    Body:
+    {
+      "title": "Maintenance tonight",
+      "body": "The dashboard is offline 01:00-02:00.",
+      "channels": ["sms", "email"],
+      "segment": "merchants"            # or "recipient_ids": ["42", "7", ...]
+    }
+
+    Stores the content once and queues the fan-out, which expands the
+    audience into NotificationLog rows page by page. `segment` names a
+    resolver configured in settings.NOTIFICATION_SEGMENTS.
+    """
+
+    def post(self, request, *args, **kwargs):
+        serializer = BroadcastCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        payload = BroadcastCreateInput(**serializer.validated_data)
+        notification = create_broadcast(payload)
+        enqueue_broadcast(notification)
+
+        response_data = {
+            "id": notification.id,
+            "status": "queued",
+        }
+        return Response(response_data, status=status.HTTP_201_CREATED)
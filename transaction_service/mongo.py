@@ -0,0 +1,51 @@
+"""
+Raw pymongo access behind djongo.
+
+djongo translates ORM calls into Mongo queries, but aggregation pipelines,
+bulk writes and collection-level operations have no SQL equivalent. These
+helpers hand out the pymongo objects of the *current* Django connection, so
+they follow test databases and settings overrides like the ORM does.
+"""
+from django.db import connections, DEFAULT_DB_ALIAS
+from pymongo import ReturnDocument
+from pymongo.collection import Collection
+from pymongo.database import Database
+
+
+def get_database(using: str = DEFAULT_DB_ALIAS) -> Database:
+    """Return the pymongo Database behind the given Django connection."""
+    connection = connections[using]
+    connection.ensure_connection()
+    return connection.connection
+
+
+def get_collection(model_or_name, using: str = DEFAULT_DB_ALIAS) -> Collection:
+    """
+    Return the raw collection for a model class or a collection name.
+    """
+    if isinstance(model_or_name, str):
+        name = model_or_name
+    else:
+        name = model_or_name._meta.db_table
+    return get_database(using)[name]
+
+
+def reserve_ids(model, count: int, using: str = DEFAULT_DB_ALIAS) -> list:
+    """
+    Reserve `count` consecutive AutoField values for documents written with
+    raw pymongo, using the same `__schema__` sequence djongo's INSERT does.
+
+    Returns a list of ints, or a list of None when the collection has no
+    djongo-managed sequence (e.g. unmanaged models).
+    """
+    if count <= 0:
+        return []
+    schema = get_database(using)["__schema__"].find_one_and_update(
+        {"name": model._meta.db_table, "auto": {"$exists": True}},
+        {"$inc": {"auto.seq": count}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not schema:
+        return [None] * count
+    last = int(schema["auto"]["seq"])
+    return list(range(last - count + 1, last + 1))
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
 import os
+from datetime import date
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -132,4 +133,57 @@ CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://redis:6379/1
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
+# per-medium delivery tasks go to notifications.<medium> queues
+CELERY_TASK_ROUTES = ("notifications.routing.route_notification_task",)
 
+
+# Gregorian range covered by the in-memory Gregorian → Jalali lookup table
+# (transactions.utils.JalaliTable); dates outside it fall back to jdatetime.
+JALALI_TABLE_RANGE = (date(2000, 1, 1), date(2050, 12, 31))
+
+# Redis cache for rendered /api/transactions/summary/ responses; unset disables it.
+SUMMARY_CACHE_URL = os.getenv("SUMMARY_CACHE_URL")
+SUMMARY_CACHE_TTL = int(os.getenv("SUMMARY_CACHE_TTL", "300"))
+
+# Sub-day summary granularities to build and how many days their buckets are
+# kept (a TTL index on summary_transaction.expires_at drops older ones).
+# Also available: "quarter_hourly" and "five_minute".
+SUMMARY_SUBDAY_RETENTION_DAYS = {
+    "hourly": int(os.getenv("SUMMARY_HOURLY_RETENTION_DAYS", "30")),
+}
+
+# Raw `transaction` field (e.g. "payerId" or "cardHash") whose distinct values
+# are counted per bucket with HyperLogLog sketches (`type=unique` in the
+# summary API); unset disables the sketches.
+SUMMARY_UNIQUE_FIELD = os.getenv("SUMMARY_UNIQUE_FIELD") or None
+
+# Recipients expanded into NotificationLog rows per broadcast fan-out task.
+NOTIFICATION_BROADCAST_PAGE_SIZE = int(os.getenv("NOTIFICATION_BROADCAST_PAGE_SIZE", "1000"))
+
+# Broadcast segments besides those registered in notifications.segments:
+# "name=dotted.path.to.resolver" pairs, comma separated, e.g.
+# "merchants=transactions.segments.merchants" where merchant ids are also
+# notification recipient ids.
+NOTIFICATION_SEGMENTS = dict(
+    entry.strip().split("=", 1)
+    for entry in os.getenv("NOTIFICATION_SEGMENTS", "").split(",")
+    if entry.strip()
+)
+
+# HTTP gateways per notification medium. A medium with a URL is delivered
+# through the async engine (notifications.async_senders): messages are POSTed
+# concurrently, at most `concurrency` in flight per worker process, over pooled
+# keep-alive connections. Mediums without a URL keep their sync sender.
+NOTIFICATION_GATEWAYS = {
+    medium: {
+        "url": os.getenv(f"NOTIFICATION_{medium.upper()}_GATEWAY_URL") or None,
+        "concurrency": int(os.getenv(f"NOTIFICATION_{medium.upper()}_GATEWAY_CONCURRENCY", "50")),
+        "timeout": float(os.getenv("NOTIFICATION_GATEWAY_TIMEOUT", "10")),
+    }
+    for medium in ("sms", "email", "telegram")
+}
+
+# Logs handed to a sender's send_batch (or a gateway's send_many) at once; a
+# batch is also cut once its first log has waited LINGER seconds.
+NOTIFICATION_SEND_BATCH_SIZE = int(os.getenv("NOTIFICATION_SEND_BATCH_SIZE", "100"))
+NOTIFICATION_SEND_BATCH_LINGER = float(os.getenv("NOTIFICATION_SEND_BATCH_LINGER", "0.5"))
@@ -0,0 +1,239 @@
+"""
+Compact accumulator for the Python rebuild path.
+
+Transactions are folded into one slot per (merchant, day): merchants are
+interned to small ints, the slot key is a single int
+(merchant index << 32 | day ordinal) and the totals live in `array("q")`
+columns. A bucket therefore costs one int-keyed dict entry plus 16 bytes,
+instead of a tuple key and a {"amount", "count"} dict per granularity.
+Weekly, monthly and Jalali buckets are derived from the day slots when the
+rows are emitted, which is also how daily summary rows are rolled up into
+the coarser granularities (`add_totals`). With NumPy installed, `add_batch`
+groups whole blocks of transactions at once. Slots can also carry a
+HyperLogLog sketch of distinct values (see transactions.hll), merged into
+every bucket the slot falls in.
+"""
+from array import array
+from datetime import date, datetime
+
+from transactions.hll import HyperLogLog
+from transactions.utils import (
+    jalali_month_start,
+    jalali_week_number,
+    jalali_week_start,
+    jalali_ymd,
+    subday_bucket,
+)
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+# order of the buckets returned by calendar_buckets
+GRANULARITIES = ("daily", "weekly", "monthly", "jalali_weekly", "jalali_monthly")
+
+_DAY_BITS = 32
+_DAY_MASK = (1 << _DAY_BITS) - 1
+
+
+def calendar_buckets(day: date) -> tuple[tuple, ...]:
+    """(granularity, year, month, week, bucket start) of every granularity containing `day`."""
+    iso_year, iso_week, _ = day.isocalendar()
+    week_start = jalali_week_start(day)
+    j_week_year, j_week = jalali_week_number(week_start)
+    jy, jm, _ = jalali_ymd(day)
+    return (
+        ("daily", day.year, day.month, None, day),
+        ("weekly", iso_year, None, iso_week, date.fromisocalendar(iso_year, iso_week, 1)),
+        ("monthly", day.year, day.month, None, date(day.year, day.month, 1)),
+        ("jalali_weekly", j_week_year, None, j_week, week_start),
+        ("jalali_monthly", jy, jm, None, jalali_month_start(day)),
+    )
+
+
+class SummaryAccumulator:
+    def __init__(self):
+        self._merchant_index = {}
+        self._merchants = []
+        self._slots = {}
+        self.amounts = array("q")
+        self.counts = array("q")
+        self._sketches = {}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def merchant_index(self, merchant) -> int:
+        index = self._merchant_index.get(merchant)
+        if index is None:
+            index = self._merchant_index[merchant] = len(self._merchants)
+            self._merchants.append(merchant)
+        return index
+
+    def _fold(self, key: int, amount: int, count: int) -> int:
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = len(self.amounts)
+            self.amounts.append(amount)
+            self.counts.append(count)
+        else:
+            self.amounts[slot] += amount
+            self.counts[slot] += count
+        return slot
+
+    def _sketch(self, slot: int) -> HyperLogLog:
+        sketch = self._sketches.get(slot)
+        if sketch is None:
+            sketch = self._sketches[slot] = HyperLogLog()
+        return sketch
+
+    def add(self, merchant, day: date, amount: int, unique=None) -> None:
+        """Fold a single transaction; `unique` is its value of the distinct-count field."""
+        slot = self._fold(self.merchant_index(merchant) << _DAY_BITS | day.toordinal(), amount, 1)
+        if unique is not None:
+            self._sketch(slot).add(unique)
+
+    def add_totals(
+        self, merchant, day: date, amount: int, count: int, sketch: HyperLogLog | None = None,
+    ) -> None:
+        """Fold an already aggregated (merchant, day) total, e.g. a daily summary row."""
+        slot = self._fold(
+            self.merchant_index(merchant) << _DAY_BITS | day.toordinal(), amount, count,
+        )
+        if sketch is not None:
+            self._sketch(slot).merge(sketch)
+
+    def add_batch(self, merchants, ordinals, amounts, uniques=None) -> None:
+        """
+        Fold a block of transactions given as parallel sequences of merchant,
+        day ordinal and amount (and optionally distinct-count values). The
+        block is grouped by slot with NumPy first, so only one fold per
+        distinct (merchant, day) of the block remains.
+        """
+        if uniques is not None:
+            for merchant, ordinal, unique in zip(merchants, ordinals, uniques):
+                if unique is not None:
+                    key = self.merchant_index(merchant) << _DAY_BITS | ordinal
+                    self._sketch(self._fold(key, 0, 0)).add(unique)
+
+        if np is None:
+            for merchant, ordinal, amount in zip(merchants, ordinals, amounts):
+                self._fold(self.merchant_index(merchant) << _DAY_BITS | ordinal, amount, 1)
+            return
+
+        size = len(merchants)
+        if not size:
+            return
+        keys = np.fromiter(
+            (self.merchant_index(m) for m in merchants), dtype=np.int64, count=size,
+        )
+        keys <<= _DAY_BITS
+        keys |= np.asarray(ordinals, dtype=np.int64)
+
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        sums = np.add.reduceat(np.asarray(amounts, dtype=np.int64)[order], starts)
+        counts = np.diff(np.r_[starts, size])
+
+        for key, amount, count in zip(keys[starts].tolist(), sums.tolist(), counts.tolist()):
+            self._fold(key, amount, count)
+
+    def rows(self, granularities=None):
+        """
+        Summary row dicts for every granularity (or only those listed in
+        `granularities`), per merchant (merchant-less transactions under
+        merchant_id=None), derived from the day slots one granularity at a time.
+        """
+        buckets_by_day = {}
+        for key in self._slots:
+            ordinal = key & _DAY_MASK
+            if ordinal not in buckets_by_day:
+                buckets_by_day[ordinal] = calendar_buckets(date.fromordinal(ordinal))
+
+        for position in range(len(next(iter(buckets_by_day.values()), ()))):
+            if granularities is not None and GRANULARITIES[position] not in granularities:
+                continue
+            totals = {}
+            meta = {}
+            for key, slot in self._slots.items():
+                bucket = buckets_by_day[key & _DAY_MASK][position]
+                ref_ordinal = bucket[4].toordinal()
+                meta.setdefault(ref_ordinal, bucket)
+                bucket_key = key & ~_DAY_MASK | ref_ordinal
+                sketch = self._sketches.get(slot)
+                entry = totals.get(bucket_key)
+                if entry is None:
+                    totals[bucket_key] = [
+                        self.amounts[slot],
+                        self.counts[slot],
+                        sketch.copy() if sketch is not None else None,
+                    ]
+                else:
+                    entry[0] += self.amounts[slot]
+                    entry[1] += self.counts[slot]
+                    if sketch is not None:
+                        entry[2] = sketch.copy() if entry[2] is None else entry[2].merge(sketch)
+
+            for bucket_key, (amount, count, sketch) in totals.items():
+                granularity, year, month, week, ref_date = meta[bucket_key & _DAY_MASK]
+                yield {
+                    "granularity": granularity,
+                    "merchant_id": self._merchants[bucket_key >> _DAY_BITS],
+                    "date": ref_date,
+                    "hour": None,
+                    "minute": None,
+                    "year": year,
+                    "month": month,
+                    "week": week,
+                    "total_amount": amount,
+                    "total_count": count,
+                    "unique_sketch": sketch.to_bytes() if sketch is not None else None,
+                }
+
+
+class SubDayAccumulator:
+    """
+    Hourly / 5 / 15-minute buckets for transactions created at or after each
+    granularity's cutoff (the start of its retention window).
+    """
+
+    def __init__(self, cutoffs: dict[str, datetime]):
+        self.cutoffs = cutoffs
+        self._totals = {}
+
+    def add(
+        self, merchant, created_at: datetime, amount: int, count: int = 1, unique=None,
+    ) -> None:
+        for granularity, cutoff in self.cutoffs.items():
+            if created_at < cutoff:
+                continue
+            key = (granularity, merchant, *subday_bucket(created_at, granularity))
+            entry = self._totals.get(key)
+            if entry is None:
+                entry = self._totals[key] = [amount, count, None]
+            else:
+                entry[0] += amount
+                entry[1] += count
+            if unique is not None:
+                if entry[2] is None:
+                    entry[2] = HyperLogLog()
+                entry[2].add(unique)
+
+    def rows(self):
+        for key, (amount, count, sketch) in self._totals.items():
+            granularity, merchant, day, hour, minute = key
+            yield {
+                "granularity": granularity,
+                "merchant_id": merchant,
+                "date": day,
+                "hour": hour,
+                "minute": minute,
+                "year": day.year,
+                "month": day.month,
+                "week": None,
+                "total_amount": amount,
+                "total_count": count,
+                "unique_sketch": sketch.to_bytes() if sketch is not None else None,
+            }
@@ -0,0 +1,103 @@
+"""
+Redis cache for rendered summary API responses.
+
+Entries are keyed by the request parameters *and* the current summary
+generation. Anything that rewrites summary_transaction bumps the generation,
+so every older entry simply stops being addressed and expires via its TTL.
+Redis failures never fail a request: they count as misses.
+"""
+import hashlib
+import logging
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SummaryCache:
+    GENERATION_KEY = "summary:generation"
+    HITS_KEY = "summary:cache:hits"
+    MISSES_KEY = "summary:cache:misses"
+    ENTRY_PREFIX = "summary:cache:entry:"
+
+    def __init__(self, client, ttl: int):
+        self.client = client
+        self.ttl = ttl
+
+    def _generation(self) -> int:
+        return int(self.client.get(self.GENERATION_KEY) or 0)
+
+    def _entry_key(self, generation: int, params: tuple) -> str:
+        digest = hashlib.sha1(repr(params).encode()).hexdigest()
+        return f"{self.ENTRY_PREFIX}{generation}:{digest}"
+
+    def get(self, params: tuple) -> tuple[bytes | None, int | None]:
+        """
+        Return (cached body or None, generation read). Pass the generation to
+        set() so a body rendered from data read before a concurrent rebuild
+        is stored under the old generation, never under the new one.
+        """
+        try:
+            generation = self._generation()
+            body = self.client.get(self._entry_key(generation, params))
+            self.client.incr(self.HITS_KEY if body is not None else self.MISSES_KEY)
+            return body, generation
+        except redis.RedisError:
+            logger.warning("Summary cache unavailable on read", exc_info=True)
+            return None, None
+
+    def set(self, params: tuple, body: bytes, generation: int | None) -> None:
+        if generation is None:
+            return
+        try:
+            self.client.set(self._entry_key(generation, params), body, ex=self.ttl)
+        except redis.RedisError:
+            logger.warning("Summary cache unavailable on write", exc_info=True)
+
+    def bump_generation(self) -> None:
+        try:
+            self.client.incr(self.GENERATION_KEY)
+        except redis.RedisError:
+            # Entries of the old generation stay addressable until their TTL.
+            logger.error("Could not invalidate the summary cache", exc_info=True)
+
+    def stats(self) -> dict:
+        try:
+            hits, misses, generation = (
+                self.client.get(self.HITS_KEY),
+                self.client.get(self.MISSES_KEY),
+                self.client.get(self.GENERATION_KEY),
+            )
+        except redis.RedisError:
+            return {"enabled": True, "available": False}
+        return {
+            "enabled": True,
+            "available": True,
+            "hits": int(hits or 0),
+            "misses": int(misses or 0),
+            "generation": int(generation or 0),
+        }
+
+
+_summary_cache: SummaryCache | None = None
+
+
+def get_summary_cache() -> SummaryCache | None:
+    """The process-wide cache, or None when settings.SUMMARY_CACHE_URL is unset."""
+    global _summary_cache
+    url = getattr(settings, "SUMMARY_CACHE_URL", None)
+    if not url:
+        return None
+    if _summary_cache is None:
+        _summary_cache = SummaryCache(
+            redis.Redis.from_url(url),
+            ttl=getattr(settings, "SUMMARY_CACHE_TTL", 300),
+        )
+    return _summary_cache
+
+
+def invalidate_summary_cache() -> None:
+    cache = get_summary_cache()
+    if cache is not None:
+        cache.bump_generation()
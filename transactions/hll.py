@@ -0,0 +1,133 @@
+"""
+HyperLogLog sketches for approximate distinct counts per summary bucket.
+
+A sketch is PRECISION-bit bucketed: 2**PRECISION one-byte registers hold
+the longest run of leading zeros seen among the hashes routed to them
+(standard error about 1.04 / sqrt(2**PRECISION), ~1.6%). Sketches merge by
+taking the register-wise maximum, so weekly, monthly and platform-wide
+estimates are derived from the daily sketches exactly like the totals are.
+
+Stored form (`to_bytes`) is a 2-byte header (format, precision) followed by
+either every register (dense) or (uint16 index, uint8 value) triples for the
+non-zero ones (sparse), whichever is smaller. Values are hashed with
+blake2b, so sketches built by different processes are compatible.
+
+Rebuilds merge and decode a sketch per summary row, so the register-wide
+operations (merge, estimate, encode/decode) run as NumPy views over the
+register bytearray rather than Python loops over its 4096 bytes.
+"""
+import math
+from hashlib import blake2b
+
+import numpy as np
+
+PRECISION = 12
+REGISTERS = 1 << PRECISION
+
+_HASH_BITS = 64
+_VALUE_BITS = _HASH_BITS - PRECISION
+_VALUE_MASK = (1 << _VALUE_BITS) - 1
+_ALPHA = 0.7213 / (1 + 1.079 / REGISTERS)
+
+_DENSE = 0
+_SPARSE = 1
+_SPARSE_ENTRY = np.dtype([("index", ">u2"), ("rank", "u1")])
+
+# 2.0 ** -rank for every possible register value
+_INVERSE_POWERS = np.ldexp(1.0, -np.arange(256))
+
+
+def _hash(value) -> int:
+    data = value if isinstance(value, bytes) else str(value).encode()
+    return int.from_bytes(blake2b(data, digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    __slots__ = ("registers",)
+
+    def __init__(self, registers: bytearray | None = None):
+        self.registers = registers if registers is not None else bytearray(REGISTERS)
+
+    @classmethod
+    def of(cls, values) -> "HyperLogLog":
+        sketch = cls()
+        sketch.update(values)
+        return sketch
+
+    def add(self, value) -> None:
+        if value is None:
+            return
+        hashed = _hash(value)
+        index = hashed >> _VALUE_BITS
+        rank = _VALUE_BITS - (hashed & _VALUE_MASK).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values) -> None:
+        for value in values or ():
+            self.add(value)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """Fold `other` into this sketch (register-wise max); returns self."""
+        registers = np.frombuffer(self.registers, dtype=np.uint8)
+        np.maximum(registers, np.frombuffer(other.registers, dtype=np.uint8), out=registers)
+        return self
+
+    def copy(self) -> "HyperLogLog":
+        return HyperLogLog(bytearray(self.registers))
+
+    def estimate(self) -> int:
+        """Approximate number of distinct values added."""
+        zeros = self.registers.count(0)
+        if zeros == REGISTERS:
+            return 0
+        harmonic = _INVERSE_POWERS[np.frombuffer(self.registers, dtype=np.uint8)].sum()
+        raw = _ALPHA * REGISTERS * REGISTERS / harmonic
+        if raw <= 2.5 * REGISTERS:
+            # small-range correction (linear counting)
+            return round(REGISTERS * math.log(REGISTERS / zeros))
+        return round(raw)
+
+    def to_bytes(self) -> bytes:
+        registers = np.frombuffer(self.registers, dtype=np.uint8)
+        filled = np.flatnonzero(registers)
+        if len(filled) * _SPARSE_ENTRY.itemsize < REGISTERS:
+            entries = np.empty(len(filled), dtype=_SPARSE_ENTRY)
+            entries["index"] = filled
+            entries["rank"] = registers[filled]
+            return bytes((_SPARSE, PRECISION)) + entries.tobytes()
+        return bytes((_DENSE, PRECISION)) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data) -> "HyperLogLog":
+        """Decode a stored sketch; None or empty data gives an empty sketch."""
+        if not data:
+            return cls()
+        data = bytes(data)
+        kind, precision = data[0], data[1]
+        if precision != PRECISION:
+            raise ValueError(f"Sketch precision {precision} does not match {PRECISION}")
+        if kind == _DENSE:
+            return cls(bytearray(data[2:]))
+        if kind != _SPARSE:
+            raise ValueError(f"Unknown sketch format: {kind}")
+        entries = np.frombuffer(data, dtype=_SPARSE_ENTRY, offset=2)
+        registers = bytearray(REGISTERS)
+        np.frombuffer(registers, dtype=np.uint8)[entries["index"]] = entries["rank"]
+        return cls(registers)
+
+
+def merge_sketches(*sketches) -> bytes | None:
+    """Merge stored sketches (bytes or None); None if all of them are None."""
+    merged = None
+    for data in sketches:
+        if data is None:
+            continue
+        sketch = HyperLogLog.from_bytes(data)
+        merged = sketch if merged is None else merged.merge(sketch)
+    return merged.to_bytes() if merged is not None else None
+
+
+def estimate_sketch(data) -> int:
+    """Distinct-count estimate of a stored sketch; 0 without one."""
+    return HyperLogLog.from_bytes(data).estimate() if data else 0
@@ -0,0 +1,136 @@
+"""
+Index management for collections whose indexes are declared on Django models.
+
+djongo creates model indexes / unique constraints through migrations, but
+collections written with raw pymongo (e.g. the rebuild shadow collection)
+need them created explicitly, and nothing reports when they go missing.
+"""
+from dataclasses import dataclass
+
+from pymongo.errors import OperationFailure
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    name: str
+    keys: tuple[tuple[str, int], ...]
+    unique: bool = False
+    # TTL index: documents expire this many seconds after the indexed date
+    expire_after_seconds: int | None = None
+
+    def options(self) -> dict:
+        options = {"name": self.name, "unique": self.unique}
+        if self.expire_after_seconds is not None:
+            options["expireAfterSeconds"] = self.expire_after_seconds
+        return options
+
+
+@dataclass
+class IndexStatus:
+    name: str
+    state: str  # "ok" | "missing" | "mismatch" | "extra"
+    detail: str = ""
+    size_bytes: int | None = None
+    accesses: int | None = None
+
+
+def _column(model, field_name: str) -> str:
+    return model._meta.get_field(field_name).column
+
+
+def declared_indexes(model) -> list[IndexSpec]:
+    """
+    Indexes and unique constraints declared in `model.Meta`, as Mongo keys,
+    plus the Mongo-only IndexSpecs listed in `model.mongo_indexes`.
+    """
+    specs = []
+    for index in model._meta.indexes:
+        keys = []
+        for field_name in index.fields:
+            direction = -1 if field_name.startswith("-") else 1
+            keys.append((_column(model, field_name.lstrip("-")), direction))
+        specs.append(IndexSpec(index.name, tuple(keys)))
+    for constraint in model._meta.constraints:
+        fields = getattr(constraint, "fields", None)
+        if not fields:
+            continue
+        keys = tuple((_column(model, f), 1) for f in fields)
+        specs.append(IndexSpec(constraint.name, keys, unique=True))
+    specs.extend(getattr(model, "mongo_indexes", ()))
+    return specs
+
+
+def ensure_indexes(collection, model) -> list[str]:
+    """Create any declared index missing on `collection`; return created names."""
+    existing = collection.index_information()
+    created = []
+    for spec in declared_indexes(model):
+        if spec.name in existing:
+            continue
+        collection.create_index(list(spec.keys), **spec.options())
+        created.append(spec.name)
+    return created
+
+
+def _index_usage(collection) -> dict[str, int]:
+    try:
+        return {
+            row["name"]: int(row["accesses"]["ops"])
+            for row in collection.aggregate([{"$indexStats": {}}])
+        }
+    except OperationFailure:
+        return {}
+
+
+def _index_sizes(collection) -> dict[str, int]:
+    try:
+        return collection.database.command("collStats", collection.name).get("indexSizes", {})
+    except OperationFailure:
+        return {}
+
+
+def check_indexes(collection, model) -> list[IndexStatus]:
+    """Compare the indexes on `collection` with the ones declared on `model`."""
+    existing = collection.index_information()
+    usage = _index_usage(collection)
+    sizes = _index_sizes(collection)
+
+    report = []
+    declared = declared_indexes(model)
+    for spec in declared:
+        info = existing.get(spec.name)
+        if info is None:
+            report.append(IndexStatus(spec.name, "missing", f"keys={list(spec.keys)}"))
+            continue
+
+        actual_keys = tuple((k, int(d)) for k, d in info["key"])
+        actual_unique = bool(info.get("unique", False))
+        actual_ttl = info.get("expireAfterSeconds")
+        if actual_ttl is not None:
+            actual_ttl = int(actual_ttl)
+        if (actual_keys != spec.keys or actual_unique != spec.unique
+                or actual_ttl != spec.expire_after_seconds):
+            state = "mismatch"
+            detail = (
+                f"expected keys={list(spec.keys)} unique={spec.unique} "
+                f"ttl={spec.expire_after_seconds}, "
+                f"found keys={list(actual_keys)} unique={actual_unique} ttl={actual_ttl}"
+            )
+        else:
+            state, detail = "ok", ""
+        report.append(IndexStatus(
+            spec.name, state, detail,
+            size_bytes=sizes.get(spec.name),
+            accesses=usage.get(spec.name),
+        ))
+
+    declared_names = {spec.name for spec in declared}
+    for name in existing:
+        if name == "_id_" or name in declared_names:
+            continue
+        report.append(IndexStatus(
+            name, "extra", f"keys={existing[name]['key']}",
+            size_bytes=sizes.get(name),
+            accesses=usage.get(name),
+        ))
+    return report
@@ -0,0 +1,193 @@
+"""
+Lease lock serialising the summary writers.
+
+Full rebuilds swap summary_transaction out, incremental runs `$inc` past
+the checkpoint and re-rollups `$set` coarse buckets from the daily rows; all
+of them race the change-stream consumer, which also `$inc`s and advances the
+checkpoint. Each of them holds the `summary_writer` lease for as long as it
+runs, so only one writes at a time.
+
+The lease lives in the `summary_lock` collection with an expiry that a
+background thread renews every third of `ttl`; a crashed holder therefore
+blocks the others for at most `ttl` seconds. A writer waiting for the lease
+asks its holder to hand it over (`handoff_to`); the stream consumer honours
+that by pausing until the lease is free again. Once a renewal fails the
+lease is lost, and `check()`, which writers call before their visible
+writes, raises SummaryLockLost.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.utils import timezone
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from transaction_service.mongo import get_collection
+
+logger = logging.getLogger(__name__)
+
+LOCK_COLLECTION = "summary_lock"
+WRITER_LOCK = "summary_writer"
+
+# seconds between attempts while waiting for the lease
+POLL_INTERVAL = 1.0
+
+
+class SummaryLockBusy(Exception):
+    pass
+
+
+class SummaryLockLost(SummaryLockBusy):
+    pass
+
+
+class SummaryWriterLock:
+    """
+    Context manager holding the summary writer lease:
+
+        with SummaryWriterLock("rebuild", wait=60):
+            ...
+
+    Raises SummaryLockBusy on entry while another writer keeps the lease for
+    longer than `wait` seconds. `on_handoff` is called (from the renewer
+    thread) once another writer asks for the lease, `on_lost` once it is lost.
+    """
+
+    def __init__(
+        self,
+        role: str,
+        ttl: float = 60.0,
+        name: str = WRITER_LOCK,
+        wait: float = 0.0,
+        on_handoff=None,
+        on_lost=None,
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.wait = wait
+        self.on_handoff = on_handoff
+        self.on_lost = on_lost
+        self.owner = f"{role}@{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._renewer = None
+
+    def _claim(self) -> dict | None:
+        """Take or renew the lease; its document, or None while someone else holds it."""
+        now = timezone.now()
+        try:
+            return get_collection(LOCK_COLLECTION).find_one_and_update(
+                {"_id": self.name, "$or": [{"owner": self.owner}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=self.ttl)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # the lease exists, is live and belongs to someone else
+            return None
+
+    def acquire(self, wait: float | None = None, request_handoff: bool = True) -> None:
+        """
+        Take the lease, retrying for up to `wait` seconds (default: the
+        constructor's; `math.inf` waits forever) while another writer holds
+        it. With `request_handoff` that writer is asked to hand it over.
+        """
+        wait = self.wait if wait is None else wait
+        deadline = time.monotonic() + wait
+        collection = get_collection(LOCK_COLLECTION)
+        while self._claim() is None:
+            if time.monotonic() >= deadline:
+                holder = collection.find_one({"_id": self.name}) or {}
+                raise SummaryLockBusy(
+                    f"Summary writes are locked by {holder.get('owner')} "
+                    f"until {holder.get('expires_at')}; stop that writer or wait longer."
+                )
+            if request_handoff:
+                # first come, first served: an earlier request is kept
+                collection.update_one(
+                    {"_id": self.name, "handoff_to": None},
+                    {"$set": {"handoff_to": self.owner}},
+                )
+            time.sleep(POLL_INTERVAL)
+        collection.update_one(
+            {"_id": self.name, "handoff_to": self.owner}, {"$unset": {"handoff_to": ""}},
+        )
+
+        self.lost.clear()
+        self._stop.clear()
+        self._renewer = threading.Thread(target=self._renew, daemon=True)
+        self._renewer.start()
+
+    def _renew(self) -> None:
+        asked = False
+        while not self._stop.wait(self.ttl / 3):
+            lease = self._claim()
+            if lease is None:
+                logger.error("Lost the %s lease held by %s", self.name, self.owner)
+                self.lost.set()
+                if self.on_lost is not None:
+                    self.on_lost()
+                return
+            if lease.get("handoff_to") and not asked:
+                logger.info("%s asked for the %s lease", lease["handoff_to"], self.name)
+                asked = True
+                if self.on_handoff is not None:
+                    self.on_handoff()
+
+    def check(self, session=None) -> None:
+        """
+        Raise SummaryLockLost unless this process still holds a live lease.
+        The lease document is written, so inside a transaction (`session`) a
+        concurrent takeover conflicts with the caller's writes.
+        """
+        now = timezone.now()
+        result = get_collection(LOCK_COLLECTION).update_one(
+            {"_id": self.name, "owner": self.owner, "expires_at": {"$gt": now}},
+            {"$set": {"checked_at": now}},
+            session=session,
+        )
+        if self.lost.is_set() or not result.matched_count:
+            self.lost.set()
+            raise SummaryLockLost(f"{self.owner} no longer holds the {self.name} lease.")
+
+    def _stop_renewing(self) -> None:
+        self._stop.set()
+        if self._renewer is not None:
+            self._renewer.join()
+            self._renewer = None
+
+    def hand_over(self) -> str | None:
+        """
+        Pass the lease to the writer that asked for it, or release it when
+        nobody did; returns the new holder, if any.
+        """
+        self._stop_renewing()
+        lease = get_collection(LOCK_COLLECTION).find_one_and_update(
+            {"_id": self.name, "owner": self.owner, "handoff_to": {"$ne": None}},
+            [{"$set": {
+                "owner": "$handoff_to",
+                "expires_at": timezone.now() + timedelta(seconds=self.ttl),
+                "handoff_to": "$$REMOVE",
+            }}],
+            return_document=ReturnDocument.AFTER,
+        )
+        if lease is None:
+            self.release()
+            return None
+        return lease["owner"]
+
+    def release(self) -> None:
+        self._stop_renewing()
+        get_collection(LOCK_COLLECTION).delete_one({"_id": self.name, "owner": self.owner})
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from transaction_service.mongo import get_collection
+from transactions.indexes import check_indexes, ensure_indexes
+from transactions.models import SummaryTransaction
+
+
+class Command(BaseCommand):
+    help = "Report index health of summary_transaction (missing, mismatched, unused, size)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Create declared indexes that are missing.",
+        )
+
+    def handle(self, *args, **opts):
+        collection = get_collection(SummaryTransaction)
+
+        if opts["fix"]:
+            for name in ensure_indexes(collection, SummaryTransaction):
+                self.stdout.write(f"Created index {name}.")
+
+        report = check_indexes(collection, SummaryTransaction)
+        for status in report:
+            size = "-" if status.size_bytes is None else f"{status.size_bytes / 1024:.0f} KiB"
+            accesses = "-" if status.accesses is None else str(status.accesses)
+            line = f"{status.state:<9} {status.name:<32} size={size:<10} accesses={accesses}"
+            if status.detail:
+                line += f"  {status.detail}"
+            self.stdout.write(line)
+
+        problems = [s for s in report if s.state in ("missing", "mismatch")]
+        if problems:
+            raise CommandError(
+                f"{len(problems)} summary_transaction index(es) need attention; "
+                "run with --fix to create missing ones."
+            )
+        self.stdout.write(self.style.SUCCESS("summary_transaction indexes are healthy."))
@@ -1,7 +1,12 @@
-from django.core.management.base import BaseCommand
-from django.db import transaction as db_transaction
+import os
+from datetime import datetime
 
-from transactions.models import SummaryTransaction
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from transactions import partitions
+from transactions.locks import SummaryLockBusy, SummaryWriterLock
 from transactions.summary_service import SummaryService
 
 
@@ -9,18 +14,200 @@ class Command(BaseCommand):
     help = "Rebuild summary_transaction table with amount + count + per-merchant breakdown."
 
     def add_arguments(self, parser):
-        parser.add_argument("--truncate", action="store_true")
+        parser.add_argument(
+            "--truncate",
+            action="store_true",
+            help="Kept for compatibility: rebuilds always replace the live summaries atomically.",
+        )
+        parser.add_argument(
+            "--engine",
+            choices=SummaryService.ENGINES,
+            default=SummaryService.ENGINE_PIPELINE,
+            help="'pipeline' aggregates inside MongoDB; 'python' is the row-by-row reference path.",
+        )
+        parser.add_argument(
+            "--no-disk-use",
+            action="store_true",
+            help="Do not pass allowDiskUse to the aggregation pipelines.",
+        )
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Run both engines, report differing buckets and exit without writing.",
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Only fold transactions newer than the stored checkpoint into existing rows.",
+        )
+        parser.add_argument(
+            "--since",
+            help="Incremental run over transactions created at/after this ISO date or datetime.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Summary documents per insert_many while writing a full rebuild (default: 1000).",
+        )
+        parser.add_argument(
+            "--partition-by",
+            choices=partitions.STRATEGIES,
+            help="Split the rebuild into createdAt months or merchantId hash buckets "
+                 "and aggregate the partitions in parallel (pipeline engine only).",
+        )
+        parser.add_argument(
+            "--partitions",
+            type=int,
+            default=8,
+            help="Number of hash buckets for --partition-by merchant (default: 8).",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Worker processes for --partition-by (default: CPU count).",
+        )
+        parser.add_argument(
+            "--backend",
+            choices=partitions.BACKENDS,
+            default=partitions.BACKEND_PROCESS,
+            help="Run partitions in a local process pool or as Celery tasks.",
+        )
+        parser.add_argument(
+            "--wait",
+            type=float,
+            default=120.0,
+            help="Seconds to wait for the summary writer lease, asking the stream "
+                 "consumer to hand it over (default: 120; 0 fails right away).",
+        )
 
     def handle(self, *args, **opts):
-        if opts["truncate"]:
-            SummaryTransaction.objects.all().delete()
-            self.stdout.write("Existing summary records removed.")
+        allow_disk_use = not opts["no_disk_use"]
+
+        if opts["verify"]:
+            self._verify(allow_disk_use)
+            return
+
+        # one summary writer at a time: the stream consumer (watch_transactions)
+        # pauses and hands its lease over, another rebuild is waited for
+        try:
+            with SummaryWriterLock("rebuild_summaries", wait=opts["wait"]) as lock:
+                self._write(opts, allow_disk_use, lock.check)
+        except SummaryLockBusy as e:
+            raise CommandError(str(e))
+
+    def _write(self, opts, allow_disk_use: bool, fence):
+        if opts["incremental"] or opts["since"]:
+            self._incremental(self._parse_since(opts["since"]), allow_disk_use, fence)
+            return
+
+        if opts["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be at least 1.")
 
-        objects = SummaryService.rebuild_all_summaries()
+        if opts["partition_by"]:
+            self._partitioned(opts, allow_disk_use, fence)
+            return
 
-        self.stdout.write(f"Creating {len(objects)} summary documents...")
+        # Both engines are capped at the current high-water mark, so later
+        # incremental runs pick up exactly where this rebuild stopped.
+        mark = SummaryService.find_high_water_mark()
 
-        with db_transaction.atomic():
-            SummaryTransaction.objects.bulk_create(objects, batch_size=1000)
+        rows = SummaryService.iter_summary_rows(
+            engine=opts["engine"],
+            allow_disk_use=allow_disk_use,
+            upto=mark,
+        )
+
+        written = SummaryService.replace_all_summaries(
+            rows, chunk_size=opts["chunk_size"], fence=fence,
+        )
+
+        self.stdout.write(f"Wrote {written} summary documents.")
+
+        if mark is not None:
+            SummaryService.save_checkpoint(mark)
 
         self.stdout.write(self.style.SUCCESS("Summary rebuild complete."))
+
+    def _partitioned(self, opts, allow_disk_use: bool, fence):
+        if opts["engine"] != SummaryService.ENGINE_PIPELINE:
+            raise CommandError("--partition-by requires the pipeline engine.")
+        if opts["partitions"] < 1 or opts["workers"] < 1:
+            raise CommandError("--partitions and --workers must be at least 1.")
+
+        mark = SummaryService.find_high_water_mark()
+
+        def report(done, total, result):
+            self.stdout.write(
+                f"[{done}/{total}] {result['label']}: "
+                f"{result['rows']} rows in {result['seconds']}s"
+            )
+
+        written = SummaryService.rebuild_partitioned(
+            strategy=opts["partition_by"],
+            buckets=opts["partitions"],
+            workers=opts["workers"],
+            backend=opts["backend"],
+            allow_disk_use=allow_disk_use,
+            upto=mark,
+            on_progress=report,
+            fence=fence,
+        )
+
+        if mark is not None:
+            SummaryService.save_checkpoint(mark)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Partitioned summary rebuild complete ({written} rows upserted)."
+        ))
+
+    def _parse_since(self, value):
+        if not value:
+            return None
+        since = parse_datetime(value)
+        if since is None:
+            day = parse_date(value)
+            if day is None:
+                raise CommandError(f"Invalid --since value: {value!r}")
+            since = datetime(day.year, day.month, day.day)
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since, timezone.utc)
+        return since
+
+    def _incremental(self, since, allow_disk_use: bool, fence):
+        try:
+            stats = SummaryService.run_incremental(
+                since=since,
+                allow_disk_use=allow_disk_use,
+                fence=fence,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Folded {stats['transactions']} transactions into "
+            f"{stats['rows']} summary rows (checkpoint: {stats['checkpoint']})."
+        ))
+
+    def _verify(self, allow_disk_use: bool):
+        pipeline_rows = SummaryService.rebuild_all_summaries(
+            engine=SummaryService.ENGINE_PIPELINE,
+            allow_disk_use=allow_disk_use,
+        )
+        python_rows = SummaryService.rebuild_all_summaries(
+            engine=SummaryService.ENGINE_PYTHON,
+        )
+        mismatches = SummaryService.diff_summaries(pipeline_rows, python_rows)
+
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS(
+                f"Engines agree on {len(pipeline_rows)} summary buckets."
+            ))
+            return
+
+        for key in mismatches[:20]:
+            self.stdout.write(f"  mismatch: {key}")
+        self.stdout.write(self.style.ERROR(
+            f"{len(mismatches)} buckets differ between engines."
+        ))
@@ -0,0 +1,97 @@
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+from pymongo.errors import PyMongoError
+
+from transactions.locks import SummaryLockBusy, SummaryWriterLock
+from transactions.stream import SummaryStreamConsumer
+
+
+class Command(BaseCommand):
+    help = "Keep summary_transaction up to date from the transaction change stream."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Apply a micro-batch once this many inserts are buffered (default: 500).",
+        )
+        parser.add_argument(
+            "--max-wait",
+            type=float,
+            default=1.0,
+            help="Apply a non-empty micro-batch after this many seconds (default: 1.0).",
+        )
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            help="Exit after applying this many micro-batches.",
+        )
+
+    def handle(self, *args, **opts):
+        if opts["batch_size"] < 1 or opts["max_wait"] <= 0:
+            raise CommandError("--batch-size and --max-wait must be positive.")
+
+        consumer = SummaryStreamConsumer(
+            batch_size=opts["batch_size"],
+            max_wait=opts["max_wait"],
+            on_flush=self._report,
+        )
+        # another writer asking for the lock pauses the consumer; losing it stops it
+        consumer.lock = SummaryWriterLock(
+            "watch_transactions", on_handoff=consumer.pause, on_lost=consumer.stop,
+        )
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: consumer.stop())
+
+        try:
+            consumer.lock.acquire()
+            try:
+                self._watch_with_handoffs(consumer, opts["max_batches"])
+            finally:
+                consumer.lock.release()
+        except SummaryLockBusy as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS("Stopped watching transactions."))
+
+    def _watch_with_handoffs(self, consumer: SummaryStreamConsumer, max_batches: int | None):
+        lock = consumer.lock
+        while True:
+            self._watch(consumer, max_batches)
+            if lock.lost.is_set():
+                raise CommandError("Lost the summary writer lock; stopping.")
+            if not consumer.paused or consumer.stopping:
+                return
+
+            holder = lock.hand_over()
+            if holder is not None:
+                self.stdout.write(f"Handed the summary writer lock to {holder}; paused.")
+            # poll in short rounds so a stop signal is still honoured
+            while not consumer.stopping:
+                try:
+                    lock.acquire(wait=5.0, request_handoff=False)
+                    break
+                except SummaryLockBusy:
+                    continue
+            else:
+                return
+            consumer.resume()
+
+    def _watch(self, consumer: SummaryStreamConsumer, max_batches: int | None):
+        try:
+            consumer.open()
+        except ValueError as e:
+            raise CommandError(str(e))
+        except PyMongoError as e:
+            raise CommandError(f"Could not open the change stream (replica set required): {e}")
+
+        self.stdout.write("Watching transaction inserts...")
+        try:
+            consumer.run(max_batches=max_batches)
+        finally:
+            consumer.close()
+
+    def _report(self, documents: int, rows: int):
+        self.stdout.write(f"Applied {documents} transactions to {rows} summary rows.")
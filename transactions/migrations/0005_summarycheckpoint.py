@@ -0,0 +1,26 @@
+# Generated by Django 3.1.12 on 2026-10-18 20:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0004_auto_20251121_0636'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SummaryCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True)),
+                ('last_created_at', models.DateTimeField(blank=True, null=True)),
+                ('last_object_id', models.CharField(blank=True, max_length=64, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'summary_checkpoint',
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 3.1.12 on 2026-10-18 20:09
+
+import jdatetime
+from django.db import migrations, models
+
+# Frozen copy of the labels as of this migration; later changes to
+# transactions.utils must not alter what the backfill writes.
+JALALI_MONTH_NAMES = (
+    "فروردین", "اردیبهشت", "خرداد", "تیر", "مرداد", "شهریور",
+    "مهر", "آبان", "آذر", "دی", "بهمن", "اسفند",
+)
+
+
+def jalali_fields(granularity, ref_date, week):
+    j = jdatetime.date.fromgregorian(date=ref_date)
+    if granularity == 'daily':
+        key = f"{j.year:04d}/{j.month:02d}/{j.day:02d}"
+    elif granularity == 'weekly':
+        key = f"هفته {week if week is not None else 0} سال {j.year}"
+    else:
+        key = f"{JALALI_MONTH_NAMES[j.month - 1]} {j.year}"
+    return {
+        'jalali_key': key,
+        'jalali_year': j.year,
+        'jalali_month': j.month,
+        'jalali_day': j.day,
+    }
+
+
+def backfill_jalali_fields(apps, schema_editor):
+    SummaryTransaction = apps.get_model('transactions', 'SummaryTransaction')
+    for row in SummaryTransaction.objects.filter(jalali_key=None).iterator():
+        fields = jalali_fields(row.granularity, row.date, row.week)
+        SummaryTransaction.objects.filter(pk=row.pk).update(**fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0005_summarycheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='summarytransaction',
+            name='jalali_day',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='summarytransaction',
+            name='jalali_key',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='summarytransaction',
+            name='jalali_month',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='summarytransaction',
+            name='jalali_year',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_jalali_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.1.12 on 2026-10-18 20:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0006_summarytransaction_jalali_fields'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='summarytransaction',
+            name='granularity',
+            field=models.CharField(choices=[('daily', 'Daily'), ('weekly', 'Weekly'), ('monthly', 'Monthly'), ('jalali_weekly', 'Jalali weekly'), ('jalali_monthly', 'Jalali monthly')], max_length=20),
+        ),
+    ]
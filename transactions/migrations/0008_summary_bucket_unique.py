@@ -0,0 +1,49 @@
+# Generated by Django 3.1.12 on 2026-10-18 20:12
+
+import logging
+
+from django.db import migrations, models
+
+logger = logging.getLogger(__name__)
+
+
+def drop_duplicate_buckets(apps, schema_editor):
+    # Rebuilds before the shadow-collection swap could leave several rows per
+    # (granularity, merchantId, date); the unique index cannot be built over
+    # them. Keep the newest row of each bucket and drop the others. djongo's
+    # connection is the pymongo Database, so no application code is needed.
+    collection = schema_editor.connection.connection['summary_transaction']
+    duplicates = collection.aggregate([
+        {'$sort': {'_id': 1}},
+        {'$group': {
+            '_id': {'granularity': '$granularity', 'merchantId': '$merchantId', 'date': '$date'},
+            'ids': {'$push': '$_id'},
+        }},
+        {'$match': {'ids.1': {'$exists': True}}},
+    ], allowDiskUse=True)
+
+    buckets = removed = 0
+    for group in duplicates:
+        buckets += 1
+        removed += collection.delete_many({'_id': {'$in': group['ids'][:-1]}}).deleted_count
+    if buckets:
+        logger.warning(
+            'Removed %s duplicate rows from %s summary buckets; '
+            'run `manage.py rebuild_summaries` to recompute their totals.',
+            removed, buckets,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0007_jalali_granularities'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_buckets, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='summarytransaction',
+            constraint=models.UniqueConstraint(fields=('granularity', 'merchant_id', 'date'), name='summary_bucket_unique'),
+        ),
+    ]
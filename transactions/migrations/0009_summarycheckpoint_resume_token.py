@@ -0,0 +1,18 @@
+# Generated by Django 3.1.12 on 2026-10-18 20:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0008_summary_bucket_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='summarycheckpoint',
+            name='resume_token',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
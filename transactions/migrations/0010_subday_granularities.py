@@ -0,0 +1,51 @@
+# Generated by Django 3.1.12 on 2026-10-18 20:32
+
+from django.db import migrations, models
+
+
+def create_ttl_index(apps, schema_editor):
+    # Django cannot declare TTL indexes; the name matches
+    # SummaryTransaction.mongo_indexes so check_summary_indexes recognises it.
+    collection = schema_editor.connection.connection['summary_transaction']
+    collection.create_index(
+        [('expires_at', 1)], name='summary_expires_at_ttl', expireAfterSeconds=0,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0009_summarycheckpoint_resume_token'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='summarytransaction',
+            name='summary_bucket_unique',
+        ),
+        migrations.AddField(
+            model_name='summarytransaction',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='summarytransaction',
+            name='hour',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='summarytransaction',
+            name='minute',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='summarytransaction',
+            name='granularity',
+            field=models.CharField(choices=[('daily', 'Daily'), ('weekly', 'Weekly'), ('monthly', 'Monthly'), ('jalali_weekly', 'Jalali weekly'), ('jalali_monthly', 'Jalali monthly'), ('hourly', 'Hourly'), ('quarter_hourly', '15 minutes'), ('five_minute', '5 minutes')], max_length=20),
+        ),
+        migrations.AddConstraint(
+            model_name='summarytransaction',
+            constraint=models.UniqueConstraint(fields=('granularity', 'merchant_id', 'date', 'hour', 'minute'), name='summary_bucket_time_unique'),
+        ),
+        migrations.RunPython(create_ttl_index, migrations.RunPython.noop),
+    ]
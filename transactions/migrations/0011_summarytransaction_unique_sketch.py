@@ -0,0 +1,18 @@
+# Generated by Django 3.1.12 on 2026-10-18 20:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0010_subday_granularities'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='summarytransaction',
+            name='unique_sketch',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -1,5 +1,8 @@
 from djongo import models
 
+from transactions.indexes import IndexSpec
+from transactions.utils import jalali_fields, subday_expires_at
+
 
 class Transaction(models.Model):
     merchant_id = models.CharField(
@@ -23,13 +26,24 @@ class SummaryTransaction(models.Model):
         DAILY = "daily", "Daily"
         WEEKLY = "weekly", "Weekly"
         MONTHLY = "monthly", "Monthly"
+        # Jalali calendar buckets: Saturday-start weeks, Farvardin–Esfand months.
+        # year/month/week hold Jalali values for these rows.
+        JALALI_WEEKLY = "jalali_weekly", "Jalali weekly"
+        JALALI_MONTHLY = "jalali_monthly", "Jalali monthly"
+        # Sub-day buckets: hour/minute hold the bucket start within `date`,
+        # and expires_at drives their TTL retention.
+        HOURLY = "hourly", "Hourly"
+        QUARTER_HOURLY = "quarter_hourly", "15 minutes"
+        FIVE_MINUTE = "five_minute", "5 minutes"
 
     granularity = models.CharField(
-        max_length=10,
+        max_length=20,
         choices=Granularity.choices,
     )
 
     date = models.DateField()
+    hour = models.IntegerField(null=True, blank=True)
+    minute = models.IntegerField(null=True, blank=True)
 
     year = models.IntegerField()
     week = models.IntegerField(null=True, blank=True)
@@ -44,12 +58,77 @@ class SummaryTransaction(models.Model):
 
     total_amount = models.BigIntegerField(default=0)
     total_count = models.IntegerField(default=0)
+    # HyperLogLog sketch of settings.SUMMARY_UNIQUE_FIELD (transactions.hll).
+    unique_sketch = models.BinaryField(null=True, blank=True)
+
+    # Precomputed at write time; the API serves jalali_key as-is.
+    jalali_key = models.CharField(max_length=64, null=True, blank=True)
+    jalali_year = models.IntegerField(null=True, blank=True)
+    jalali_month = models.IntegerField(null=True, blank=True)
+    jalali_day = models.IntegerField(null=True, blank=True)
+
+    # Set on sub-day rows only; see settings.SUMMARY_SUBDAY_RETENTION_DAYS.
+    expires_at = models.DateTimeField(null=True, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Mongo-only indexes Django cannot declare (created by ensure_indexes).
+    mongo_indexes = (
+        IndexSpec("summary_expires_at_ttl", (("expires_at", 1),), expire_after_seconds=0),
+    )
+
     class Meta:
         db_table = "summary_transaction"
+        constraints = [
+            # Bucket identity, matched by the incremental $inc upserts. As a
+            # compound index it also serves every API read: equality on
+            # granularity + merchantId, sorted / ranged on date (then hour,
+            # minute for sub-day rows; both are null on daily and coarser ones).
+            models.UniqueConstraint(
+                fields=["granularity", "merchant_id", "date", "hour", "minute"],
+                name="summary_bucket_time_unique",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.granularity} – {self.date} – {self.total_amount}"
+
+    def fill_jalali_fields(self) -> None:
+        fields = jalali_fields(self.granularity, self.date, self.week, self.hour, self.minute)
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+    def save(self, *args, **kwargs):
+        if not self.jalali_key:
+            self.fill_jalali_fields()
+        if self.expires_at is None:
+            self.expires_at = subday_expires_at(
+                self.granularity, self.date, self.hour, self.minute,
+            )
+        super().save(*args, **kwargs)
+
+
+class SummaryCheckpoint(models.Model):
+    """
+    High-water mark of the last Transaction folded into summary_transaction.
+    (created_at, object_id) is the position in createdAt order, with `_id`
+    breaking ties between transactions created at the same instant.
+    `resume_token` is where the change-stream consumer picks up again.
+    """
+
+    name = models.CharField(max_length=64, unique=True)
+
+    last_created_at = models.DateTimeField(null=True, blank=True)
+    last_object_id = models.CharField(max_length=64, null=True, blank=True)
+
+    # `_data` of the last change-stream event applied by watch_transactions
+    resume_token = models.TextField(null=True, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "summary_checkpoint"
+
+    def __str__(self) -> str:
+        return f"{self.name} – {self.last_created_at} – {self.last_object_id}"
@@ -0,0 +1,202 @@
+"""
+Partitioned summary rebuilds.
+
+A full rebuild is split into independent slices of the `transaction`
+collection, by createdAt month or by a crc32 hash of merchantId. Each
+partition aggregates its own slice and `$inc`-upserts the rows into the
+rebuild shadow collection, so partitions can run in any order and on any
+worker: buckets that several partitions touch (a week spanning two
+months, the platform-wide rollups) simply add up.
+
+Partitions and high-water marks are plain JSON so they can be shipped to
+Celery workers as well as to a local process pool.
+"""
+import multiprocessing
+import time as _time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from transaction_service.mongo import get_collection, get_database
+from transactions.models import Transaction
+from transactions.pipelines import BUCKET_EXPRS, window_match
+from transactions.summary_service import SummaryService
+
+STRATEGY_MONTH = "month"
+STRATEGY_MERCHANT = "merchant"
+STRATEGIES = (STRATEGY_MONTH, STRATEGY_MERCHANT)
+
+BACKEND_PROCESS = "process"
+BACKEND_CELERY = "celery"
+BACKENDS = (BACKEND_PROCESS, BACKEND_CELERY)
+
+# merchantId values stored as "no merchant" (see pipelines.MERCHANT_EXPR);
+# `$in` on None also matches documents without the field.
+_MISSING_MERCHANTS = [None, "", 0, False]
+
+
+def encode_mark(mark: tuple | None) -> list | None:
+    if mark is None:
+        return None
+    created_at, object_id = mark
+    return [created_at.isoformat(), SummaryService._encode_object_id(object_id)]
+
+
+def decode_mark(payload: list | None) -> tuple | None:
+    if payload is None:
+        return None
+    created_at, object_id = payload
+    return datetime.fromisoformat(created_at), SummaryService._decode_object_id(object_id)
+
+
+def merchant_bucket(merchant_id, buckets: int) -> int:
+    """Stable partition index of a merchantId; merchant-less rows go to 0."""
+    if merchant_id in _MISSING_MERCHANTS:
+        return 0
+    return zlib.crc32(str(merchant_id).encode()) % buckets
+
+
+def _month_partitions(upto: tuple | None) -> list[dict]:
+    months = get_collection(Transaction).aggregate([
+        {"$match": window_match(upto=upto)},
+        {"$group": {"_id": BUCKET_EXPRS["monthly"]}},
+        {"$sort": {"_id": 1}},
+    ], allowDiskUse=True)
+    return [
+        {"label": row["_id"].strftime("%Y-%m"), "month": row["_id"].strftime("%Y-%m-%d")}
+        for row in months
+    ]
+
+
+def _merchant_partitions(upto: tuple | None, buckets: int) -> list[dict]:
+    merchants = [[] for _ in range(buckets)]
+    cursor = get_collection(Transaction).aggregate([
+        {"$match": window_match(upto=upto)},
+        {"$group": {"_id": "$merchantId"}},
+    ], allowDiskUse=True)
+    for row in cursor:
+        merchant_id = row["_id"]
+        if merchant_id in _MISSING_MERCHANTS:
+            continue
+        merchants[merchant_bucket(merchant_id, buckets)].append(merchant_id)
+
+    plan = []
+    for index, ids in enumerate(merchants):
+        # bucket 0 also carries the merchant-less transactions (rollups only)
+        if not ids and index != 0:
+            continue
+        plan.append({
+            "label": f"merchants {index + 1}/{buckets}",
+            "merchants": ids,
+            "include_missing": index == 0,
+        })
+    return plan
+
+
+def plan_partitions(strategy: str, upto: tuple | None = None, buckets: int = 8) -> list[dict]:
+    """Split the transactions at or below `upto` into independent partitions."""
+    if strategy == STRATEGY_MONTH:
+        return _month_partitions(upto)
+    if strategy == STRATEGY_MERCHANT:
+        if buckets < 1:
+            raise ValueError("Merchant partitioning needs at least one bucket")
+        return _merchant_partitions(upto, buckets)
+    raise ValueError(f"Unknown partition strategy: {strategy}")
+
+
+def partition_match(partition: dict, upto: tuple | None = None) -> dict:
+    """Transaction filter selecting exactly the rows of `partition`."""
+    clauses = [window_match(upto=upto)]
+    if "month" in partition:
+        start = datetime.fromisoformat(partition["month"])
+        end = start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+        clauses.append({"createdAt": {"$gte": start, "$lt": end}})
+    else:
+        merchants = list(partition["merchants"])
+        if partition.get("include_missing"):
+            merchants += _MISSING_MERCHANTS
+        clauses.append({"merchantId": {"$in": merchants}})
+    return {"$and": clauses}
+
+
+def run_partition(
+    partition: dict,
+    upto: list | None,
+    shadow_name: str,
+    allow_disk_use: bool = True,
+) -> dict:
+    """Aggregate one partition and `$inc` it into `shadow_name`."""
+    started = _time.monotonic()
+    rows = SummaryService._aggregate_rows(
+        partition_match(partition, decode_mark(upto)),
+        allow_disk_use=allow_disk_use,
+    )
+    written = SummaryService.apply_increments(
+        rows,
+        collection=get_database()[shadow_name],
+        invalidate=False,
+    )
+    return {
+        "label": partition["label"],
+        "rows": written,
+        "seconds": round(_time.monotonic() - started, 3),
+    }
+
+
+def _init_worker() -> None:
+    # spawned interpreters start without Django configured
+    import django
+
+    django.setup()
+
+
+def _run_in_processes(plan, upto, shadow_name, workers, allow_disk_use):
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=context, initializer=_init_worker,
+    ) as pool:
+        futures = [
+            pool.submit(run_partition, partition, upto, shadow_name, allow_disk_use)
+            for partition in plan
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def _run_in_celery(plan, upto, shadow_name, allow_disk_use, poll_interval=1.0):
+    from transactions.tasks import rebuild_summary_partition_task
+
+    pending = [
+        rebuild_summary_partition_task.delay(partition, upto, shadow_name, allow_disk_use)
+        for partition in plan
+    ]
+    while pending:
+        for result in [r for r in pending if r.ready()]:
+            pending.remove(result)
+            yield result.get()
+        if pending:
+            _time.sleep(poll_interval)
+
+
+def run_partitions(
+    plan: list[dict],
+    upto: tuple | None,
+    shadow_name: str,
+    workers: int = 1,
+    backend: str = BACKEND_PROCESS,
+    allow_disk_use: bool = True,
+):
+    """
+    Run every partition of `plan`, yielding each result as it completes.
+    One worker with the process backend runs the partitions in this process.
+    """
+    payload = encode_mark(upto)
+    if backend == BACKEND_CELERY:
+        yield from _run_in_celery(plan, payload, shadow_name, allow_disk_use)
+    elif backend != BACKEND_PROCESS:
+        raise ValueError(f"Unknown partition backend: {backend}")
+    elif workers <= 1:
+        for partition in plan:
+            yield run_partition(partition, payload, shadow_name, allow_disk_use)
+    else:
+        yield from _run_in_processes(plan, payload, shadow_name, workers, allow_disk_use)
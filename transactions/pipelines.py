@@ -0,0 +1,237 @@
+"""
+MongoDB aggregation pipelines used to build summary_transaction rows.
+
+The daily pipeline groups the raw `transaction` collection server-side and
+emits one document per (merchant, day), so only grouped rows travel over
+the wire; SummaryService derives every coarser granularity from those. The
+merchant ranking pipeline at the bottom reads `summary_transaction` itself.
+"""
+from datetime import datetime
+
+# Mirrors the Python path: a falsy merchantId (missing, null, "", 0)
+# is stored as None, anything else as a string.
+MERCHANT_EXPR = {
+    "$let": {
+        "vars": {"m": {"$ifNull": ["$merchantId", None]}},
+        "in": {
+            "$cond": [
+                {"$in": ["$$m", [None, "", 0, False]]},
+                None,
+                {"$toString": "$$m"},
+            ]
+        },
+    }
+}
+
+AMOUNT_EXPR = {"$toLong": {"$ifNull": ["$amount", 0]}}
+
+# distinct values carried per document by the unique-count pipelines
+UNIQUE_CHUNK_SIZE = 10_000
+
+BUCKET_EXPRS = {
+    "daily": {"$dateTrunc": {"date": "$createdAt", "unit": "day"}},
+    "monthly": {"$dateTrunc": {"date": "$createdAt", "unit": "month"}},
+}
+
+
+def window_match(after=None, upto=None, since=None) -> dict:
+    """
+    Filter selecting transactions inside a (createdAt, _id) window.
+
+    after: exclusive lower mark (created_at, object_id)
+    upto:  inclusive upper mark (created_at, object_id)
+    since: inclusive lower bound on createdAt alone
+    """
+    clauses = [{"createdAt": {"$ne": None}}]
+    if since is not None:
+        clauses.append({"createdAt": {"$gte": since}})
+    if after is not None:
+        created_at, object_id = after
+        clauses.append({"$or": [
+            {"createdAt": {"$gt": created_at}},
+            {"createdAt": created_at, "_id": {"$gt": object_id}},
+        ]})
+    if upto is not None:
+        created_at, object_id = upto
+        clauses.append({"$or": [
+            {"createdAt": {"$lt": created_at}},
+            {"createdAt": created_at, "_id": {"$lte": object_id}},
+        ]})
+    if len(clauses) == 1:
+        return clauses[0]
+    return {"$and": clauses}
+
+
+def _group_stages(bucket: dict, unique_field: str | None) -> list[dict]:
+    """
+    Stages grouping the matched transactions into `bucket`, giving
+    {_id: bucket fields, total_amount, total_count[, uniques]}.
+
+    Distinct values are not gathered with one `$addToSet` per bucket, which a
+    busy bucket could push past the 16 MB document limit: they are grouped
+    out server-side, numbered within their bucket, and every
+    UNIQUE_CHUNK_SIZE of them form one output document. A bucket may
+    therefore span several documents whose totals add up.
+    """
+    totals = {"total_amount": {"$sum": AMOUNT_EXPR}, "total_count": {"$sum": 1}}
+    if not unique_field:
+        return [{"$group": {"_id": bucket, **totals}}]
+    chunk = {"$floor": {"$divide": [{"$subtract": ["$position", 1]}, UNIQUE_CHUNK_SIZE]}}
+    return [
+        {"$group": {"_id": {"bucket": bucket, "value": f"${unique_field}"}, **totals}},
+        {
+            "$setWindowFields": {
+                "partitionBy": "$_id.bucket",
+                "sortBy": {"_id.value": 1},
+                "output": {"position": {"$documentNumber": {}}},
+            }
+        },
+        {
+            "$group": {
+                "_id": {"$mergeObjects": ["$_id.bucket", {"chunk": chunk}]},
+                "total_amount": {"$sum": "$total_amount"},
+                "total_count": {"$sum": "$total_count"},
+                "uniques": {"$push": "$_id.value"},
+            }
+        },
+    ]
+
+
+def build_daily_pipeline(match: dict | None = None, unique_field: str | None = None) -> list[dict]:
+    """
+    Pipeline grouping raw transactions into daily buckets per merchant.
+    `match` restricts the input (see window_match); defaults to all rows.
+    Coarser granularities are derived from these rows, never from raw data;
+    the rows come sorted by merchant so that can happen one merchant at a time.
+    With `unique_field`, each bucket also lists its distinct values of that
+    field, to be folded into a HyperLogLog sketch; a bucket with many of them
+    comes as several consecutive documents (see _group_stages).
+
+    Output documents, ordered by (merchant_id, date):
+        {merchant_id, date, total_amount, total_count[, uniques]}
+    """
+    if match is None:
+        match = window_match()
+    bucket = {"merchant": MERCHANT_EXPR, "date": BUCKET_EXPRS["daily"]}
+    return [
+        {"$match": match},
+        *_group_stages(bucket, unique_field),
+        {
+            "$project": {
+                "_id": 0,
+                "merchant_id": "$_id.merchant",
+                "date": "$_id.date",
+                "total_amount": 1,
+                "total_count": 1,
+                **({"uniques": 1} if unique_field else {}),
+            }
+        },
+        {"$sort": {"merchant_id": 1, "date": 1}},
+    ]
+
+
+def build_subday_pipeline(
+    granularity: str,
+    minutes: int,
+    match: dict,
+    unique_field: str | None = None,
+) -> list[dict]:
+    """
+    Pipeline grouping raw transactions into `minutes`-wide buckets per merchant
+    (60 for hourly). Sub-day buckets are kept for a limited time only, so
+    callers restrict `match` to the retention window. With `unique_field`,
+    a bucket may come as several documents, ordered by (merchant_id, start).
+
+    Output documents:
+        {granularity, merchant_id, start, total_amount, total_count[, uniques]}
+    """
+    if minutes == 60:
+        bucket = {"$dateTrunc": {"date": "$createdAt", "unit": "hour"}}
+    else:
+        bucket = {"$dateTrunc": {"date": "$createdAt", "unit": "minute", "binSize": minutes}}
+    pipeline = [
+        {"$match": match},
+        *_group_stages({"merchant": MERCHANT_EXPR, "start": bucket}, unique_field),
+        {
+            "$project": {
+                "_id": 0,
+                "granularity": {"$literal": granularity},
+                "merchant_id": "$_id.merchant",
+                "start": "$_id.start",
+                "total_amount": 1,
+                "total_count": 1,
+                **({"uniques": 1} if unique_field else {}),
+            }
+        },
+    ]
+    if unique_field:
+        pipeline.append({"$sort": {"merchant_id": 1, "start": 1}})
+    return pipeline
+
+
+def build_merchant_ranking_pipeline(
+    granularity: str,
+    value_field: str,
+    merchant_ids: list[str] | None = None,
+    top: int | None = None,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+) -> list[dict]:
+    """
+    Pipeline over summary_transaction ranking merchants by the sum of
+    `value_field` over the window, either among `merchant_ids` or among all
+    merchants (rollup rows excluded), keeping the first `top`.
+
+    The ranking groups totals only; the per-bucket series is then fetched
+    with a `$lookup` for the surviving merchants, so a top-N query never
+    carries the series of merchants it discards.
+
+    Output documents, best first:
+        {merchant_id, total, points: [{key, value}, ...]}
+    """
+    bucket_match = {"granularity": granularity}
+    if date_from is not None or date_to is not None:
+        bucket_match["date"] = {}
+        if date_from is not None:
+            bucket_match["date"]["$gte"] = date_from
+        if date_to is not None:
+            bucket_match["date"]["$lte"] = date_to
+
+    if merchant_ids:
+        merchant_match = {"merchantId": {"$in": list(merchant_ids)}}
+    else:
+        merchant_match = {"merchantId": {"$ne": None}}
+
+    pipeline = [
+        {"$match": {**bucket_match, **merchant_match}},
+        {"$group": {"_id": "$merchantId", "total": {"$sum": f"${value_field}"}}},
+        {"$sort": {"total": -1, "_id": 1}},
+    ]
+    if top is not None:
+        pipeline.append({"$limit": top})
+
+    series_match = [
+        {"$eq": ["$merchantId", "$$merchant"]},
+        {"$eq": ["$granularity", granularity]},
+    ]
+    if date_from is not None:
+        series_match.append({"$gte": ["$date", date_from]})
+    if date_to is not None:
+        series_match.append({"$lte": ["$date", date_to]})
+
+    pipeline += [
+        {
+            "$lookup": {
+                "from": "summary_transaction",
+                "let": {"merchant": "$_id"},
+                "pipeline": [
+                    {"$match": {"$expr": {"$and": series_match}}},
+                    {"$sort": {"date": 1, "hour": 1, "minute": 1}},
+                    {"$project": {"_id": 0, "key": "$jalali_key", "value": f"${value_field}"}},
+                ],
+                "as": "points",
+            }
+        },
+        {"$project": {"_id": 0, "merchant_id": "$_id", "total": 1, "points": 1}},
+    ]
+    return pipeline
@@ -0,0 +1,29 @@
+"""
+Broadcast audiences drawn from transaction data.
+
+These are resolvers for notifications.segments, enabled through
+settings.NOTIFICATION_SEGMENTS only where their ids are also notification
+recipient ids, e.g. NOTIFICATION_SEGMENTS=merchants=transactions.segments.merchants.
+"""
+from transaction_service.mongo import get_collection
+from transactions.models import SummaryTransaction
+
+
+def merchants(after: str | None, limit: int) -> list[str]:
+    """
+    Every merchant with summary rows, read from the monthly buckets so the
+    (granularity, merchantId, ...) index serves the range scan.
+    """
+    merchant_match = {"$ne": None}
+    if after is not None:
+        merchant_match["$gt"] = after
+    rows = get_collection(SummaryTransaction).aggregate([
+        {"$match": {
+            "granularity": SummaryTransaction.Granularity.MONTHLY,
+            "merchantId": merchant_match,
+        }},
+        {"$group": {"_id": "$merchantId"}},
+        {"$sort": {"_id": 1}},
+        {"$limit": limit},
+    ])
+    return [row["_id"] for row in rows]
@@ -1,6 +1,49 @@
 from rest_framework import serializers
 
+from transactions.summary_service import SummaryService
+from transactions.utils import parse_summary_date
+
 
 class SummaryPointSerializer(serializers.Serializer):
     key = serializers.CharField()
     value = serializers.IntegerField()
+
+
+class SummarySeriesSerializer(serializers.Serializer):
+    mode = serializers.ChoiceField(choices=list(SummaryService.GRANULARITY_MAP))
+    type = serializers.ChoiceField(choices=list(SummaryService.VALUE_TYPES))
+
+
+class SummaryBatchRequestSerializer(serializers.Serializer):
+    MAX_SERIES = 20
+    MAX_MERCHANTS = 100
+
+    series = serializers.ListField(
+        child=SummarySeriesSerializer(),
+        allow_empty=False,
+        max_length=MAX_SERIES,
+    )
+    merchant_ids = serializers.ListField(
+        child=serializers.CharField(max_length=64),
+        required=False,
+        default=list,
+        max_length=MAX_MERCHANTS,
+        help_text="Omit for the platform-wide rollup series.",
+    )
+
+    def to_internal_value(self, data):
+        validated = super().to_internal_value(data)
+        # `from` / `to` are Python keywords, so they are read by hand.
+        errors = {}
+        for param in ("from", "to"):
+            value = data.get(param)
+            validated[param] = None
+            if not value:
+                continue
+            try:
+                validated[param] = parse_summary_date(str(value))
+            except ValueError:
+                errors[param] = ["Invalid date"]
+        if errors:
+            raise serializers.ValidationError(errors)
+        return validated
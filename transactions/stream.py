@@ -0,0 +1,203 @@
+"""
+Real-time summary maintenance from the `transaction` change stream.
+
+SummaryStreamConsumer tails inserts on the raw collection, folds them in
+micro-batches (up to `batch_size` documents or `max_wait` seconds) and
+`$inc`-upserts the affected buckets. Each batch's increments and the
+change-stream resume token are committed in one Mongo transaction, so a
+restart resumes right after the last applied batch: nothing is lost and
+nothing is counted twice.
+
+Transactions at or below the high-water mark stored when the consumer
+opened (see SummaryService.load_checkpoint) are skipped: they are already
+part of the summaries. Every batch also advances that checkpoint, in the
+same transaction, to the newest transaction it applied, so a later
+`rebuild_summaries --incremental` starts after what the stream counted.
+On the first start, without a resume token, the stream is opened before an
+incremental catch-up run, so every insert is covered by exactly one of the
+two; rebuilds and incremental runs drop the token, so the same happens
+after them. The watch_transactions command holds the summary writer lock
+(transactions.locks) meanwhile: another writer asking for it makes the
+consumer pause() until the lock is free again, and every batch re-checks
+the lock inside its transaction. Change streams and transactions need a
+replica set.
+"""
+import logging
+import time as _time
+from itertools import chain
+
+from django.utils import timezone
+
+from transaction_service.mongo import get_collection, get_database
+from transactions.accumulator import SubDayAccumulator, SummaryAccumulator
+from transactions.cache import invalidate_summary_cache
+from transactions.models import Transaction
+from transactions.summary_service import SummaryService
+
+logger = logging.getLogger(__name__)
+
+INSERTS_ONLY = [{"$match": {"operationType": "insert"}}]
+
+
+class SummaryStreamConsumer:
+    def __init__(self, batch_size: int = 500, max_wait: float = 1.0, on_flush=None, lock=None):
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.on_flush = on_flush
+        self.lock = lock
+        self.stream = None
+        self.mark = None
+        self.checkpoint = None
+        self._stopping = False
+        self._pausing = False
+
+    def open(self) -> None:
+        """Open the change stream, catching up from the checkpoint on first start."""
+        token = SummaryService.load_resume_token()
+        if token is None and SummaryService.load_checkpoint() is None:
+            raise ValueError(
+                "No summary checkpoint stored yet; run a full rebuild before streaming."
+            )
+
+        self.stream = get_collection(Transaction).watch(
+            INSERTS_ONLY,
+            resume_after=token,
+            max_await_time_ms=max(int(self.max_wait * 1000), 1),
+        )
+        if token is None:
+            stats = SummaryService.run_incremental(
+                fence=self.lock.check if self.lock is not None else None,
+            )
+            logger.info("Stream catch-up folded %s transactions", stats["transactions"])
+
+        self.mark = self._naive_mark(SummaryService.load_checkpoint())
+        self.checkpoint = self.mark
+
+    def close(self) -> None:
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+    def stop(self) -> None:
+        """Finish the current batch and return from run()."""
+        self._stopping = True
+
+    def pause(self) -> None:
+        """Like stop(), until resume() is called."""
+        self._pausing = True
+
+    def resume(self) -> None:
+        self._pausing = False
+
+    @property
+    def stopping(self) -> bool:
+        return self._stopping
+
+    @property
+    def paused(self) -> bool:
+        return self._pausing
+
+    def run(self, max_batches: int | None = None) -> None:
+        """Consume events until stop() is called or `max_batches` batches were applied."""
+        if self.stream is None:
+            self.open()
+
+        batches = 0
+        documents = []
+        first_at = None
+        while not (self._stopping or self._pausing) and (
+            max_batches is None or batches < max_batches
+        ):
+            change = self.stream.try_next()
+            if change is not None:
+                documents.append(change["fullDocument"])
+                if first_at is None:
+                    first_at = _time.monotonic()
+
+            full = len(documents) >= self.batch_size
+            waited = first_at is not None and _time.monotonic() - first_at >= self.max_wait
+            if full or waited:
+                self.flush(documents, self.stream.resume_token)
+                batches += 1
+                documents, first_at = [], None
+
+        if documents:
+            self.flush(documents, self.stream.resume_token)
+
+    def flush(self, documents: list[dict], token: dict) -> int:
+        """Apply one micro-batch and its resume token atomically; return rows written."""
+        rows = self.rows_for(documents)
+        checkpoint = self._advanced_checkpoint(documents)
+
+        def apply(session):
+            if self.lock is not None:
+                self.lock.check(session)
+            written = SummaryService.apply_increments(rows, invalidate=False, session=session)
+            SummaryService.save_resume_token(
+                token,
+                mark=checkpoint if checkpoint != self.checkpoint else None,
+                session=session,
+            )
+            return written
+
+        with get_database().client.start_session() as session:
+            written = session.with_transaction(apply)
+        self.checkpoint = checkpoint
+
+        if written:
+            invalidate_summary_cache()
+        if self.on_flush is not None:
+            self.on_flush(len(documents), written)
+        return written
+
+    def rows_for(self, documents: list[dict]) -> list[dict]:
+        """Summary row deltas (with rollups) for newly inserted transactions."""
+        accumulator = SummaryAccumulator()
+        subday = SubDayAccumulator(SummaryService.subday_cutoffs())
+        unique_field = SummaryService.unique_field()
+        for doc in documents:
+            created_at = doc.get("createdAt")
+            if created_at is None or self._covered(created_at, doc["_id"]):
+                continue
+            merchant = doc.get("merchantId")
+            merchant = str(merchant) if merchant else None
+            amount = int(doc.get("amount") or 0)
+            unique = doc.get(unique_field) if unique_field else None
+            accumulator.add(merchant, created_at.date(), amount, unique)
+            subday.add(merchant, created_at, amount, unique=unique)
+        return list(SummaryService._with_rollups(chain(accumulator.rows(), subday.rows())))
+
+    def _advanced_checkpoint(self, documents: list[dict]):
+        """The stored checkpoint moved up to the newest applied transaction."""
+        checkpoint = self.checkpoint
+        for doc in documents:
+            created_at = doc.get("createdAt")
+            if created_at is None or self._covered(created_at, doc["_id"]):
+                continue
+            mark = (created_at, doc["_id"])
+            if checkpoint is None or self._position(mark) > self._position(checkpoint):
+                checkpoint = mark
+        return checkpoint
+
+    @staticmethod
+    def _position(mark) -> tuple:
+        created_at, object_id = mark
+        return created_at, str(object_id)
+
+    def _covered(self, created_at, object_id) -> bool:
+        if self.mark is None:
+            return False
+        mark_at, mark_id = self.mark
+        if created_at != mark_at:
+            return created_at < mark_at
+        return str(object_id) <= str(mark_id)
+
+    @staticmethod
+    def _naive_mark(mark):
+        # pymongo hands out naive UTC datetimes for createdAt
+        if mark is None:
+            return None
+        created_at, object_id = mark
+        if timezone.is_aware(created_at):
+            created_at = timezone.make_naive(created_at, timezone.utc)
+        return created_at, object_id
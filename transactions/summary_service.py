@@ -1,10 +1,32 @@
 from collections import defaultdict
-from datetime import date
-from transactions.models import SummaryTransaction, Transaction
+from datetime import date, datetime, time, timedelta
+from itertools import chain, groupby, islice
+from operator import itemgetter
+
+from bson import ObjectId
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from pymongo import DeleteMany, UpdateOne
+
+from transaction_service.mongo import get_collection, get_database, reserve_ids
+from transactions.accumulator import SubDayAccumulator, SummaryAccumulator, calendar_buckets
+from transactions.cache import invalidate_summary_cache
+from transactions.hll import HyperLogLog, estimate_sketch, merge_sketches
+from transactions.indexes import ensure_indexes
+from transactions.models import SummaryCheckpoint, SummaryTransaction, Transaction
+from transactions.pipelines import (
+    build_daily_pipeline,
+    build_merchant_ranking_pipeline,
+    build_subday_pipeline,
+    window_match,
+)
 from transactions.utils import (
-    format_daily_key,
-    format_weekly_key,
-    format_monthly_key,
+    SUBDAY_BUCKET_MINUTES,
+    jalali_fields,
+    jalali_month_start,
+    subday_expires_at,
+    subday_retention,
 )
 
 
@@ -15,92 +37,984 @@ class SummaryService:
     - Rebuilding summaries from Transaction collection (used by command)
     """
 
+    ENGINE_PIPELINE = "pipeline"
+    ENGINE_PYTHON = "python"
+    ENGINES = (ENGINE_PIPELINE, ENGINE_PYTHON)
+
+    CHECKPOINT_NAME = "summary_transaction"
+    SHADOW_COLLECTION = "summary_transaction__rebuild"
+
+    VALUE_TYPES = ("amount", "count", "unique")
+
     GRANULARITY_MAP = {
         "daily": SummaryTransaction.Granularity.DAILY,
         "weekly": SummaryTransaction.Granularity.WEEKLY,
         "monthly": SummaryTransaction.Granularity.MONTHLY,
+        "jalali_weekly": SummaryTransaction.Granularity.JALALI_WEEKLY,
+        "jalali_monthly": SummaryTransaction.Granularity.JALALI_MONTHLY,
+        "hourly": SummaryTransaction.Granularity.HOURLY,
+        "quarter_hourly": SummaryTransaction.Granularity.QUARTER_HOURLY,
+        "five_minute": SummaryTransaction.Granularity.FIVE_MINUTE,
     }
 
     @staticmethod
-    def get_summary(mode: str, value_type: str, merchant_id: str | None):
+    def _summary_queryset(
+        mode: str,
+        merchant_id: str | None,
+        date_from: date | None = None,
+        date_to: date | None = None,
+        after: tuple | None = None,
+    ):
+        granularity = SummaryService.GRANULARITY_MAP[mode]
+
+        # Without a merchant, read only the platform-wide rollup rows.
+        qs = SummaryTransaction.objects.filter(
+            granularity=granularity,
+            merchant_id=merchant_id or None,
+        )
+        # Ranges apply to the bucket start date; all of them are served by
+        # the (granularity, merchantId, date, hour, minute) index.
+        if date_from:
+            qs = qs.filter(date__gte=date_from)
+        if date_to:
+            qs = qs.filter(date__lte=date_to)
+        if after:
+            after_date, after_hour, after_minute = after
+            if after_hour is None:
+                qs = qs.filter(date__gt=after_date)
+            else:
+                qs = qs.filter(
+                    Q(date__gt=after_date)
+                    | Q(date=after_date, hour__gt=after_hour)
+                    | Q(date=after_date, hour=after_hour, minute__gt=after_minute)
+                )
+        return qs.order_by("date", "hour", "minute")
+
+    @staticmethod
+    def _value_field(value_type: str) -> str:
+        if value_type == "unique":
+            return "unique_sketch"
+        return "total_amount" if value_type == "amount" else "total_count"
+
+    @staticmethod
+    def _point_value(value_type: str, value) -> int:
+        if value_type == "unique":
+            return estimate_sketch(value)
+        return int(value or 0)
+
+    @staticmethod
+    def unique_field() -> str | None:
+        """Raw transaction field counted by the unique sketches, if enabled."""
+        return getattr(settings, "SUMMARY_UNIQUE_FIELD", None)
+
+    @staticmethod
+    def get_summary(
+        mode: str,
+        value_type: str,
+        merchant_id: str | None,
+        date_from: date | None = None,
+        date_to: date | None = None,
+    ):
         """
         Pure function — perfect for testing.
         Reads ONLY from SummaryTransaction.
         """
-        granularity = SummaryService.GRANULARITY_MAP[mode]
+        qs = SummaryService._summary_queryset(mode, merchant_id, date_from, date_to)
+        field = SummaryService._value_field(value_type)
 
-        qs = SummaryTransaction.objects.filter(granularity=granularity)
-        if merchant_id:
-            qs = qs.filter(merchant_id=merchant_id)
+        # jalali_key is precomputed at rebuild time: no model instances,
+        # no calendar conversion on the read path.
+        rows = qs.values_list("jalali_key", field)
 
-        qs = qs.order_by("date")
+        return [
+            {"key": key, "value": SummaryService._point_value(value_type, value)}
+            for key, value in rows
+        ]
 
-        results = []
-        field = "total_amount" if value_type == "amount" else "total_count"
+    @staticmethod
+    def get_summary_page(
+        mode: str,
+        value_type: str,
+        merchant_id: str | None,
+        page_size: int,
+        date_from: date | None = None,
+        date_to: date | None = None,
+        after: tuple | None = None,
+    ) -> tuple[list[dict], tuple | None]:
+        """
+        One page of get_summary, keyed on the bucket start.
+        Returns (points, (date, hour, minute) of the last point) — the latter
+        is None on the last page and is passed back as `after` for the next
+        one. hour / minute are None for daily and coarser buckets.
+        """
+        qs = SummaryService._summary_queryset(mode, merchant_id, date_from, date_to, after)
+        field = SummaryService._value_field(value_type)
+
+        rows = list(
+            qs.values_list("date", "hour", "minute", "jalali_key", field)[:page_size + 1]
+        )
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+
+        points = [
+            {"key": key, "value": SummaryService._point_value(value_type, value)}
+            for *_, key, value in rows
+        ]
+        next_after = tuple(rows[-1][:3]) if has_more else None
+        return points, next_after
+
+    @staticmethod
+    def get_summary_batch(
+        series: list[tuple[str, str]],
+        merchant_ids: list[str] | None = None,
+        date_from: date | None = None,
+        date_to: date | None = None,
+    ) -> list[dict]:
+        """
+        Several (mode, type) series for one or more merchants (or the rollup when
+        `merchant_ids` is empty) with a single query per granularity: each
+        query projects both totals, so amount and count share one read (plus
+        the sketch column when a `unique` series asks for it).
 
-        for s in qs.only("date", "month", "week", field):
-            if mode == "daily":
-                key = format_daily_key(s.date)
-            elif mode == "weekly":
-                key = format_weekly_key(s.date, s.week)
+        Returns one entry per (mode, type, merchant):
+            {"mode", "type", "merchant_id", "points": [{"key", "value"}, ...]}
+        """
+        merchants = list(dict.fromkeys(merchant_ids or [])) or [None]
+        modes = list(dict.fromkeys(mode for mode, _ in series))
+        unique_modes = {mode for mode, value_type in series if value_type == "unique"}
+
+        # {(mode, merchant): [(key, amount, count[, sketch]), ...]} in date order
+        rows_by_mode = {}
+        for mode in modes:
+            qs = SummaryTransaction.objects.filter(
+                granularity=SummaryService.GRANULARITY_MAP[mode],
+            )
+            if merchants == [None]:
+                qs = qs.filter(merchant_id=None)
             else:
-                key = format_monthly_key(s.date)
+                qs = qs.filter(merchant_id__in=merchants)
+            if date_from:
+                qs = qs.filter(date__gte=date_from)
+            if date_to:
+                qs = qs.filter(date__lte=date_to)
 
-            results.append({
-                "key": key,
-                "value": int(getattr(s, field, 0) or 0)
-            })
+            fields = ["merchant_id", "jalali_key", "total_amount", "total_count"]
+            if mode in unique_modes:
+                fields.append("unique_sketch")
+            grouped = {merchant: [] for merchant in merchants}
+            for merchant, *values in qs.order_by("date", "hour", "minute").values_list(*fields):
+                grouped[merchant].append(values)
+            for merchant, rows in grouped.items():
+                rows_by_mode[(mode, merchant)] = rows
 
+        results = []
+        for mode, value_type in series:
+            index = {"amount": 1, "count": 2, "unique": 3}[value_type]
+            for merchant in merchants:
+                results.append({
+                    "mode": mode,
+                    "type": value_type,
+                    "merchant_id": merchant,
+                    "points": [
+                        {"key": row[0], "value": SummaryService._point_value(value_type, row[index])}
+                        for row in rows_by_mode[(mode, merchant)]
+                    ],
+                })
         return results
 
     @staticmethod
-    def rebuild_all_summaries():
+    def compare_merchants(
+        mode: str,
+        value_type: str,
+        merchant_ids: list[str] | None = None,
+        top: int | None = None,
+        date_from: date | None = None,
+        date_to: date | None = None,
+    ) -> list[dict]:
+        """
+        Per-merchant series for `merchant_ids`, or for the `top` merchants by
+        total over the window, ranked best first — one aggregation instead
+        of one get_summary call per merchant.
+
+        Returns [{"merchant_id", "total", "points": [{"key", "value"}, ...]}];
+        merchants without buckets in the window are left out.
+        """
+        def midnight(value):
+            return datetime.combine(value, time.min) if value else None
+
+        pipeline = build_merchant_ranking_pipeline(
+            SummaryService.GRANULARITY_MAP[mode],
+            SummaryService._value_field(value_type),
+            merchant_ids=merchant_ids,
+            top=top,
+            date_from=midnight(date_from),
+            date_to=midnight(date_to),
+        )
+        rows = get_collection(SummaryTransaction).aggregate(pipeline, allowDiskUse=True)
+        return [
+            {
+                "merchant_id": row["merchant_id"],
+                "total": int(row["total"] or 0),
+                "points": [
+                    {"key": point.get("key"), "value": int(point.get("value") or 0)}
+                    for point in row["points"]
+                ],
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def rebuild_all_summaries(
+        engine: str = "pipeline",
+        allow_disk_use: bool = True,
+        upto: tuple | None = None,
+    ):
         """
         Pure business logic for your management command.
         Read all transactions → compute → return SummaryTransaction objects.
+
+        engine="pipeline" groups server-side with one aggregation per
+        granularity; engine="python" is the original row-by-row reference
+        implementation, kept to cross-check the pipeline output.
+        `upto` caps the input at a high-water mark.
+
+        Materializes every bucket; writers should stream iter_summary_rows.
+        """
+        return [
+            SummaryTransaction(**row)
+            for row in SummaryService.iter_summary_rows(engine, allow_disk_use, upto)
+        ]
+
+    @staticmethod
+    def iter_summary_rows(
+        engine: str = "pipeline",
+        allow_disk_use: bool = True,
+        upto: tuple | None = None,
+    ):
+        """
+        Summary rows (plain dicts) for a full rebuild, yielded as they are
+        produced. With the pipeline engine the coarse buckets are derived one
+        merchant at a time from the merchant-sorted daily rows, so memory holds
+        one merchant's days plus the per-bucket rollup totals.
+        """
+        if engine == SummaryService.ENGINE_PYTHON:
+            return SummaryService._rebuild_python(upto=upto)
+        if engine != SummaryService.ENGINE_PIPELINE:
+            raise ValueError(f"Unknown rebuild engine: {engine}")
+        return SummaryService._aggregate_rows(
+            window_match(upto=upto), allow_disk_use=allow_disk_use
+        )
+
+    @staticmethod
+    def _aggregate_rows(match: dict, allow_disk_use: bool = True):
+        """
+        Yield one summary row dict per bucket for transactions matching `match`,
+        per merchant and as platform-wide rollups.
+        """
+        return SummaryService._with_rollups(chain(
+            SummaryService._aggregate_merchant_rows(match, allow_disk_use),
+            SummaryService._aggregate_subday_rows(match, allow_disk_use),
+        ))
+
+    @staticmethod
+    def _aggregate_merchant_rows(match: dict, allow_disk_use: bool = True):
+        """
+        Aggregate raw transactions into daily buckets only, then derive the
+        weekly, monthly and Jalali buckets from those per-day rows. The daily
+        rows arrive sorted by merchant, so only one merchant's days are held
+        in memory at a time.
+        """
+        unique_field = SummaryService.unique_field()
+        cursor = get_collection(Transaction).aggregate(
+            build_daily_pipeline(match, unique_field),
+            allowDiskUse=allow_disk_use,
+        )
+        for merchant, rows in groupby(cursor, key=itemgetter("merchant_id")):
+            accumulator = SummaryAccumulator()
+            # a day with many distinct values comes as several rows; they
+            # fold into the same slot
+            for row in rows:
+                day = row["date"]
+                if isinstance(day, datetime):
+                    day = day.date()
+                accumulator.add_totals(
+                    merchant, day, int(row["total_amount"]), int(row["total_count"]),
+                    HyperLogLog.of(row["uniques"]) if unique_field else None,
+                )
+            yield from accumulator.rows()
+
+    @staticmethod
+    def subday_cutoffs(now: datetime | None = None) -> dict[str, datetime]:
+        """Start of the retention window (naive UTC) of each enabled sub-day granularity."""
+        now = timezone.make_naive(now or timezone.now(), timezone.utc)
+        return {
+            granularity: now - timedelta(days=days)
+            for granularity, days in subday_retention().items()
+        }
+
+    @staticmethod
+    def _aggregate_subday_rows(match: dict, allow_disk_use: bool = True):
+        """
+        Hourly and finer buckets, aggregated from raw transactions inside each
+        granularity's retention window only.
+        """
+        collection = get_collection(Transaction)
+        unique_field = SummaryService.unique_field()
+        for granularity, cutoff in SummaryService.subday_cutoffs().items():
+            cursor = collection.aggregate(
+                build_subday_pipeline(
+                    granularity,
+                    SUBDAY_BUCKET_MINUTES[granularity],
+                    {"$and": [match, {"createdAt": {"$gte": cutoff}}]},
+                    unique_field,
+                ),
+                allowDiskUse=allow_disk_use,
+            )
+            for (merchant, start), chunks in groupby(cursor, key=itemgetter("merchant_id", "start")):
+                row = next(chunks)
+                sketch = HyperLogLog.of(row["uniques"]) if unique_field else None
+                for chunk in chunks:
+                    # a bucket with many distinct values spans several rows
+                    row["total_amount"] += chunk["total_amount"]
+                    row["total_count"] += chunk["total_count"]
+                    sketch.update(chunk["uniques"])
+                yield {
+                    "granularity": granularity,
+                    "merchant_id": merchant,
+                    "date": start.date(),
+                    "hour": start.hour,
+                    "minute": start.minute,
+                    "year": start.year,
+                    "month": start.month,
+                    "week": None,
+                    "total_amount": int(row["total_amount"]),
+                    "total_count": int(row["total_count"]),
+                    "unique_sketch": sketch.to_bytes() if sketch is not None else None,
+                }
+
+    @staticmethod
+    def _rebuild_python(block_size: int = 10_000, upto: tuple | None = None):
+        """
+        Reference engine: read transactions in blocks and fold them into a
+        SummaryAccumulator, which derives every granularity from per-day slots.
+        Transactions inside a sub-day retention window also go to a
+        SubDayAccumulator. `upto` caps the input at a high-water mark.
+        """
+        accumulator = SummaryAccumulator()
+        subday = SubDayAccumulator(SummaryService.subday_cutoffs())
+
+        # raw documents: the (createdAt, _id) cap and the distinct-count
+        # field are not expressible through the model
+        unique_field = SummaryService.unique_field()
+        projection = {"createdAt": 1, "amount": 1, "merchantId": 1}
+        if unique_field:
+            projection[unique_field] = 1
+        rows = (
+            (
+                doc.get("createdAt"),
+                doc.get("amount"),
+                doc.get("merchantId"),
+                doc.get(unique_field) if unique_field else None,
+            )
+            for doc in get_collection(Transaction)
+            .find(window_match(upto=upto), projection)
+            .batch_size(block_size)
+        )
+        while block := list(islice(rows, block_size)):
+            merchants, ordinals, amounts, uniques = [], [], [], []
+            for created_at, amount, merchant_id, unique in block:
+                if not created_at:
+                    continue
+                if timezone.is_aware(created_at):
+                    created_at = timezone.make_naive(created_at, timezone.utc)
+                merchant = str(merchant_id) if merchant_id else None
+                merchants.append(merchant)
+                ordinals.append(created_at.date().toordinal())
+                amounts.append(int(amount or 0))
+                uniques.append(unique)
+                subday.add(merchant, created_at, amounts[-1], unique=unique)
+            accumulator.add_batch(
+                merchants, ordinals, amounts, uniques if unique_field else None,
+            )
+
+        return SummaryService._with_rollups(chain(accumulator.rows(), subday.rows()))
+
+    @staticmethod
+    def _with_rollups(rows):
+        """
+        Pass per-merchant rows through and append one platform-wide rollup row
+        (merchant_id=None) per bucket. Transactions without a merchant only
+        count towards the rollups; unique sketches are merged across merchants.
+        """
+        rollups = {}
+        for row in rows:
+            key = (
+                row["granularity"], row["date"], row.get("hour"), row.get("minute"),
+                row["year"], row["month"], row["week"],
+            )
+            totals = rollups.setdefault(key, [0, 0, None])
+            totals[0] += row["total_amount"]
+            totals[1] += row["total_count"]
+            if row.get("unique_sketch") is not None:
+                sketch = HyperLogLog.from_bytes(row["unique_sketch"])
+                totals[2] = sketch if totals[2] is None else totals[2].merge(sketch)
+            if row["merchant_id"] is not None:
+                yield row
+
+        for key, (amount, count, sketch) in rollups.items():
+            granularity, ref_date, hour, minute, year, month, week = key
+            yield {
+                "granularity": granularity,
+                "merchant_id": None,
+                "date": ref_date,
+                "hour": hour,
+                "minute": minute,
+                "year": year,
+                "month": month,
+                "week": week,
+                "total_amount": amount,
+                "total_count": count,
+                "unique_sketch": sketch.to_bytes() if sketch is not None else None,
+            }
+
+    @staticmethod
+    def diff_summaries(left, right) -> list[tuple]:
+        """
+        Compare two collections of SummaryTransaction objects bucket by bucket.
+        Returns the bucket identities whose totals differ (or exist on one side only).
+        """
+        def index(objects):
+            return {
+                (o.granularity, o.merchant_id, o.date, o.hour, o.minute,
+                 o.year, o.month, o.week):
+                    (o.total_amount, o.total_count, estimate_sketch(o.unique_sketch))
+                for o in objects
+            }
+
+        left_idx, right_idx = index(left), index(right)
+        return sorted(
+            (key for key in left_idx.keys() | right_idx.keys()
+             if left_idx.get(key) != right_idx.get(key)),
+            key=repr,
+        )
+
+    # ---- full replacement ----------------------------------------------------------
+
+    @staticmethod
+    def _to_document(row: dict, now: datetime) -> dict:
+        """Raw summary_transaction document, laid out the way djongo stores it."""
+        return {
+            "granularity": row["granularity"],
+            "date": datetime.combine(row["date"], time.min),
+            "hour": row.get("hour"),
+            "minute": row.get("minute"),
+            "year": row["year"],
+            "week": row["week"],
+            "month": row["month"],
+            "merchantId": row["merchant_id"],
+            "total_amount": int(row["total_amount"]),
+            "total_count": int(row["total_count"]),
+            "unique_sketch": row.get("unique_sketch"),
+            **SummaryService._bucket_fields(row),
+            "created_at": now,
+            "updated_at": now,
+        }
+
+    @staticmethod
+    def replace_all_summaries(rows, chunk_size: int = 1000, fence=None) -> int:
+        """
+        Atomically replace summary_transaction with `rows` (summary row dicts,
+        any iterable — typically iter_summary_rows). Returns the rows written.
+
+        Rows are flushed into a shadow collection `chunk_size` at a time with
+        unordered insert_many, so memory stays bounded by one chunk however
+        long the history is. The shadow is then renamed over the live one
+        (renameCollection with dropTarget): readers see either the previous
+        complete generation or the new one, never a partial set. The model's
+        declared indexes, plus any extra ones found on the live collection,
+        are built on the shadow before the swap. `fence()` (see
+        SummaryWriterLock.check) is called before every chunk and the swap.
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        shadow = SummaryService.prepare_shadow()
+
+        now = timezone.now()
+        written = 0
+        chunk = []
+        for row in rows:
+            chunk.append(SummaryService._to_document(row, now))
+            if len(chunk) >= chunk_size:
+                if fence is not None:
+                    fence()
+                written += SummaryService._insert_batch(shadow, chunk)
+                chunk = []
+        if chunk:
+            written += SummaryService._insert_batch(shadow, chunk)
+
+        if fence is not None:
+            fence()
+        SummaryService.swap_shadow(shadow)
+        return written
+
+    @staticmethod
+    def prepare_shadow(with_indexes: bool = False):
+        """
+        Drop and recreate the rebuild shadow collection. `with_indexes` builds
+        the declared indexes up front, which upsert-based writers need.
+        """
+        db = get_database()
+        shadow = db[SummaryService.SHADOW_COLLECTION]
+        shadow.drop()
+        db.create_collection(SummaryService.SHADOW_COLLECTION)
+        if with_indexes:
+            ensure_indexes(shadow, SummaryTransaction)
+        return shadow
+
+    @staticmethod
+    def swap_shadow(shadow) -> None:
+        """Index the shadow like the live collection and rename it over it."""
+        live = get_collection(SummaryTransaction)
+        ensure_indexes(shadow, SummaryTransaction)
+        SummaryService._copy_indexes(live, shadow)
+        shadow.rename(live.name, dropTarget=True)
+        invalidate_summary_cache()
+
+    @staticmethod
+    def rebuild_partitioned(
+        strategy: str,
+        buckets: int = 8,
+        workers: int = 1,
+        backend: str = "process",
+        allow_disk_use: bool = True,
+        upto: tuple | None = None,
+        on_progress=None,
+        fence=None,
+    ) -> int:
         """
-        summary = defaultdict(lambda: {"amount": 0, "count": 0})
+        Full rebuild split into independent partitions (see transactions.partitions)
+        that aggregate and `$inc`-upsert into the shadow collection in parallel,
+        followed by the usual atomic swap. `on_progress(done, total, result)` is
+        called as each partition finishes, `fence()` before the swap. Returns
+        the number of rows upserted.
+        """
+        from transactions import partitions
+
+        plan = partitions.plan_partitions(strategy, upto=upto, buckets=buckets)
+        shadow = SummaryService.prepare_shadow(with_indexes=True)
+
+        written = 0
+        results = partitions.run_partitions(
+            plan,
+            upto=upto,
+            shadow_name=shadow.name,
+            workers=workers,
+            backend=backend,
+            allow_disk_use=allow_disk_use,
+        )
+        for done, result in enumerate(results, start=1):
+            written += result["rows"]
+            if on_progress is not None:
+                on_progress(done, len(plan), result)
 
-        qs = Transaction.objects.all().only("created_at", "amount", "merchant_id")
+        if fence is not None:
+            fence()
+        SummaryService.swap_shadow(shadow)
+        return written
 
-        for tx in qs.iterator():
-            if not tx.created_at:
+    @staticmethod
+    def _insert_batch(collection, documents: list[dict]) -> int:
+        for doc, new_id in zip(documents, reserve_ids(SummaryTransaction, len(documents))):
+            if new_id is not None:
+                doc["id"] = new_id
+        collection.insert_many(documents, ordered=False)
+        return len(documents)
+
+    @staticmethod
+    def _copy_indexes(source, target) -> None:
+        present = target.index_information()
+        for name, info in source.index_information().items():
+            if name in present:
                 continue
+            options = {
+                k: v for k, v in info.items()
+                if k not in ("key", "v", "ns")
+            }
+            target.create_index(info["key"], name=name, **options)
 
-            dt = tx.created_at.date()
-            merchant = str(tx.merchant_id) if tx.merchant_id else None
-            amount = int(tx.amount or 0)
+    # ---- incremental maintenance -------------------------------------------------
 
-            # DAILY
-            key_daily = ("daily", merchant, dt.year, dt.month, None, dt)
-            summary[key_daily]["amount"] += amount
-            summary[key_daily]["count"] += 1
+    @staticmethod
+    def _encode_object_id(object_id) -> str:
+        return str(object_id)
 
-            # WEEKLY
-            iso_year, iso_week, _ = dt.isocalendar()
-            ref_week_date = date.fromisocalendar(iso_year, iso_week, 1)
-            key_weekly = ("weekly", merchant, iso_year, None, iso_week, ref_week_date)
-            summary[key_weekly]["amount"] += amount
-            summary[key_weekly]["count"] += 1
+    @staticmethod
+    def _decode_object_id(value: str):
+        return ObjectId(value) if ObjectId.is_valid(value) else value
 
-            # MONTHLY
-            month_start = date(dt.year, dt.month, 1)
-            key_monthly = ("monthly", merchant, dt.year, dt.month, None, month_start)
-            summary[key_monthly]["amount"] += amount
-            summary[key_monthly]["count"] += 1
+    @staticmethod
+    def load_checkpoint() -> tuple | None:
+        """Return the stored (created_at, object_id) high-water mark, if any."""
+        checkpoint = SummaryCheckpoint.objects.filter(
+            name=SummaryService.CHECKPOINT_NAME
+        ).first()
+        if checkpoint is None or checkpoint.last_created_at is None:
+            return None
+        return (
+            checkpoint.last_created_at,
+            SummaryService._decode_object_id(checkpoint.last_object_id),
+        )
 
-        results = []
-        for (granularity, merchant_id, year, month, week, ref_date), vals in summary.items():
-            results.append(
-                SummaryTransaction(
-                    granularity=granularity,
-                    merchant_id=merchant_id,
-                    date=ref_date,
-                    year=year,
-                    month=month,
-                    week=week,
-                    total_amount=vals["amount"],
-                    total_count=vals["count"]
+    @staticmethod
+    def save_checkpoint(mark: tuple) -> None:
+        """
+        Store the high-water mark of a rebuild or incremental run. The stream
+        resume token is dropped with it: it predates the mark, so the consumer
+        catches up from the checkpoint instead of replaying the stream from
+        there (which could also have left the oplog by now).
+        """
+        created_at, object_id = mark
+        SummaryCheckpoint.objects.update_or_create(
+            name=SummaryService.CHECKPOINT_NAME,
+            defaults={
+                "last_created_at": created_at,
+                "last_object_id": SummaryService._encode_object_id(object_id),
+                "resume_token": None,
+            },
+        )
+
+    @staticmethod
+    def load_resume_token() -> dict | None:
+        """Change-stream resume token stored by the stream consumer, if any."""
+        token = SummaryCheckpoint.objects.filter(
+            name=SummaryService.CHECKPOINT_NAME
+        ).values_list("resume_token", flat=True).first()
+        return {"_data": token} if token else None
+
+    @staticmethod
+    def save_resume_token(token: dict, mark: tuple | None = None, session=None) -> None:
+        """
+        Store a change-stream resume token, and the consumer's advanced
+        (created_at, object_id) high-water `mark`, with raw pymongo, so both
+        are written in the same Mongo transaction (`session`) as the increments.
+        """
+        fields = {"resume_token": token["_data"], "updated_at": timezone.now()}
+        if mark is not None:
+            fields["last_created_at"] = mark[0]
+            fields["last_object_id"] = SummaryService._encode_object_id(mark[1])
+
+        collection = get_collection(SummaryCheckpoint)
+        selector = {"name": SummaryService.CHECKPOINT_NAME}
+        on_insert = dict(selector)
+        if collection.count_documents(selector, limit=1) == 0:
+            new_id = reserve_ids(SummaryCheckpoint, 1)[0]
+            if new_id is not None:
+                on_insert["id"] = new_id
+
+        collection.update_one(
+            selector,
+            {
+                "$set": fields,
+                "$setOnInsert": on_insert,
+            },
+            upsert=True,
+            session=session,
+        )
+
+    @staticmethod
+    def find_high_water_mark(match: dict | None = None) -> tuple | None:
+        """(createdAt, _id) of the newest transaction matching `match`."""
+        doc = next(
+            get_collection(Transaction)
+            .find(match or window_match(), {"createdAt": 1})
+            .sort([("createdAt", -1), ("_id", -1)])
+            .limit(1),
+            None,
+        )
+        if doc is None:
+            return None
+        created_at = doc["createdAt"]
+        if timezone.is_naive(created_at):
+            created_at = timezone.make_aware(created_at, timezone.utc)
+        return created_at, doc["_id"]
+
+    @staticmethod
+    def apply_increments(
+        rows,
+        collection=None,
+        invalidate: bool = True,
+        chunk_size: int = 1000,
+        session=None,
+    ) -> int:
+        """
+        Fold summary row deltas into summary_transaction (or `collection`) with
+        `$inc` upserts keyed by (granularity, merchantId, date, hour, minute),
+        one unordered bulk_write per `chunk_size` rows, then merge the rows'
+        unique sketches (see _merge_sketches). Returns the number of rows
+        written. `session` runs the writes inside the caller's Mongo transaction.
+        """
+        if collection is None:
+            collection = get_collection(SummaryTransaction)
+
+        now = timezone.now()
+        written = 0
+        rows = iter(rows)
+        while chunk := list(islice(rows, chunk_size)):
+            written += SummaryService._write_increments(collection, chunk, now, session)
+
+        if written and invalidate:
+            invalidate_summary_cache()
+        return written
+
+    @staticmethod
+    def _write_increments(collection, rows: list[dict], now: datetime, session=None) -> int:
+        ids = reserve_ids(SummaryTransaction, len(rows))
+        operations = [
+            SummaryService._bucket_upsert(row, now, new_id, "$inc")
+            for row, new_id in zip(rows, ids)
+        ]
+        collection.bulk_write(operations, ordered=False, session=session)
+        SummaryService._merge_sketches(collection, rows, session)
+        return len(operations)
+
+    @staticmethod
+    def _merge_sketches(collection, rows: list[dict], session=None) -> None:
+        """
+        Merge the rows' unique sketches into the stored buckets. There is no
+        update operator for a register-wise max, so each sketch is read and
+        written back guarded by the value read; buckets another writer changed
+        in between (partitions sharing a rollup bucket) are read again. HLL
+        merges are idempotent, so the retry is safe.
+        """
+        fields = SummaryService.BUCKET_FIELDS
+        pending = {}
+        for row in rows:
+            if row.get("unique_sketch") is not None:
+                bucket = SummaryService._bucket_filter(row)
+                key = tuple(bucket[field] for field in fields)
+                pending[key] = merge_sketches(pending.get(key), row["unique_sketch"])
+
+        while pending:
+            stored = {
+                tuple(doc.get(field) for field in fields): doc.get("unique_sketch")
+                for doc in collection.find(
+                    {"$or": [dict(zip(fields, key)) for key in pending]},
+                    {"_id": 0, "unique_sketch": 1, **{field: 1 for field in fields}},
+                    session=session,
+                )
+            }
+            operations = []
+            for key, sketch in list(pending.items()):
+                current = stored.get(key)
+                merged = merge_sketches(current, sketch)
+                if merged == current:
+                    del pending[key]
+                    continue
+                operations.append(UpdateOne(
+                    {**dict(zip(fields, key)), "unique_sketch": current},
+                    {"$set": {"unique_sketch": merged}},
+                ))
+            if not operations:
+                return
+            result = collection.bulk_write(operations, ordered=False, session=session)
+            if result.modified_count == len(operations):
+                return
+
+    @staticmethod
+    def _bucket_upsert(row: dict, now: datetime, new_id, totals_op: str) -> UpdateOne:
+        """Upsert of one bucket; `totals_op` is "$inc" (deltas) or "$set" (recomputed totals)."""
+        on_insert = {"created_at": now}
+        if new_id is not None:
+            on_insert["id"] = new_id
+        totals = {
+            "total_amount": row["total_amount"],
+            "total_count": row["total_count"],
+        }
+        fields = {
+            "year": row["year"],
+            "month": row["month"],
+            "week": row["week"],
+            **SummaryService._bucket_fields(row),
+            "updated_at": now,
+        }
+        if totals_op == "$set":
+            # recomputed buckets carry their full sketch; deltas are merged
+            # afterwards by _merge_sketches
+            update = {"$set": {**totals, "unique_sketch": row.get("unique_sketch"), **fields}}
+        else:
+            update = {totals_op: totals, "$set": fields}
+        update["$setOnInsert"] = on_insert
+        return UpdateOne(SummaryService._bucket_filter(row), update, upsert=True)
+
+    # stored fields identifying a bucket (the summary_bucket_time_unique index)
+    BUCKET_FIELDS = ("granularity", "merchantId", "date", "hour", "minute")
+
+    @staticmethod
+    def _bucket_filter(row: dict) -> dict:
+        """Filter matching the stored document of a row's bucket (the unique index)."""
+        return {
+            "granularity": row["granularity"],
+            "merchantId": row["merchant_id"],
+            "date": datetime.combine(row["date"], time.min),
+            "hour": row.get("hour"),
+            "minute": row.get("minute"),
+        }
+
+    @staticmethod
+    def _bucket_fields(row: dict) -> dict:
+        """Jalali labels and TTL expiry derived from a row's bucket identity."""
+        hour, minute = row.get("hour"), row.get("minute")
+        return {
+            **jalali_fields(row["granularity"], row["date"], row["week"], hour, minute),
+            "expires_at": subday_expires_at(row["granularity"], row["date"], hour, minute),
+        }
+
+    # ---- hierarchical re-rollup ----------------------------------------------------
+
+    COARSE_GRANULARITIES = ("weekly", "monthly", "jalali_weekly", "jalali_monthly")
+
+    @staticmethod
+    def _bucket_end(granularity: str, start: date) -> date:
+        """First day after the `granularity` bucket starting on `start`."""
+        if granularity in ("weekly", "jalali_weekly"):
+            return start + timedelta(days=7)
+        if granularity == "monthly":
+            return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+        # every Jalali month has 29–31 days
+        return jalali_month_start(start + timedelta(days=31))
+
+    @staticmethod
+    def rerollup_days(days, fence=None) -> dict:
+        """
+        Recompute the weekly, monthly and Jalali buckets containing any of
+        `days` from the stored daily rows (per merchant and rollup), after
+        those daily rows were corrected. Buckets are overwritten with `$set`;
+        merchants no longer present in a bucket are removed from it.
+        `fence()` is called before the write.
+
+        Returns {"days": days of daily rows read, "buckets": coarse buckets
+        recomputed, "rows": rows written, "deleted": stale rows removed}.
+        """
+        affected = set()
+        for day in set(days):
+            for granularity, _, _, _, start in calendar_buckets(day):
+                if granularity in SummaryService.COARSE_GRANULARITIES:
+                    affected.add((granularity, start))
+        if not affected:
+            return {"days": 0, "buckets": 0, "rows": 0, "deleted": 0}
+
+        span = set()
+        for granularity, start in affected:
+            end = SummaryService._bucket_end(granularity, start)
+            span.update(start + timedelta(days=i) for i in range((end - start).days))
+
+        collection = get_collection(SummaryTransaction)
+        accumulator = SummaryAccumulator()
+        for doc in collection.find(
+            {
+                "granularity": SummaryTransaction.Granularity.DAILY,
+                "date": {"$in": [datetime.combine(d, time.min) for d in sorted(span)]},
+            },
+            {"_id": 0, "merchantId": 1, "date": 1, "total_amount": 1, "total_count": 1,
+             "unique_sketch": 1},
+        ):
+            # the daily rollup rows (merchantId=None) roll up into the coarse rollups
+            sketch = doc.get("unique_sketch")
+            accumulator.add_totals(
+                doc.get("merchantId"),
+                doc["date"].date(),
+                int(doc.get("total_amount") or 0),
+                int(doc.get("total_count") or 0),
+                HyperLogLog.from_bytes(sketch) if sketch is not None else None,
+            )
+
+        rows = [
+            row for row in accumulator.rows(SummaryService.COARSE_GRANULARITIES)
+            if (row["granularity"], row["date"]) in affected
+        ]
+        merchants = defaultdict(list)
+        for row in rows:
+            merchants[(row["granularity"], row["date"])].append(row["merchant_id"])
+
+        now = timezone.now()
+        operations = [
+            SummaryService._bucket_upsert(row, now, new_id, "$set")
+            for row, new_id in zip(rows, reserve_ids(SummaryTransaction, len(rows)))
+        ]
+        operations += [
+            DeleteMany({
+                "granularity": granularity,
+                "date": datetime.combine(start, time.min),
+                "merchantId": {"$nin": merchants[(granularity, start)]},
+            })
+            for granularity, start in affected
+        ]
+        if fence is not None:
+            fence()
+        result = collection.bulk_write(operations, ordered=False)
+        invalidate_summary_cache()
+        return {
+            "days": len(span),
+            "buckets": len(affected),
+            "rows": len(rows),
+            "deleted": result.deleted_count,
+        }
+
+    @staticmethod
+    def run_incremental(
+        since: datetime | None = None,
+        allow_disk_use: bool = True,
+        fence=None,
+    ) -> dict:
+        """
+        Aggregate transactions newer than the stored checkpoint and `$inc` them
+        onto the existing summary rows.
+
+        `since` only seeds the window while no checkpoint exists. Once one does,
+        an earlier `since` is clamped to it (the transactions before it are
+        already counted) and a later one is refused (the transactions between
+        the checkpoint and `since` would never be folded in).
+
+        The checkpoint only moves after the increments are written; a crash in
+        between re-applies that batch on the next run. `fence()` is called
+        before either write.
+        """
+        after = SummaryService.load_checkpoint()
+        if after is not None and since is not None:
+            if since > after[0]:
+                raise ValueError(
+                    f"`since` ({since.isoformat()}) is after the stored checkpoint "
+                    f"({after[0].isoformat()}); transactions in between would be skipped."
                 )
+            since = None
+        elif after is None and since is None:
+            raise ValueError(
+                "No summary checkpoint stored yet; run a full rebuild or pass `since`."
             )
-        return results
+
+        lower = window_match(after=after, since=since)
+        upto = SummaryService.find_high_water_mark(lower)
+        if upto is None:
+            return {"transactions": 0, "rows": 0, "checkpoint": after}
+
+        transactions = 0
+
+        def counted(rows):
+            nonlocal transactions
+            for row in rows:
+                if (row["granularity"] == SummaryTransaction.Granularity.DAILY
+                        and row["merchant_id"] is None):
+                    transactions += row["total_count"]
+                yield row
+
+        if fence is not None:
+            fence()
+        written = SummaryService.apply_increments(counted(SummaryService._aggregate_rows(
+            window_match(after=after, since=since, upto=upto),
+            allow_disk_use=allow_disk_use,
+        )))
+        if fence is not None:
+            fence()
+        SummaryService.save_checkpoint(upto)
+
+        return {"transactions": transactions, "rows": written, "checkpoint": upto}
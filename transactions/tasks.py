@@ -0,0 +1,17 @@
+from celery import shared_task
+
+from transactions.partitions import run_partition
+
+
+@shared_task
+def rebuild_summary_partition_task(
+    partition: dict,
+    upto: list | None,
+    shadow_name: str,
+    allow_disk_use: bool = True,
+):
+    """
+    Aggregate one rebuild partition into the shadow collection.
+    Dispatched by `rebuild_summaries --partition-by ... --backend celery`.
+    """
+    return run_partition(partition, upto, shadow_name, allow_disk_use)
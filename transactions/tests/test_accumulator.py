@@ -0,0 +1,121 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from transactions import accumulator
+from transactions.accumulator import SubDayAccumulator, SummaryAccumulator, calendar_buckets
+from transactions.hll import estimate_sketch
+
+
+def _transactions():
+    start = date(2025, 3, 15)  # spans Nowruz and a Gregorian month end
+    merchants = ["42", "7", None]
+    return [
+        (merchants[i % 3], start + timedelta(days=i % 23), 100 + i)
+        for i in range(200)
+    ]
+
+
+def _reference_rows(transactions):
+    summary = defaultdict(lambda: [0, 0])
+    for merchant, day, amount in transactions:
+        for granularity, year, month, week, ref_date in calendar_buckets(day):
+            totals = summary[(granularity, merchant, year, month, week, ref_date)]
+            totals[0] += amount
+            totals[1] += 1
+    return {key: tuple(value) for key, value in summary.items()}
+
+
+def _index(rows):
+    return {
+        (r["granularity"], r["merchant_id"], r["year"], r["month"], r["week"], r["date"]):
+            (r["total_amount"], r["total_count"])
+        for r in rows
+    }
+
+
+class SummaryAccumulatorTests(SimpleTestCase):
+    def test_single_adds_match_reference(self):
+        transactions = _transactions()
+        acc = SummaryAccumulator()
+        for merchant, day, amount in transactions:
+            acc.add(merchant, day, amount)
+
+        self.assertEqual(len(acc), 3 * 23)
+        self.assertEqual(_index(acc.rows()), _reference_rows(transactions))
+
+    def test_batch_mode_matches_single_adds(self):
+        transactions = _transactions()
+        merchants = [t[0] for t in transactions]
+        ordinals = [t[1].toordinal() for t in transactions]
+        amounts = [t[2] for t in transactions]
+
+        acc = SummaryAccumulator()
+        acc.add_batch(merchants[:50], ordinals[:50], amounts[:50])
+        acc.add_batch(merchants[50:], ordinals[50:], amounts[50:])
+        self.assertEqual(_index(acc.rows()), _reference_rows(transactions))
+
+        with patch.object(accumulator, "np", None):
+            fallback = SummaryAccumulator()
+            fallback.add_batch(merchants, ordinals, amounts)
+        self.assertEqual(_index(fallback.rows()), _reference_rows(transactions))
+
+    def test_large_amounts_stay_exact(self):
+        acc = SummaryAccumulator()
+        big = 2 ** 53 + 1
+        acc.add_batch(["42", "42"], [date(2025, 1, 1).toordinal()] * 2, [big, 1])
+
+        daily = next(r for r in acc.rows() if r["granularity"] == "daily")
+        self.assertEqual(daily["total_amount"], big + 1)
+        self.assertEqual(daily["total_count"], 2)
+
+    def test_daily_totals_roll_up_to_selected_granularities(self):
+        acc = SummaryAccumulator()
+        acc.add_totals("42", date(2025, 1, 1), 100, 2)
+        acc.add_totals("42", date(2025, 1, 2), 50, 1)
+
+        rows = list(acc.rows(["monthly"]))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(
+            (rows[0]["date"], rows[0]["total_amount"], rows[0]["total_count"]),
+            (date(2025, 1, 1), 150, 3),
+        )
+
+
+    def test_sketches_merge_into_coarser_buckets(self):
+        acc = SummaryAccumulator()
+        acc.add("42", date(2025, 1, 1), 10, unique="card-1")
+        acc.add("42", date(2025, 1, 2), 10, unique="card-1")
+        acc.add_batch(["42", "7"], [date(2025, 1, 3).toordinal()] * 2, [5, 5], ["card-2", "card-3"])
+
+        uniques = {
+            (r["granularity"], r["merchant_id"], r["date"]): estimate_sketch(r["unique_sketch"])
+            for r in acc.rows(["daily", "monthly"])
+        }
+        self.assertEqual(uniques[("daily", "42", date(2025, 1, 1))], 1)
+        self.assertEqual(uniques[("monthly", "42", date(2025, 1, 1))], 2)
+        self.assertEqual(uniques[("monthly", "7", date(2025, 1, 1))], 1)
+
+
+class SubDayAccumulatorTests(SimpleTestCase):
+    def test_only_transactions_inside_retention_are_bucketed(self):
+        acc = SubDayAccumulator({
+            "hourly": datetime(2025, 1, 1),
+            "five_minute": datetime(2025, 1, 2),
+        })
+        acc.add("42", datetime(2024, 12, 31, 23, 59), 10)
+        acc.add("42", datetime(2025, 1, 1, 10, 1), 20)
+        acc.add("42", datetime(2025, 1, 1, 10, 59), 30)
+        acc.add("42", datetime(2025, 1, 2, 0, 4), 40)
+
+        rows = {
+            (r["granularity"], r["date"], r["hour"], r["minute"]): (r["total_amount"], r["total_count"])
+            for r in acc.rows()
+        }
+        self.assertEqual(rows, {
+            ("hourly", date(2025, 1, 1), 10, 0): (50, 2),
+            ("hourly", date(2025, 1, 2), 0, 0): (40, 1),
+            ("five_minute", date(2025, 1, 2), 0, 0): (40, 1),
+        })
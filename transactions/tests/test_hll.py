@@ -0,0 +1,44 @@
+from django.test import SimpleTestCase
+
+from transactions.hll import (
+    PRECISION,
+    REGISTERS,
+    HyperLogLog,
+    estimate_sketch,
+    merge_sketches,
+)
+
+
+class HyperLogLogTests(SimpleTestCase):
+    def test_small_sets_are_counted_exactly(self):
+        self.assertEqual(HyperLogLog().estimate(), 0)
+        self.assertEqual(HyperLogLog.of(["a", "b", "a", None]).estimate(), 2)
+
+    def test_large_sets_stay_within_error_bounds(self):
+        for size in (5_000, 100_000):
+            estimate = HyperLogLog.of(range(size)).estimate()
+            self.assertLess(abs(estimate - size) / size, 0.05, size)
+
+    def test_merge_counts_the_union(self):
+        left = HyperLogLog.of(range(0, 6_000))
+        right = HyperLogLog.of(range(3_000, 9_000))
+        self.assertLess(abs(left.merge(right).estimate() - 9_000) / 9_000, 0.05)
+
+    def test_round_trip_in_sparse_and_dense_form(self):
+        for size in (3, 20_000):
+            sketch = HyperLogLog.of(range(size))
+            data = sketch.to_bytes()
+            self.assertEqual(HyperLogLog.from_bytes(data).registers, sketch.registers)
+            self.assertEqual(estimate_sketch(memoryview(data)), sketch.estimate())
+        self.assertLess(len(HyperLogLog.of(range(3)).to_bytes()), 16)
+        self.assertEqual(len(HyperLogLog.of(range(20_000)).to_bytes()), REGISTERS + 2)
+
+    def test_merge_sketches_skips_missing_ones(self):
+        self.assertIsNone(merge_sketches(None, None))
+        merged = merge_sketches(None, HyperLogLog.of("ab").to_bytes(), HyperLogLog.of("bc").to_bytes())
+        self.assertEqual(estimate_sketch(merged), 3)
+        self.assertEqual(estimate_sketch(None), 0)
+
+    def test_rejects_other_precisions(self):
+        with self.assertRaises(ValueError):
+            HyperLogLog.from_bytes(bytes((1, PRECISION + 1)))
@@ -0,0 +1,57 @@
+import threading
+
+from django.test import TestCase
+
+from transaction_service.mongo import get_collection
+from transactions.locks import (
+    LOCK_COLLECTION,
+    WRITER_LOCK,
+    SummaryLockBusy,
+    SummaryLockLost,
+    SummaryWriterLock,
+)
+
+
+class SummaryWriterLockTests(TestCase):
+    def tearDown(self):
+        get_collection(LOCK_COLLECTION).delete_many({})
+
+    def test_second_writer_is_refused(self):
+        with SummaryWriterLock("watch_transactions"):
+            with self.assertRaises(SummaryLockBusy):
+                SummaryWriterLock("rebuild_summaries").acquire()
+        with SummaryWriterLock("rebuild_summaries") as lock:
+            lock.check()
+
+    def test_waiting_writer_gets_the_lease_handed_over(self):
+        asked = threading.Event()
+        holder = SummaryWriterLock("watch_transactions", ttl=0.6, on_handoff=asked.set)
+        holder.acquire()
+        # what watch_transactions does once its consumer has paused
+        threading.Thread(target=lambda: asked.wait(5) and holder.hand_over()).start()
+
+        with SummaryWriterLock("rebuild_summaries", ttl=0.6, wait=5) as waiting:
+            self.assertTrue(asked.is_set())
+            waiting.check()
+            with self.assertRaises(SummaryLockLost):
+                holder.check()
+            lease = get_collection(LOCK_COLLECTION).find_one({"_id": WRITER_LOCK})
+            self.assertNotIn("handoff_to", lease)
+
+    def test_lost_lease_stops_the_writer(self):
+        lost = threading.Event()
+        lock = SummaryWriterLock("rebuild_summaries", ttl=0.6, on_lost=lost.set)
+        lock.acquire()
+        try:
+            get_collection(LOCK_COLLECTION).update_one(
+                {"_id": WRITER_LOCK}, {"$set": {"owner": "someone-else"}},
+            )
+            with self.assertRaises(SummaryLockLost):
+                lock.check()
+            self.assertTrue(lost.wait(5))
+        finally:
+            lock.release()
+        self.assertEqual(
+            get_collection(LOCK_COLLECTION).find_one({"_id": WRITER_LOCK})["owner"],
+            "someone-else",
+        )
@@ -0,0 +1,35 @@
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from django.test import SimpleTestCase
+
+from transactions.partitions import (
+    decode_mark,
+    encode_mark,
+    merchant_bucket,
+    partition_match,
+)
+
+
+class PartitionHelpersTests(SimpleTestCase):
+    def test_mark_round_trips_through_json_payload(self):
+        mark = (datetime(2025, 1, 1, 10, 30, tzinfo=timezone.utc), ObjectId())
+        self.assertEqual(decode_mark(encode_mark(mark)), mark)
+        self.assertIsNone(decode_mark(encode_mark(None)))
+
+    def test_merchant_bucket_is_stable_and_string_based(self):
+        self.assertEqual(merchant_bucket(42, 8), merchant_bucket("42", 8))
+        self.assertEqual(merchant_bucket(None, 8), 0)
+        self.assertEqual(merchant_bucket("", 8), 0)
+        self.assertTrue(0 <= merchant_bucket("merchant-x", 8) < 8)
+
+    def test_month_partition_covers_calendar_month(self):
+        match = partition_match({"label": "2024-12", "month": "2024-12-01"})
+        self.assertIn(
+            {"createdAt": {"$gte": datetime(2024, 12, 1), "$lt": datetime(2025, 1, 1)}},
+            match["$and"],
+        )
+
+    def test_first_merchant_bucket_includes_missing_merchants(self):
+        match = partition_match({"label": "m", "merchants": ["42"], "include_missing": True})
+        self.assertIn({"merchantId": {"$in": ["42", None, "", 0, False]}}, match["$and"])
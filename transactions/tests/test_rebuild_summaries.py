@@ -1,9 +1,16 @@
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from io import StringIO
+from unittest.mock import patch
 
 from django.core.management import call_command
-from django.test import TestCase
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.utils import timezone
 
-from transactions.models import Transaction, SummaryTransaction
+from transaction_service.mongo import get_collection
+from transactions.hll import estimate_sketch
+from transactions.locks import SummaryWriterLock
+from transactions.models import Transaction, SummaryCheckpoint, SummaryTransaction
 
 
 class RebuildSummariesCommandTests(TestCase):
@@ -26,35 +33,316 @@ class RebuildSummariesCommandTests(TestCase):
         call_command("rebuild_summaries", "--truncate")
 
         all_summaries = SummaryTransaction.objects.all()
-        self.assertEqual(all_summaries.count(), 3)
+        # 5 granularities, once for merchant 42 and once as platform rollup
+        self.assertEqual(all_summaries.count(), 10)
 
         total_amount = sum(s.total_amount for s in all_summaries)
         total_count = sum(s.total_count for s in all_summaries)
 
-        self.assertEqual(total_amount, 3000 * 3)
-        self.assertEqual(total_count, 2 * 3)
+        self.assertEqual(total_amount, 3000 * 10)
+        self.assertEqual(total_count, 2 * 10)
+        self.assertEqual(all_summaries.filter(merchant_id=None).count(), 5)
 
         granularities = {s.granularity for s in all_summaries}
         self.assertSetEqual(
             granularities,
-            {"daily", "weekly", "monthly"},
+            {"daily", "weekly", "monthly", "jalali_weekly", "jalali_monthly"},
         )
 
     def test_truncate_option_deletes_existing_summaries(self):
         call_command("rebuild_summaries", "--truncate")
-        self.assertEqual(SummaryTransaction.objects.count(), 3)
+        self.assertEqual(SummaryTransaction.objects.count(), 10)
 
         SummaryTransaction.objects.create(
             granularity="daily",
             merchant_id=None,
-            date=self.dt.date(),
+            date=date(2024, 1, 1),
             year=self.dt.year,
             month=self.dt.month,
             week=self.dt.isocalendar().week,
             total_amount=999,
             total_count=1,
         )
-        self.assertEqual(SummaryTransaction.objects.count(), 4)
+        self.assertEqual(SummaryTransaction.objects.count(), 11)
 
         call_command("rebuild_summaries", "--truncate")
-        self.assertEqual(SummaryTransaction.objects.count(), 3)
+        self.assertEqual(SummaryTransaction.objects.count(), 10)
+
+    def test_rebuild_without_truncate_replaces_previous_generation(self):
+        call_command("rebuild_summaries")
+        call_command("rebuild_summaries")
+
+        self.assertEqual(SummaryTransaction.objects.count(), 10)
+        daily = SummaryTransaction.objects.get(granularity="daily", merchant_id="42")
+        self.assertEqual(daily.total_amount, 3000)
+        self.assertIsNotNone(daily.id)
+
+    def test_small_chunks_write_every_row(self):
+        out = StringIO()
+        call_command("rebuild_summaries", "--chunk-size", "3", stdout=out)
+
+        self.assertEqual(SummaryTransaction.objects.count(), 10)
+        self.assertIn("Wrote 10 summary documents", out.getvalue())
+        self.assertEqual(
+            len(set(SummaryTransaction.objects.values_list("id", flat=True))), 10
+        )
+
+    def test_invalid_chunk_size_fails(self):
+        with self.assertRaises(CommandError):
+            call_command("rebuild_summaries", "--chunk-size", "0")
+
+    def test_incremental_folds_only_new_transactions(self):
+        call_command("rebuild_summaries", "--truncate")
+        self.assertEqual(SummaryCheckpoint.objects.count(), 1)
+
+        Transaction.objects.create(
+            created_at=datetime(2025, 1, 1, 12, 0),
+            amount=500,
+            merchant_id="42",
+        )
+        call_command("rebuild_summaries", "--incremental")
+        # a second run with nothing new must not double count
+        call_command("rebuild_summaries", "--incremental")
+
+        self.assertEqual(SummaryTransaction.objects.count(), 10)
+        daily = SummaryTransaction.objects.get(granularity="daily", merchant_id="42")
+        self.assertEqual(daily.total_amount, 3500)
+        self.assertEqual(daily.total_count, 3)
+        rollup = SummaryTransaction.objects.get(granularity="daily", merchant_id=None)
+        self.assertEqual(rollup.total_amount, 3500)
+
+    def test_python_rebuild_moves_the_checkpoint(self):
+        call_command("rebuild_summaries")
+        Transaction.objects.create(
+            created_at=datetime(2025, 1, 1, 12, 0),
+            amount=500,
+            merchant_id="42",
+        )
+        call_command("rebuild_summaries", "--engine", "python")
+        call_command("rebuild_summaries", "--incremental", stdout=StringIO())
+
+        daily = SummaryTransaction.objects.get(granularity="daily", merchant_id="42")
+        self.assertEqual((daily.total_amount, daily.total_count), (3500, 3))
+
+    def test_incremental_without_checkpoint_fails(self):
+        with self.assertRaises(CommandError):
+            call_command("rebuild_summaries", "--incremental")
+
+    def test_writes_are_refused_while_another_writer_holds_the_lock(self):
+        call_command("rebuild_summaries", "--truncate")
+        with SummaryWriterLock("watch_transactions"):
+            with self.assertRaises(CommandError):
+                call_command("rebuild_summaries", "--incremental", "--wait", "0")
+            with self.assertRaises(CommandError):
+                call_command("rebuild_summaries", "--wait", "1")
+        call_command("rebuild_summaries", "--incremental", stdout=StringIO())
+
+    def test_rebuild_drops_the_stream_resume_token(self):
+        call_command("rebuild_summaries")
+        SummaryCheckpoint.objects.update(resume_token="8263A1B2C3")
+
+        call_command("rebuild_summaries")
+        self.assertIsNone(SummaryCheckpoint.objects.get().resume_token)
+
+    def test_since_before_checkpoint_is_clamped(self):
+        call_command("rebuild_summaries", "--truncate")
+        call_command("rebuild_summaries", "--since", "2024-12-01", stdout=StringIO())
+
+        daily = SummaryTransaction.objects.get(granularity="daily", merchant_id="42")
+        self.assertEqual(daily.total_amount, 3000)
+        self.assertEqual(daily.total_count, 2)
+
+    def test_since_after_checkpoint_is_refused(self):
+        call_command("rebuild_summaries", "--truncate")
+        mark = SummaryCheckpoint.objects.get().last_created_at
+
+        with self.assertRaises(CommandError):
+            call_command("rebuild_summaries", "--since", "2025-02-01")
+        self.assertEqual(SummaryCheckpoint.objects.get().last_created_at, mark)
+
+
+class PartitionedRebuildCommandTests(TestCase):
+    def setUp(self):
+        rows = [
+            (datetime(2025, 1, 30, 10, 0), 1000, "42"),
+            (datetime(2025, 2, 2, 10, 0), 2000, "42"),
+            (datetime(2025, 2, 2, 11, 0), 700, "7"),
+            (datetime(2025, 2, 3, 9, 0), 300, ""),
+        ]
+        for created_at, amount, merchant_id in rows:
+            Transaction.objects.create(
+                created_at=created_at, amount=amount, merchant_id=merchant_id,
+            )
+
+    def _snapshot(self):
+        return sorted(
+            SummaryTransaction.objects.values_list(
+                "granularity", "merchant_id", "date", "total_amount", "total_count",
+            ),
+            key=repr,
+        )
+
+    def test_partitioned_rebuilds_match_single_pass(self):
+        call_command("rebuild_summaries")
+        expected = self._snapshot()
+
+        for strategy in ("month", "merchant"):
+            out = StringIO()
+            call_command(
+                "rebuild_summaries",
+                "--partition-by", strategy,
+                "--partitions", "3",
+                "--workers", "1",
+                stdout=out,
+            )
+            self.assertEqual(self._snapshot(), expected, strategy)
+            self.assertIn("[1/", out.getvalue())
+
+    def test_partitioned_rebuild_requires_pipeline_engine(self):
+        with self.assertRaises(CommandError):
+            call_command(
+                "rebuild_summaries", "--partition-by", "month", "--engine", "python",
+            )
+
+
+class RerollupSummariesCommandTests(TestCase):
+    def setUp(self):
+        for merchant_id, amount in [("42", 1000), ("7", 500)]:
+            Transaction.objects.create(
+                created_at=datetime(2025, 1, 1, 10, 30), amount=amount, merchant_id=merchant_id,
+            )
+        call_command("rebuild_summaries")
+
+    def test_coarse_buckets_follow_corrected_daily_rows(self):
+        SummaryTransaction.objects.filter(granularity="daily", merchant_id="42").update(
+            total_amount=1500, total_count=2,
+        )
+        SummaryTransaction.objects.filter(granularity="daily", merchant_id=None).update(
+            total_amount=2000, total_count=3,
+        )
+        SummaryTransaction.objects.filter(granularity="daily", merchant_id="7").delete()
+
+        call_command("rerollup_summaries", "--day", "1403/10/12", stdout=StringIO())
+
+        for granularity in ("weekly", "monthly", "jalali_weekly", "jalali_monthly"):
+            merchant = SummaryTransaction.objects.get(granularity=granularity, merchant_id="42")
+            self.assertEqual((merchant.total_amount, merchant.total_count), (1500, 2))
+            rollup = SummaryTransaction.objects.get(granularity=granularity, merchant_id=None)
+            self.assertEqual((rollup.total_amount, rollup.total_count), (2000, 3))
+            self.assertFalse(
+                SummaryTransaction.objects.filter(granularity=granularity, merchant_id="7").exists()
+            )
+
+    def test_requires_days(self):
+        with self.assertRaises(CommandError):
+            call_command("rerollup_summaries")
+
+    def test_refused_while_another_writer_holds_the_lock(self):
+        with SummaryWriterLock("watch_transactions"):
+            with self.assertRaises(CommandError):
+                call_command("rerollup_summaries", "--day", "2025-01-01", "--wait", "0")
+
+
+class SubDayRebuildTests(TestCase):
+    def setUp(self):
+        # inside the default 30-day hourly retention window
+        self.start = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(days=1)
+        for minutes, amount in [(5, 1000), (50, 2000), (70, 500)]:
+            Transaction.objects.create(
+                created_at=self.start + timedelta(minutes=minutes),
+                amount=amount,
+                merchant_id="42",
+            )
+        Transaction.objects.create(
+            created_at=self.start - timedelta(days=60), amount=9000, merchant_id="42",
+        )
+
+    def test_hourly_rows_cover_only_the_retention_window(self):
+        for engine in ("pipeline", "python"):
+            with self.subTest(engine=engine):
+                call_command("rebuild_summaries", "--engine", engine)
+                hourly = SummaryTransaction.objects.filter(
+                    granularity="hourly", merchant_id="42",
+                ).order_by("date", "hour")
+                start = timezone.make_naive(self.start, timezone.utc)
+                self.assertEqual(
+                    [(h.hour, h.minute, h.total_amount, h.total_count) for h in hourly],
+                    [(start.hour, 0, 3000, 2), ((start.hour + 1) % 24, 0, 500, 1)],
+                )
+                self.assertEqual(hourly[0].expires_at.replace(tzinfo=None), start + timedelta(days=30))
+                self.assertEqual(
+                    SummaryTransaction.objects.filter(granularity="hourly", merchant_id=None).count(),
+                    2,
+                )
+
+
+@override_settings(SUMMARY_UNIQUE_FIELD="payerId")
+class UniqueSketchRebuildTests(TestCase):
+    def setUp(self):
+        get_collection(Transaction).insert_many([
+            {"createdAt": datetime(2025, 1, day, 10), "amount": 100,
+             "merchantId": merchant_id, "payerId": payer}
+            for day, merchant_id, payer in [
+                (1, "42", "p1"), (1, "42", "p1"), (1, "42", "p2"),
+                (2, "42", "p1"), (2, "7", "p3"),
+            ]
+        ])
+
+    def _uniques(self, granularity, merchant_id):
+        return [
+            estimate_sketch(row.unique_sketch)
+            for row in SummaryTransaction.objects.filter(
+                granularity=granularity, merchant_id=merchant_id,
+            ).order_by("date")
+        ]
+
+    def test_sketches_merge_across_days_and_merchants(self):
+        for engine in ("pipeline", "python"):
+            with self.subTest(engine=engine):
+                call_command("rebuild_summaries", "--engine", engine)
+                self.assertEqual(self._uniques("daily", "42"), [2, 1])
+                self.assertEqual(self._uniques("monthly", "42"), [2])
+                self.assertEqual(self._uniques("monthly", None), [3])
+
+    def test_high_cardinality_bucket_is_split_across_documents(self):
+        get_collection(Transaction).insert_many([
+            {"createdAt": datetime(2025, 1, 5, 10), "amount": 10,
+             "merchantId": "42", "payerId": f"payer-{i % 3000}"}
+            for i in range(4000)
+        ])
+        with patch("transactions.pipelines.UNIQUE_CHUNK_SIZE", 500):
+            call_command("rebuild_summaries")
+
+        daily = SummaryTransaction.objects.get(
+            granularity="daily", merchant_id="42", date=date(2025, 1, 5),
+        )
+        self.assertEqual((daily.total_amount, daily.total_count), (40_000, 4000))
+        self.assertLess(abs(estimate_sketch(daily.unique_sketch) - 3000) / 3000, 0.05)
+
+    def test_incremental_runs_merge_into_stored_sketches(self):
+        call_command("rebuild_summaries")
+        get_collection(Transaction).insert_many([
+            {"createdAt": datetime(2025, 1, 3, 10), "amount": 100,
+             "merchantId": "42", "payerId": payer}
+            for payer in ("p1", "p4")
+        ])
+        call_command("rebuild_summaries", "--incremental", stdout=StringIO())
+
+        self.assertEqual(self._uniques("monthly", "42"), [3])
+        self.assertEqual(self._uniques("monthly", None), [4])
+
+
+class CheckSummaryIndexesCommandTests(TestCase):
+    def test_declared_indexes_exist_after_rebuild(self):
+        Transaction.objects.create(
+            created_at=datetime(2025, 1, 1, 10, 30),
+            amount=1000,
+            merchant_id="42",
+        )
+        call_command("rebuild_summaries")
+
+        out = StringIO()
+        call_command("check_summary_indexes", stdout=out)
+        self.assertIn("summary_bucket_time_unique", out.getvalue())
+        self.assertIn("summary_expires_at_ttl", out.getvalue())
+        self.assertIn("healthy", out.getvalue())
@@ -0,0 +1,31 @@
+from django.test import SimpleTestCase
+from rest_framework.renderers import JSONRenderer
+
+from transactions.renderers import render_summary_page, render_summary_points
+from transactions.serializers import SummaryPointSerializer
+
+
+class SummaryRendererTests(SimpleTestCase):
+    points = [
+        {"key": "1403/10/12", "value": 1234},
+        {"key": "هفته 6 سال 1403", "value": 0},
+        {"key": "line sep \"quoted\"\n", "value": 9_000_000_000},
+        {"key": None, "value": 7},
+    ]
+
+    def test_points_match_serializer_output(self):
+        expected = JSONRenderer().render(SummaryPointSerializer(self.points, many=True).data)
+        self.assertEqual(render_summary_points(self.points), expected)
+
+    def test_page_matches_serializer_output(self):
+        expected = JSONRenderer().render({
+            "next": "http://testserver/api/transactions/summary/?cursor=abc",
+            "results": SummaryPointSerializer(self.points, many=True).data,
+        })
+        rendered = render_summary_page(
+            self.points, "http://testserver/api/transactions/summary/?cursor=abc"
+        )
+        self.assertEqual(rendered, expected)
+
+    def test_empty(self):
+        self.assertEqual(render_summary_points([]), b"[]")
@@ -1,12 +1,16 @@
 from datetime import date
+from unittest.mock import patch
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from transactions.cache import SummaryCache
+from transactions.hll import HyperLogLog
 from transactions.models import SummaryTransaction
+from transactions.summary_service import SummaryService
 
 
 class TransactionSummaryAPITests(TestCase):
@@ -47,8 +51,8 @@ class TransactionSummaryAPITests(TestCase):
             {"mode": "daily", "type": "amount"},
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        point = response.data[0]
+        self.assertEqual(len(response.json()), 1)
+        point = response.json()[0]
         self.assertIn("key", point)
         self.assertIn("value", point)
         self.assertEqual(point["value"], 1234)
@@ -59,6 +63,290 @@ class TransactionSummaryAPITests(TestCase):
             {"mode": "daily", "type": "count"},
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        point = response.data[0]
+        self.assertEqual(len(response.json()), 1)
+        point = response.json()[0]
         self.assertEqual(point["value"], 7)
+
+
+class TransactionSummaryRangeAndPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse("transaction-summary")
+
+        for day, amount in [(1, 100), (2, 200), (3, 300)]:
+            dt = date(2025, 1, day)
+            SummaryTransaction.objects.create(
+                granularity=SummaryTransaction.Granularity.DAILY,
+                merchant_id=None,
+                date=dt,
+                year=dt.year,
+                month=dt.month,
+                total_amount=amount,
+                total_count=day,
+            )
+
+    def test_range_accepts_gregorian_and_jalali_dates(self):
+        response = self.client.get(
+            self.url,
+            # 1403/10/13 == 2025-01-02
+            {"mode": "daily", "type": "amount", "from": "1403/10/13", "to": "2025-01-02"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p["value"] for p in response.json()], [200])
+
+    def test_invalid_range_date_returns_validation_error(self):
+        response = self.client.get(
+            self.url,
+            {"mode": "daily", "type": "amount", "from": "yesterday"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("from", response.data)
+
+    def test_cursor_pagination_walks_all_pages(self):
+        response = self.client.get(
+            self.url,
+            {"mode": "daily", "type": "amount", "page_size": 2},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        page = response.json()
+        self.assertEqual([p["value"] for p in page["results"]], [100, 200])
+        self.assertIsNotNone(page["next"])
+
+        page = self.client.get(page["next"]).json()
+        self.assertEqual([p["value"] for p in page["results"]], [300])
+        self.assertIsNone(page["next"])
+
+    def test_cursor_pagination_within_a_day(self):
+        for hour, amount in [(9, 10), (10, 20), (11, 30)]:
+            SummaryTransaction.objects.create(
+                granularity=SummaryTransaction.Granularity.HOURLY,
+                merchant_id=None,
+                date=date(2025, 1, 1),
+                hour=hour,
+                minute=0,
+                year=2025,
+                month=1,
+                total_amount=amount,
+                total_count=1,
+            )
+
+        page = self.client.get(
+            self.url, {"mode": "hourly", "type": "amount", "page_size": 2},
+        ).json()
+        self.assertEqual([p["key"] for p in page["results"]], ["1403/10/12 09:00", "1403/10/12 10:00"])
+
+        page = self.client.get(page["next"]).json()
+        self.assertEqual([p["value"] for p in page["results"]], [30])
+        self.assertIsNone(page["next"])
+
+    @override_settings(SUMMARY_UNIQUE_FIELD="payerId")
+    def test_unique_type_estimates_stored_sketches(self):
+        SummaryTransaction.objects.filter(date=date(2025, 1, 2)).update(
+            unique_sketch=HyperLogLog.of(["p1", "p2"]).to_bytes(),
+        )
+        response = self.client.get(self.url, {"mode": "daily", "type": "unique"})
+        self.assertEqual([p["value"] for p in response.json()], [0, 2, 0])
+
+    def test_unique_type_requires_a_configured_field(self):
+        response = self.client.get(self.url, {"mode": "daily", "type": "unique"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("type", response.data)
+
+    def test_invalid_page_size_returns_validation_error(self):
+        response = self.client.get(
+            self.url,
+            {"mode": "daily", "type": "amount", "page_size": 0},
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("page_size", response.data)
+
+
+class TransactionSummaryBatchAPITests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse("transaction-summary-batch")
+
+        rows = [
+            (SummaryTransaction.Granularity.DAILY, "42", date(2025, 1, 1), 100, 1),
+            (SummaryTransaction.Granularity.DAILY, "42", date(2025, 1, 2), 200, 2),
+            (SummaryTransaction.Granularity.DAILY, "7", date(2025, 1, 1), 50, 5),
+            (SummaryTransaction.Granularity.DAILY, None, date(2025, 1, 1), 150, 6),
+            (SummaryTransaction.Granularity.MONTHLY, "42", date(2025, 1, 1), 300, 3),
+        ]
+        for granularity, merchant_id, dt, amount, count in rows:
+            SummaryTransaction.objects.create(
+                granularity=granularity,
+                merchant_id=merchant_id,
+                date=dt,
+                year=dt.year,
+                month=dt.month,
+                total_amount=amount,
+                total_count=count,
+            )
+
+    def _series(self, response, mode, value_type, merchant_id):
+        for item in response.json()["series"]:
+            if (item["mode"], item["type"], item["merchant_id"]) == (mode, value_type, merchant_id):
+                return [point["value"] for point in item["points"]]
+        self.fail(f"missing series {mode}/{value_type}/{merchant_id}")
+
+    def test_batch_returns_every_series_per_merchant(self):
+        response = self.client.post(self.url, {
+            "series": [
+                {"mode": "daily", "type": "amount"},
+                {"mode": "daily", "type": "count"},
+                {"mode": "monthly", "type": "amount"},
+            ],
+            "merchant_ids": ["42", "7"],
+        }, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()["series"]), 6)
+        self.assertEqual(self._series(response, "daily", "amount", "42"), [100, 200])
+        self.assertEqual(self._series(response, "daily", "count", "42"), [1, 2])
+        self.assertEqual(self._series(response, "daily", "count", "7"), [5])
+        self.assertEqual(self._series(response, "monthly", "amount", "42"), [300])
+        self.assertEqual(self._series(response, "monthly", "amount", "7"), [])
+
+    def test_batch_without_merchants_reads_rollup(self):
+        response = self.client.post(self.url, {
+            "series": [{"mode": "daily", "type": "amount"}],
+            "to": "2025-01-01",
+        }, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._series(response, "daily", "amount", None), [150])
+
+    def test_batch_validation_errors(self):
+        response = self.client.post(self.url, {
+            "series": [{"mode": "yearly", "type": "amount"}],
+        }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("series", response.data)
+
+        response = self.client.post(self.url, {
+            "series": [{"mode": "daily", "type": "amount"}],
+            "from": "not-a-date",
+        }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("from", response.data)
+
+
+class MerchantComparisonAPITests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse("transaction-summary-merchants")
+
+        for merchant_id, amount in [("42", 300), ("7", 500), ("9", 50)]:
+            SummaryTransaction.objects.create(
+                granularity=SummaryTransaction.Granularity.DAILY,
+                merchant_id=merchant_id,
+                date=date(2025, 1, 1),
+                year=2025,
+                month=1,
+                total_amount=amount,
+                total_count=1,
+            )
+
+    def test_top_merchants(self):
+        response = self.client.get(self.url, {"mode": "daily", "type": "amount", "top": 2})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        merchants = response.json()["merchants"]
+        self.assertEqual([m["merchant_id"] for m in merchants], ["7", "42"])
+        self.assertEqual(merchants[0]["points"][0]["value"], 500)
+
+    def test_listed_merchants(self):
+        response = self.client.get(
+            self.url, {"mode": "daily", "type": "amount", "merchant_ids": "9,42"},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [m["merchant_id"] for m in response.json()["merchants"]], ["42", "9"],
+        )
+
+    def test_requires_exactly_one_of_merchant_ids_or_top(self):
+        response = self.client.get(self.url, {"mode": "daily", "type": "amount"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(
+            self.url, {"mode": "daily", "type": "amount", "top": 2, "merchant_ids": "7"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(self.url, {"mode": "daily", "type": "amount", "top": 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("top", response.data)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def set(self, key, value, ex=None):
+        self.store[key] = value
+
+    def incr(self, key):
+        self.store[key] = int(self.store.get(key, 0)) + 1
+        return self.store[key]
+
+
+class TransactionSummaryCacheTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse("transaction-summary")
+        self.cache = SummaryCache(FakeRedis(), ttl=60)
+
+        patcher = patch("transactions.views.get_summary_cache", return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        dt = date(2025, 1, 1)
+        self.row = SummaryTransaction.objects.create(
+            granularity=SummaryTransaction.Granularity.DAILY,
+            merchant_id=None,
+            date=dt,
+            year=dt.year,
+            month=dt.month,
+            total_amount=1234,
+            total_count=7,
+        )
+
+    def test_second_request_is_served_from_cache(self):
+        params = {"mode": "daily", "type": "amount"}
+        first = self.client.get(self.url, params)
+        SummaryTransaction.objects.filter(pk=self.row.pk).update(total_amount=1)
+        second = self.client.get(self.url, params)
+
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(second.json()[0]["value"], 1234)
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_generation_bump_invalidates_entries(self):
+        params = {"mode": "daily", "type": "amount"}
+        self.client.get(self.url, params)
+        SummaryTransaction.objects.filter(pk=self.row.pk).update(total_amount=1)
+
+        self.cache.bump_generation()
+
+        self.assertEqual(self.client.get(self.url, params).json()[0]["value"], 1)
+
+    def test_body_read_before_a_bump_is_not_cached_under_the_new_generation(self):
+        params = {"mode": "daily", "type": "amount"}
+        get_summary = SummaryService.get_summary
+
+        def rebuild_mid_request(**kwargs):
+            data = get_summary(**kwargs)
+            SummaryTransaction.objects.filter(pk=self.row.pk).update(total_amount=1)
+            self.cache.bump_generation()
+            return data
+
+        with patch("transactions.views.SummaryService.get_summary", side_effect=rebuild_mid_request):
+            self.assertEqual(self.client.get(self.url, params).json()[0]["value"], 1234)
+
+        self.assertEqual(self.client.get(self.url, params).json()[0]["value"], 1)
@@ -1,9 +1,11 @@
 
-from datetime import date
+from datetime import date, datetime
+from unittest.mock import Mock, patch
 
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase, override_settings
 
-from transactions.models import SummaryTransaction
+from transactions.hll import estimate_sketch
+from transactions.models import SummaryTransaction, Transaction
 from transactions.summary_service import SummaryService
 
 
@@ -68,6 +70,23 @@ class SummaryServiceTests(TestCase):
         self.assertEqual(result[0]["value"], 1000)
         self.assertEqual(result[1]["value"], 2000)
 
+    def test_get_daily_summary_uses_stored_jalali_key(self):
+        row = SummaryTransaction.objects.get(
+            granularity=SummaryTransaction.Granularity.DAILY,
+            date=self.dt1,
+        )
+        self.assertEqual(row.jalali_key, "1403/10/12")
+        self.assertEqual((row.jalali_year, row.jalali_month, row.jalali_day), (1403, 10, 12))
+
+        SummaryTransaction.objects.filter(pk=row.pk).update(jalali_key="stored")
+        result = SummaryService.get_summary(
+            mode="daily",
+            value_type="amount",
+            merchant_id=None,
+        )
+        self.assertEqual(result[0], {"key": "stored", "value": 1000})
+        self.assertEqual(result[1]["key"], "1403/10/13")
+
     def test_get_daily_summary_count_all_merchants(self):
         result = SummaryService.get_summary(
             mode="daily",
@@ -89,6 +108,14 @@ class SummaryServiceTests(TestCase):
         self.assertEqual(len(result), 1)
         self.assertEqual(result[0]["value"], 5000)
 
+    def test_unfiltered_summary_reads_only_rollup_rows(self):
+        result = SummaryService.get_summary(
+            mode="weekly",
+            value_type="amount",
+            merchant_id=None,
+        )
+        self.assertEqual(result, [])
+
     def test_get_weekly_summary_ignores_other_merchants(self):
         result = SummaryService.get_summary(
             mode="weekly",
@@ -106,3 +133,190 @@ class SummaryServiceTests(TestCase):
 
         self.assertEqual(len(result), 1)
         self.assertEqual(result[0]["value"], 20)
+
+
+class MerchantComparisonTests(TestCase):
+    def setUp(self):
+        rows = [
+            ("42", date(2025, 1, 1), 100, 9),
+            ("42", date(2025, 1, 2), 200, 1),
+            ("7", date(2025, 1, 1), 500, 1),
+            ("9", date(2025, 1, 2), 50, 1),
+            (None, date(2025, 1, 1), 600, 10),
+        ]
+        for merchant_id, dt, amount, count in rows:
+            SummaryTransaction.objects.create(
+                granularity=SummaryTransaction.Granularity.DAILY,
+                merchant_id=merchant_id,
+                date=dt,
+                year=dt.year,
+                month=dt.month,
+                total_amount=amount,
+                total_count=count,
+            )
+
+    def test_top_merchants_are_ranked_and_exclude_rollup(self):
+        result = SummaryService.compare_merchants("daily", "amount", top=2)
+
+        self.assertEqual([m["merchant_id"] for m in result], ["7", "42"])
+        self.assertEqual(result[1]["total"], 300)
+        self.assertEqual([p["value"] for p in result[1]["points"]], [100, 200])
+
+    def test_ranking_by_count_within_window(self):
+        result = SummaryService.compare_merchants(
+            "daily", "count", top=3, date_from=date(2025, 1, 2),
+        )
+
+        self.assertEqual([m["merchant_id"] for m in result], ["42", "9"])
+        self.assertEqual(result[0]["points"], [{"key": "1403/10/13", "value": 1}])
+
+    def test_compare_listed_merchants(self):
+        result = SummaryService.compare_merchants(
+            "daily", "amount", merchant_ids=["9", "42"],
+        )
+
+        self.assertEqual([m["merchant_id"] for m in result], ["42", "9"])
+        self.assertEqual(result[1]["total"], 50)
+
+
+class RebuildEnginesTests(TestCase):
+    def setUp(self):
+        for created_at, amount, merchant_id in [
+            (datetime(2024, 12, 30, 8, 0), 100, "1"),
+            (datetime(2025, 1, 1, 10, 30), 1000, "42"),
+            (datetime(2025, 1, 1, 23, 59), 2000, "42"),
+            (datetime(2025, 2, 3, 0, 0), 500, "42"),
+        ]:
+            Transaction.objects.create(
+                created_at=created_at,
+                amount=amount,
+                merchant_id=merchant_id,
+            )
+
+    def test_pipeline_engine_matches_python_reference(self):
+        pipeline_rows = SummaryService.rebuild_all_summaries(engine="pipeline")
+        python_rows = SummaryService.rebuild_all_summaries(engine="python")
+
+        self.assertEqual(len(pipeline_rows), len(python_rows))
+        self.assertEqual(SummaryService.diff_summaries(pipeline_rows, python_rows), [])
+
+    def test_pipeline_engine_weekly_uses_iso_week(self):
+        rows = SummaryService.rebuild_all_summaries(engine="pipeline")
+        weekly = {
+            (r.merchant_id, r.date): r
+            for r in rows
+            if r.granularity == SummaryTransaction.Granularity.WEEKLY
+        }
+
+        # 2024-12-30 and 2025-01-01 both fall in ISO week 1 of 2025
+        row = weekly[("42", date(2024, 12, 30))]
+        self.assertEqual((row.year, row.week), (2025, 1))
+        self.assertEqual(row.total_amount, 3000)
+        self.assertEqual(row.total_count, 2)
+
+    def test_jalali_buckets_follow_jalali_calendar(self):
+        rows = SummaryService.rebuild_all_summaries(engine="pipeline")
+        monthly = {
+            (r.merchant_id, r.date): r
+            for r in rows
+            if r.granularity == SummaryTransaction.Granularity.JALALI_MONTHLY
+        }
+
+        # 2025-01-01 is in Dey 1403 (starts 2024-12-21), 2025-02-03 in Bahman
+        row = monthly[("42", date(2024, 12, 21))]
+        self.assertEqual((row.year, row.month), (1403, 10))
+        self.assertEqual(row.total_amount, 3000)
+        self.assertEqual(monthly[("42", date(2025, 1, 20))].total_amount, 500)
+
+        weekly = {
+            (r.merchant_id, r.date): r
+            for r in rows
+            if r.granularity == SummaryTransaction.Granularity.JALALI_WEEKLY
+        }
+        # 2025-01-01 is a Wednesday; its Jalali week starts Saturday 2024-12-28
+        self.assertEqual(weekly[("42", date(2024, 12, 28))].total_count, 2)
+
+    def test_rollup_rows_cover_all_merchants(self):
+        rows = SummaryService.rebuild_all_summaries(engine="pipeline")
+        rollups = {
+            r.date: r
+            for r in rows
+            if r.granularity == SummaryTransaction.Granularity.DAILY and r.merchant_id is None
+        }
+        self.assertEqual(rollups[date(2025, 1, 1)].total_amount, 3000)
+
+        weekly_rollup = [
+            r for r in rows
+            if r.granularity == SummaryTransaction.Granularity.WEEKLY
+            and r.merchant_id is None
+            and r.date == date(2024, 12, 30)
+        ]
+        # merchants 1 and 42 in the same ISO week
+        self.assertEqual(weekly_rollup[0].total_amount, 3100)
+        self.assertEqual(weekly_rollup[0].total_count, 3)
+
+    def test_unknown_engine_raises(self):
+        with self.assertRaises(ValueError):
+            SummaryService.rebuild_all_summaries(engine="spark")
+
+
+class MerchantRowStreamingTests(SimpleTestCase):
+    def test_coarse_buckets_are_derived_one_merchant_at_a_time(self):
+        read = []
+
+        def daily_rows():
+            for merchant, day in [("42", 1), ("42", 2), ("7", 1), ("9", 1)]:
+                read.append(merchant)
+                yield {
+                    "merchant_id": merchant,
+                    "date": datetime(2025, 1, day),
+                    "total_amount": 100,
+                    "total_count": 1,
+                }
+
+        collection = Mock()
+        collection.aggregate.return_value = daily_rows()
+        with patch("transactions.summary_service.get_collection", return_value=collection), \
+                override_settings(SUMMARY_UNIQUE_FIELD=None):
+            rows = SummaryService._aggregate_merchant_rows({})
+            first = next(rows)
+            # merchant 42 is emitted before merchant 9 is even read
+            self.assertEqual((first["merchant_id"], read), ("42", ["42", "42", "7"]))
+            rest = list(rows)
+
+        monthly = {
+            row["merchant_id"]: row["total_amount"]
+            for row in [first, *rest] if row["granularity"] == "monthly"
+        }
+        self.assertEqual(monthly, {"42": 200, "7": 100, "9": 100})
+
+    @override_settings(SUMMARY_UNIQUE_FIELD="payerId")
+    def test_buckets_split_over_several_rows_are_merged(self):
+        def chunks(**bucket):
+            for payers in (range(0, 600), range(600, 1000)):
+                yield {
+                    **bucket,
+                    "merchant_id": "42",
+                    "total_amount": 100 * len(payers),
+                    "total_count": len(payers),
+                    "uniques": [f"p{payer}" for payer in payers],
+                }
+
+        collection = Mock()
+        collection.aggregate.side_effect = [
+            chunks(date=datetime(2025, 1, 1)),
+            chunks(granularity="hourly", start=datetime(2025, 1, 1, 10)),
+        ]
+        with patch("transactions.summary_service.get_collection", return_value=collection), \
+                patch.object(SummaryService, "subday_cutoffs",
+                             return_value={"hourly": datetime(2025, 1, 1)}):
+            daily = [
+                row for row in SummaryService._aggregate_merchant_rows({})
+                if row["granularity"] == "daily"
+            ]
+            hourly = list(SummaryService._aggregate_subday_rows({}))
+
+        for rows in (daily, hourly):
+            self.assertEqual(len(rows), 1)
+            self.assertEqual((rows[0]["total_amount"], rows[0]["total_count"]), (100_000, 1000))
+            self.assertLess(abs(estimate_sketch(rows[0]["unique_sketch"]) - 1000), 50)
@@ -0,0 +1,109 @@
+from datetime import datetime
+from io import StringIO
+
+from bson import ObjectId
+from django.core.management import call_command
+from django.test import TestCase
+
+from transaction_service.mongo import get_collection, get_database
+from transactions.locks import LOCK_COLLECTION, WRITER_LOCK, SummaryLockLost, SummaryWriterLock
+from transactions.models import SummaryCheckpoint, SummaryTransaction, Transaction
+from transactions.stream import SummaryStreamConsumer
+
+
+class SummaryStreamConsumerTests(TestCase):
+    """Runs against a replica set only (e.g. `mongod --replSet rs0`)."""
+
+    def setUp(self):
+        hello = get_database().client.admin.command("ismaster")
+        if "setName" not in hello:
+            self.skipTest("change streams need a replica set")
+
+        Transaction.objects.create(
+            created_at=datetime(2025, 1, 1, 10, 0), amount=1000, merchant_id="42",
+        )
+        call_command("rebuild_summaries")
+
+    def _daily(self, merchant_id):
+        return SummaryTransaction.objects.get(granularity="daily", merchant_id=merchant_id)
+
+    def test_inserts_are_applied_once_across_restarts(self):
+        consumer = SummaryStreamConsumer(batch_size=2, max_wait=0.2)
+        consumer.open()
+        try:
+            for amount in (200, 300):
+                Transaction.objects.create(
+                    created_at=datetime(2025, 1, 1, 11, 0), amount=amount, merchant_id="42",
+                )
+            consumer.run(max_batches=1)
+        finally:
+            consumer.close()
+
+        self.assertEqual(self._daily("42").total_amount, 1500)
+        self.assertEqual(self._daily(None).total_count, 3)
+        self.assertTrue(SummaryCheckpoint.objects.get().resume_token)
+
+        # a new consumer resumes after the applied batch
+        Transaction.objects.create(
+            created_at=datetime(2025, 1, 1, 12, 0), amount=400, merchant_id="7",
+        )
+        consumer = SummaryStreamConsumer(batch_size=1, max_wait=0.2)
+        consumer.open()
+        try:
+            consumer.run(max_batches=1)
+        finally:
+            consumer.close()
+
+        self.assertEqual(self._daily("42").total_amount, 1500)
+        self.assertEqual(self._daily("7").total_amount, 400)
+        self.assertEqual(self._daily(None).total_amount, 1900)
+
+    def test_incremental_run_starts_after_what_the_stream_applied(self):
+        consumer = SummaryStreamConsumer(batch_size=2, max_wait=0.2)
+        consumer.open()
+        try:
+            for amount in (200, 300):
+                Transaction.objects.create(
+                    created_at=datetime(2025, 1, 1, 11, 0), amount=amount, merchant_id="42",
+                )
+            consumer.run(max_batches=1)
+        finally:
+            consumer.close()
+
+        call_command("rebuild_summaries", "--incremental", stdout=StringIO())
+        self.assertEqual(self._daily("42").total_amount, 1500)
+        self.assertEqual(self._daily(None).total_count, 3)
+
+    def test_transactions_covered_by_the_rebuild_are_skipped(self):
+        consumer = SummaryStreamConsumer()
+        consumer.open()
+        try:
+            rows = consumer.rows_for([{
+                "_id": ObjectId(),
+                "createdAt": datetime(2024, 12, 31),
+                "amount": 5,
+                "merchantId": "42",
+            }])
+        finally:
+            consumer.close()
+        self.assertEqual(rows, [])
+
+    def test_batches_are_refused_once_the_lock_is_lost(self):
+        lock = SummaryWriterLock("watch_transactions")
+        lock.acquire()
+        consumer = SummaryStreamConsumer(batch_size=1, max_wait=0.2, lock=lock)
+        consumer.open()
+        try:
+            get_collection(LOCK_COLLECTION).update_one(
+                {"_id": WRITER_LOCK}, {"$set": {"owner": "rebuild_summaries"}},
+            )
+            Transaction.objects.create(
+                created_at=datetime(2025, 1, 1, 11, 0), amount=200, merchant_id="42",
+            )
+            with self.assertRaises(SummaryLockLost):
+                consumer.run(max_batches=1)
+        finally:
+            consumer.close()
+            lock.release()
+            get_collection(LOCK_COLLECTION).delete_many({})
+        self.assertEqual(self._daily("42").total_amount, 1000)
@@ -0,0 +1,60 @@
+from datetime import date, datetime, timedelta
+
+from django.test import SimpleTestCase, override_settings
+
+from transactions.utils import (
+    JalaliTable,
+    format_daily_key,
+    format_monthly_key,
+    jalali_fields,
+    jalali_ymd,
+    subday_bucket,
+    subday_expires_at,
+    to_jalali,
+)
+
+
+class JalaliTableTests(SimpleTestCase):
+    def test_table_matches_jdatetime_across_leap_years(self):
+        start, end = date(2020, 1, 1), date(2026, 12, 31)
+        table = JalaliTable(start, end)
+
+        d = start
+        while d <= end:
+            j = to_jalali(d)
+            self.assertEqual(table.lookup(d), (j.year, j.month, j.day), d)
+            d += timedelta(days=1)
+
+    def test_range_membership(self):
+        table = JalaliTable(date(2025, 1, 1), date(2025, 1, 31))
+        self.assertIn(date(2025, 1, 31), table)
+        self.assertNotIn(date(2025, 2, 1), table)
+
+    def test_dates_outside_table_fall_back_to_jdatetime(self):
+        self.assertEqual(jalali_ymd(date(1990, 5, 5)), (1369, 2, 15))
+
+    def test_format_helpers(self):
+        self.assertEqual(format_daily_key(date(2025, 1, 1)), "1403/10/12")
+        self.assertEqual(format_monthly_key(date(2024, 9, 1)), "شهریور 1403")
+
+
+class SubDayTests(SimpleTestCase):
+    def test_bucket_floors_to_granularity(self):
+        created_at = datetime(2025, 1, 1, 14, 37, 59)
+        self.assertEqual(subday_bucket(created_at, "hourly"), (date(2025, 1, 1), 14, 0))
+        self.assertEqual(subday_bucket(created_at, "quarter_hourly"), (date(2025, 1, 1), 14, 30))
+        self.assertEqual(subday_bucket(created_at, "five_minute"), (date(2025, 1, 1), 14, 35))
+
+    def test_jalali_key_includes_time(self):
+        fields = jalali_fields("quarter_hourly", date(2025, 1, 1), hour=9, minute=45)
+        self.assertEqual(fields["jalali_key"], "1403/10/12 09:45")
+
+    @override_settings(SUMMARY_SUBDAY_RETENTION_DAYS={"hourly": 30, "five_minute": 0})
+    def test_expiry_follows_retention(self):
+        self.assertEqual(
+            subday_expires_at("hourly", date(2025, 1, 1), 14, 0),
+            datetime(2025, 1, 31, 14, 0),
+        )
+        # disabled and non sub-day granularities never expire
+        self.assertIsNone(subday_expires_at("five_minute", date(2025, 1, 1), 14, 5))
+        self.assertIsNone(subday_expires_at("daily", date(2025, 1, 1), None, None))
@@ -1,5 +1,10 @@
 from django.urls import path
-from transactions.views import TransactionSummaryView
+from transactions.views import (
+    MerchantComparisonView,
+    SummaryCacheStatsView,
+    TransactionSummaryBatchView,
+    TransactionSummaryView,
+)
 
 urlpatterns = [
     path(
@@ -7,4 +12,19 @@ urlpatterns = [
         TransactionSummaryView.as_view(),
         name="transaction-summary",
     ),
+    path(
+        "summary/batch/",
+        TransactionSummaryBatchView.as_view(),
+        name="transaction-summary-batch",
+    ),
+    path(
+        "summary/merchants/",
+        MerchantComparisonView.as_view(),
+        name="transaction-summary-merchants",
+    ),
+    path(
+        "summary/cache-stats/",
+        SummaryCacheStatsView.as_view(),
+        name="transaction-summary-cache-stats",
+    ),
 ]
@@ -1,5 +1,9 @@
-from datetime import date
+from array import array
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+
 import jdatetime
+from django.conf import settings
 
 
 JALALI_MONTH_NAMES = {
@@ -18,17 +22,151 @@ JALALI_MONTH_NAMES = {
 }
 
 
+# Bucket width of the sub-day granularities, in minutes.
+SUBDAY_BUCKET_MINUTES = {
+    "hourly": 60,
+    "quarter_hourly": 15,
+    "five_minute": 5,
+}
+
+
 def to_jalali(d: date) -> jdatetime.date:
     """Convert a Gregorian date to Jalali using jdatetime."""
     return jdatetime.date.fromgregorian(date=d)
 
 
+class JalaliTable:
+    """
+    Array-backed Gregorian → Jalali lookup for a fixed date range.
+
+    Indexed by `date.toordinal() - start.toordinal()`; each column holds one
+    part of (jy, jm, jd). The table is filled by stepping through the Jalali
+    calendar once instead of converting every day through jdatetime.
+    """
+
+    def __init__(self, start: date, end: date):
+        if end < start:
+            raise ValueError("JalaliTable range end is before its start")
+
+        self.first = start.toordinal()
+        self.last = end.toordinal()
+        size = self.last - self.first + 1
+
+        self.years = array("H", bytes(2 * size))
+        self.months = array("B", bytes(size))
+        self.days = array("B", bytes(size))
+
+        j = to_jalali(start)
+        jy, jm, jd = j.year, j.month, j.day
+        month_length = self._month_length(jy, jm)
+        for i in range(size):
+            self.years[i] = jy
+            self.months[i] = jm
+            self.days[i] = jd
+            jd += 1
+            if jd > month_length:
+                jd = 1
+                jm += 1
+                if jm > 12:
+                    jm = 1
+                    jy += 1
+                month_length = self._month_length(jy, jm)
+
+    @staticmethod
+    def _month_length(jy: int, jm: int) -> int:
+        if jm <= 6:
+            return 31
+        if jm <= 11:
+            return 30
+        return 30 if jdatetime.date(jy, 1, 1).isleap() else 29
+
+    def __contains__(self, d: date) -> bool:
+        return self.first <= d.toordinal() <= self.last
+
+    def lookup(self, d: date) -> tuple[int, int, int]:
+        i = d.toordinal() - self.first
+        return self.years[i], self.months[i], self.days[i]
+
+
+_jalali_table: JalaliTable | None = None
+
+
+def get_jalali_table() -> JalaliTable:
+    """Process-wide table over settings.JALALI_TABLE_RANGE, built on first use."""
+    global _jalali_table
+    if _jalali_table is None:
+        start, end = settings.JALALI_TABLE_RANGE
+        _jalali_table = JalaliTable(start, end)
+    return _jalali_table
+
+
+@lru_cache(maxsize=4096)
+def _jalali_ymd_outside_table(d: date) -> tuple[int, int, int]:
+    j = to_jalali(d)
+    return j.year, j.month, j.day
+
+
+def jalali_ymd(d: date) -> tuple[int, int, int]:
+    """
+    (jy, jm, jd) for a Gregorian date: served from the lookup table, with a
+    bounded LRU cache for dates outside its range.
+    """
+    table = get_jalali_table()
+    if d in table:
+        return table.lookup(d)
+    return _jalali_ymd_outside_table(d)
+
+
+@lru_cache(maxsize=256)
+def nowruz(jy: int) -> date:
+    """Gregorian date of 1 Farvardin of Jalali year `jy`."""
+    return jdatetime.date(jy, 1, 1).togregorian()
+
+
+def jalali_month_start(d: date) -> date:
+    """Gregorian date of the first day of the Jalali month containing `d`."""
+    _, _, jd = jalali_ymd(d)
+    return d - timedelta(days=jd - 1)
+
+
+def jalali_week_start(d: date) -> date:
+    """The Saturday starting the Jalali (Saturday–Friday) week containing `d`."""
+    return d - timedelta(days=(d.weekday() + 2) % 7)
+
+
+def jalali_week_number(week_start: date) -> tuple[int, int]:
+    """
+    (jy, week) of the Saturday-start week beginning on `week_start`.
+
+    A week belongs to the Jalali year its Friday falls in, so the week
+    containing 1 Farvardin is week 1 of the new year.
+    """
+    jy, _, _ = jalali_ymd(week_start + timedelta(days=6))
+    first_saturday = jalali_week_start(nowruz(jy))
+    return jy, (week_start - first_saturday).days // 7 + 1
+
+
+def parse_summary_date(value: str) -> date:
+    """
+    Parse an API date given as Gregorian ('2025-01-01') or Jalali
+    ('1403/10/12', '1403-10-12'). Years before 1700 are read as Jalali.
+    Raises ValueError for anything else.
+    """
+    parts = value.strip().replace("/", "-").split("-")
+    if len(parts) != 3:
+        raise ValueError(f"Invalid date: {value!r}")
+    year, month, day = (int(p) for p in parts)
+    if year < 1700:
+        return jdatetime.date(year, month, day).togregorian()
+    return date(year, month, day)
+
+
 def format_daily_key(d: date) -> str:
     """
     Example: 1403/04/04
     """
-    j = to_jalali(d)
-    return f"{j.year:04d}/{j.month:02d}/{j.day:02d}"
+    jy, jm, jd = jalali_ymd(d)
+    return f"{jy:04d}/{jm:02d}/{jd:02d}"
 
 
 def format_weekly_key(ref_date: date, week: int | None) -> str:
@@ -36,9 +174,9 @@ def format_weekly_key(ref_date: date, week: int | None) -> str:
     Example: 'هفته ۶ سال 1403'
     We use the Jalali year derived from the reference date (Monday of that ISO week).
     """
-    j = to_jalali(ref_date)
+    jy, _, _ = jalali_ymd(ref_date)
     week_number = week if week is not None else 0
-    return f"هفته {week_number} سال {j.year}"
+    return f"هفته {week_number} سال {jy}"
 
 
 def format_monthly_key(ref_date: date) -> str:
@@ -46,6 +184,69 @@ def format_monthly_key(ref_date: date) -> str:
     Example: 'شهریور 1403'
     We assume ref_date is the first day of that month in Gregorian; we convert to Jalali.
     """
-    j = to_jalali(ref_date)
-    month_name = JALALI_MONTH_NAMES.get(j.month, str(j.month))
-    return f"{month_name} {j.year}"
+    jy, jm, _ = jalali_ymd(ref_date)
+    month_name = JALALI_MONTH_NAMES.get(jm, str(jm))
+    return f"{month_name} {jy}"
+
+
+def jalali_fields(
+    granularity: str,
+    ref_date: date,
+    week: int | None = None,
+    hour: int | None = None,
+    minute: int | None = None,
+) -> dict:
+    """
+    Jalali label and calendar parts of a summary bucket, stored on
+    SummaryTransaction at write time so the API never converts dates.
+    """
+    jy, jm, jd = jalali_ymd(ref_date)
+
+    if granularity in SUBDAY_BUCKET_MINUTES:
+        key = f"{format_daily_key(ref_date)} {hour or 0:02d}:{minute or 0:02d}"
+    elif granularity == "daily":
+        key = format_daily_key(ref_date)
+    elif granularity == "weekly":
+        key = format_weekly_key(ref_date, week)
+    elif granularity == "jalali_weekly":
+        jy, week = jalali_week_number(ref_date)
+        key = f"هفته {week} سال {jy}"
+    else:
+        key = format_monthly_key(ref_date)
+
+    return {
+        "jalali_key": key,
+        "jalali_year": jy,
+        "jalali_month": jm,
+        "jalali_day": jd,
+    }
+
+
+def subday_bucket(created_at: datetime, granularity: str) -> tuple[date, int, int]:
+    """(day, hour, minute) of the sub-day bucket containing `created_at`."""
+    width = SUBDAY_BUCKET_MINUTES[granularity]
+    minute = created_at.minute - created_at.minute % width
+    return created_at.date(), created_at.hour, minute
+
+
+def subday_retention() -> dict[str, int]:
+    """Enabled sub-day granularities and their retention in days."""
+    return {
+        granularity: days
+        for granularity, days in getattr(settings, "SUMMARY_SUBDAY_RETENTION_DAYS", {}).items()
+        if granularity in SUBDAY_BUCKET_MINUTES and days > 0
+    }
+
+
+def subday_expires_at(
+    granularity: str, ref_date: date, hour: int | None, minute: int | None,
+) -> datetime | None:
+    """
+    When a bucket leaves its retention window (naive UTC, as stored), or
+    None for granularities that are kept forever.
+    """
+    days = subday_retention().get(granularity)
+    if days is None:
+        return None
+    start = datetime.combine(ref_date, time(hour or 0, minute or 0))
+    return start + timedelta(days=days)
@@ -1,28 +1,289 @@
+import base64
+import binascii
+from datetime import date, datetime
+
+from django.http import HttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import replace_query_param
 
-from transactions.serializers import SummaryPointSerializer
+from transactions.cache import get_summary_cache
+from transactions.renderers import (
+    render_merchant_comparison,
+    render_summary_batch,
+    render_summary_page,
+    render_summary_points,
+)
+from transactions.serializers import SummaryBatchRequestSerializer
 from transactions.summary_service import SummaryService
+from transactions.utils import parse_summary_date
+
+
+MAX_PAGE_SIZE = 5000
+MAX_COMPARE_MERCHANTS = 100
+
+
+def encode_cursor(after: tuple) -> str:
+    """Opaque cursor for a (date, hour, minute) bucket start; hour is None above sub-day."""
+    day, hour, minute = after
+    value = day.isoformat() if hour is None else f"{day.isoformat()}T{hour:02d}:{minute or 0:02d}"
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        value = base64.urlsafe_b64decode(cursor.encode()).decode()
+        if "T" not in value:
+            return date.fromisoformat(value), None, None
+        start = datetime.fromisoformat(value)
+        return start.date(), start.hour, start.minute
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValidationError({"cursor": "Invalid cursor"})
 
 
 class TransactionSummaryView(APIView):
+    """
+    GET /api/transactions/summary/?mode=daily&type=amount|count|unique
+        [&merchant_id=42][&from=1403/01/01][&to=2025-03-31]
+        [&page_size=100][&cursor=...]
+
+    `type=unique` estimates distinct settings.SUMMARY_UNIQUE_FIELD values
+    per bucket from the stored HyperLogLog sketches.
+
+    `from` / `to` accept Gregorian or Jalali dates and bound the bucket date.
+    With `page_size` (or `cursor`) the response is paginated:
+        {"next": "<url or null>", "results": [...]}
+    """
 
     def get(self, request):
         mode = request.query_params.get("mode")
         value_type = request.query_params.get("type")
         merchant_id = request.query_params.get("merchant_id")
 
-        if mode not in {"daily", "weekly", "monthly"}:
+        if mode not in SummaryService.GRANULARITY_MAP:
+            raise ValidationError({"mode": "Invalid mode"})
+
+        self._check_value_type(value_type)
+
+        date_from = self._parse_date(request, "from")
+        date_to = self._parse_date(request, "to")
+
+        cursor = request.query_params.get("cursor")
+        page_size = request.query_params.get("page_size")
+        paginated = cursor is not None or page_size is not None
+        if paginated:
+            page_size = self._parse_page_size(page_size)
+            after = decode_cursor(cursor) if cursor else None
+
+        cache = get_summary_cache()
+        cache_params = (
+            mode, value_type, merchant_id or None, date_from, date_to,
+            # paginated bodies embed an absolute `next` URL
+            (page_size, cursor, request.get_host()) if paginated else None,
+        )
+        generation = None
+        if cache is not None:
+            body, generation = cache.get(cache_params)
+            if body is not None:
+                return self._json_response(body)
+
+        if paginated:
+            data, next_after = SummaryService.get_summary_page(
+                mode=mode,
+                value_type=value_type,
+                merchant_id=merchant_id,
+                page_size=page_size,
+                date_from=date_from,
+                date_to=date_to,
+                after=after,
+            )
+            next_url = None
+            if next_after is not None:
+                next_url = replace_query_param(
+                    request.build_absolute_uri(), "cursor", encode_cursor(next_after)
+                )
+            body = render_summary_page(data, next_url)
+        else:
+            data = SummaryService.get_summary(
+                mode=mode,
+                value_type=value_type,
+                merchant_id=merchant_id,
+                date_from=date_from,
+                date_to=date_to,
+            )
+            body = render_summary_points(data)
+
+        if cache is not None:
+            cache.set(cache_params, body, generation)
+        return self._json_response(body)
+
+    @staticmethod
+    def _json_response(body: bytes) -> HttpResponse:
+        return HttpResponse(body, content_type="application/json")
+
+    @staticmethod
+    def _check_value_type(value_type: str | None) -> None:
+        if value_type not in SummaryService.VALUE_TYPES:
+            raise ValidationError({"type": "Invalid type"})
+        if value_type == "unique" and not SummaryService.unique_field():
+            raise ValidationError({"type": "Unique counts are not enabled"})
+
+    @staticmethod
+    def _parse_date(request, param: str) -> date | None:
+        value = request.query_params.get(param)
+        if not value:
+            return None
+        try:
+            return parse_summary_date(value)
+        except ValueError:
+            raise ValidationError({param: "Invalid date"})
+
+    @staticmethod
+    def _parse_page_size(value: str | None) -> int:
+        if value is None:
+            return MAX_PAGE_SIZE
+        try:
+            page_size = int(value)
+        except ValueError:
+            raise ValidationError({"page_size": "Must be an integer"})
+        if not 1 <= page_size <= MAX_PAGE_SIZE:
+            raise ValidationError({"page_size": f"Must be between 1 and {MAX_PAGE_SIZE}"})
+        return page_size
+
+
+class MerchantComparisonView(APIView):
+    """
+    GET /api/transactions/summary/merchants/?mode=daily&type=amount
+        (&merchant_ids=42,7 | &top=10)[&from=...][&to=...]
+
+    Per-merchant series for the listed merchants, or for the `top` merchants
+    by total over the window, ranked best first:
+        {"merchants": [{"merchant_id", "total", "points": [...]}, ...]}
+    """
+
+    def get(self, request):
+        mode = request.query_params.get("mode")
+        value_type = request.query_params.get("type")
+
+        if mode not in SummaryService.GRANULARITY_MAP:
             raise ValidationError({"mode": "Invalid mode"})
 
+        # merchants are ranked by summing the bucket totals server-side,
+        # which sketches do not support
         if value_type not in {"amount", "count"}:
             raise ValidationError({"type": "Invalid type"})
 
-        data = SummaryService.get_summary(
+        merchant_ids = [
+            m for m in request.query_params.get("merchant_ids", "").split(",") if m
+        ]
+        top = request.query_params.get("top")
+        if bool(merchant_ids) == (top is not None):
+            raise ValidationError({"merchant_ids": "Pass either merchant_ids or top"})
+        if len(merchant_ids) > MAX_COMPARE_MERCHANTS:
+            raise ValidationError(
+                {"merchant_ids": f"At most {MAX_COMPARE_MERCHANTS} merchants"}
+            )
+        if top is not None:
+            top = self._parse_top(top)
+
+        date_from = TransactionSummaryView._parse_date(request, "from")
+        date_to = TransactionSummaryView._parse_date(request, "to")
+
+        cache = get_summary_cache()
+        cache_params = (
+            "merchants", mode, value_type, tuple(merchant_ids), top, date_from, date_to,
+        )
+        generation = None
+        if cache is not None:
+            body, generation = cache.get(cache_params)
+            if body is not None:
+                return TransactionSummaryView._json_response(body)
+
+        data = SummaryService.compare_merchants(
             mode=mode,
             value_type=value_type,
-            merchant_id=merchant_id
+            merchant_ids=merchant_ids or None,
+            top=top,
+            date_from=date_from,
+            date_to=date_to,
         )
+        body = render_merchant_comparison(data)
+
+        if cache is not None:
+            cache.set(cache_params, body, generation)
+        return TransactionSummaryView._json_response(body)
+
+    @staticmethod
+    def _parse_top(value: str) -> int:
+        try:
+            top = int(value)
+        except ValueError:
+            raise ValidationError({"top": "Must be an integer"})
+        if not 1 <= top <= MAX_COMPARE_MERCHANTS:
+            raise ValidationError({"top": f"Must be between 1 and {MAX_COMPARE_MERCHANTS}"})
+        return top
+
+
+class TransactionSummaryBatchView(APIView):
+    """
+    POST /api/transactions/summary/batch/
+        {
+          "series": [{"mode": "daily", "type": "amount"},
+                     {"mode": "daily", "type": "count"}, ...],
+          "merchant_ids": ["42", "7"],          # optional, omit for the rollup
+          "from": "1403/01/01", "to": "2025-03-31"   # optional
+        }
 
-        return Response(SummaryPointSerializer(data, many=True).data)
+    Returns every requested series for every merchant in one response:
+        {"series": [{"mode", "type", "merchant_id", "points": [...]}, ...]}
+    Series sharing a mode are answered by a single query.
+    """
+
+    def post(self, request):
+        serializer = SummaryBatchRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        for item in data["series"]:
+            TransactionSummaryView._check_value_type(item["type"])
+
+        series = list(dict.fromkeys(
+            (item["mode"], item["type"]) for item in data["series"]
+        ))
+        merchant_ids = data["merchant_ids"] or None
+
+        cache = get_summary_cache()
+        cache_params = (
+            "batch", tuple(series), tuple(merchant_ids or ()), data["from"], data["to"],
+        )
+        generation = None
+        if cache is not None:
+            body, generation = cache.get(cache_params)
+            if body is not None:
+                return TransactionSummaryView._json_response(body)
+
+        results = SummaryService.get_summary_batch(
+            series=series,
+            merchant_ids=merchant_ids,
+            date_from=data["from"],
+            date_to=data["to"],
+        )
+        body = render_summary_batch(results)
+
+        if cache is not None:
+            cache.set(cache_params, body, generation)
+        return TransactionSummaryView._json_response(body)
+
+
+class SummaryCacheStatsView(APIView):
+    """
+    GET /api/transactions/summary/cache-stats/
+
+    Hit/miss counters and current generation of the summary response cache.
+    """
+
+    def get(self, request):
+        cache = get_summary_cache()
+        if cache is None:
+            return Response({"enabled": False})
+        return Response(cache.stats())